@@ -1,17 +1,24 @@
 from typing import AsyncGenerator, Dict, Any, Optional, Generator, List
+import asyncio
 import logging
 from datetime import datetime
 from app.domain.models.session import Session
 from app.domain.repositories.session_repository import SessionRepository
 
-from app.interfaces.schemas.response import ShellViewResponse, FileViewResponse, GetSessionResponse
+from app.interfaces.schemas.response import (
+    ShellViewResponse, FileViewResponse, GetSessionResponse,
+    SessionProfileResponse, StepProfile, ConsoleRecord
+)
 from app.domain.models.agent import Agent
 from app.domain.services.agent_domain_service import AgentDomainService
-from app.domain.events.agent_events import AgentEvent
+from app.domain.events.agent_events import AgentEvent, StepEvent
+from app.domain.models.timing import merge_timings
 from app.application.errors.exceptions import NotFoundError
 from typing import Type
 from app.domain.models.agent import Agent
 from app.domain.external.sandbox import Sandbox
+from app.domain.external.sandbox_pool import SandboxPool
+from app.domain.models.sandbox_pool import SandboxPoolStats
 from app.domain.external.search import SearchEngine
 from app.domain.external.llm import LLM
 from app.domain.external.file import FileStorage
@@ -20,11 +27,20 @@ from app.domain.external.task import Task
 from app.domain.utils.json_parser import JsonParser
 from app.application.services.file_service import FileService
 from app.domain.models.file import FileInfo
+from app.domain.utils.throttle import latest_every
 from app.domain.repositories.mcp_repository import MCPRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Minimum interval in seconds between pushed shell views, output arriving faster is coalesced
+SHELL_STREAM_INTERVAL = 0.2
+
+# Followed shell output keeps its head and tail like the sandbox output buffer, the middle is dropped
+SHELL_VIEW_HEAD_CHARS = 64 * 1024
+SHELL_VIEW_TAIL_CHARS = 1024 * 1024
+SHELL_VIEW_TRUNCATED_MARKER = "\n[... output truncated ...]\n"
+
 class AgentService:
     def __init__(
         self,
@@ -37,6 +53,8 @@ class AgentService:
         file_storage: FileStorage,
         mcp_repository: MCPRepository,
         search_engine: Optional[SearchEngine] = None,
+        sandbox_pool: Optional[SandboxPool] = None,
+        max_steps: Optional[int] = None,
     ):
         logger.info("Initializing AgentService")
         self._agent_repository = agent_repository
@@ -52,10 +70,13 @@ class AgentService:
             file_storage,
             mcp_repository,
             search_engine,
+            sandbox_pool,
+            max_steps,
         )
         self._llm = llm
         self._search_engine = search_engine
         self._sandbox_cls = sandbox_cls
+        self._sandbox_pool = sandbox_pool
     
     async def create_session(self) -> Session:
         logger.info("Creating new session")
@@ -105,6 +126,36 @@ class AgentService:
             raise NotFoundError(f"Session not found: {session_id}")
         return session
     
+    async def get_session_profile(self, session_id: str) -> SessionProfileResponse:
+        """Get per-step timing breakdown of a session
+
+        Timings of the same step (e.g. a failed attempt and its retry) are merged.
+
+        Raises:
+            NotFoundError: When session does not exist
+        """
+        session = await self.get_session(session_id)
+        steps: Dict[str, StepProfile] = {}
+        for event in session.events:
+            if not isinstance(event, StepEvent) or not event.timing:
+                continue
+            profile = steps.get(event.step.id)
+            if profile is None:
+                steps[event.step.id] = StepProfile(
+                    step_id=event.step.id,
+                    description=event.step.description,
+                    status=event.step.status,
+                    timing=merge_timings([event.timing]),
+                )
+            else:
+                profile.status = event.step.status
+                profile.timing = merge_timings([profile.timing, event.timing])
+        return SessionProfileResponse(
+            session_id=session_id,
+            steps=list(steps.values()),
+            total=merge_timings(profile.timing for profile in steps.values()),
+        )
+
     async def get_all_sessions(self) -> List[Session]:
         return await self._session_repository.get_all()
 
@@ -115,10 +166,22 @@ class AgentService:
     async def stop_session(self, session_id: str):
         await self._agent_domain_service.stop_session(session_id)
 
+    def get_sandbox_pool_stats(self) -> Optional[SandboxPoolStats]:
+        """Get sandbox pool metrics, None when the pool is disabled"""
+        if not self._sandbox_pool:
+            return None
+        return self._sandbox_pool.get_stats()
+
+    async def start(self):
+        if self._sandbox_pool:
+            await self._sandbox_pool.start()
+
     async def shutdown(self):
         logger.info("Closing all agents and cleaning up resources")
         # Clean up all Agents and their associated sandboxes
         await self._agent_domain_service.shutdown()
+        if self._sandbox_pool:
+            await self._sandbox_pool.stop()
         logger.info("All agents closed successfully")
 
     async def _get_sandbox(self, session_id: str) -> Sandbox:
@@ -179,6 +242,80 @@ class AgentService:
         
         return ShellViewResponse(output=f"(Failed to view shell output: {err})", session_id=session_id)
 
+    @staticmethod
+    def _merge_shell_delta(view: Optional[ShellViewResponse], data: Dict[str, Any]) -> ShellViewResponse:
+        """Apply a shell view delta to the previous view"""
+        output = data.get("output", "")
+        # Sandboxes without delta views return everything from the start
+        if view is not None and data.get("start_offset", 0) > 0:
+            output = view.output + output
+            if len(output) > SHELL_VIEW_HEAD_CHARS + SHELL_VIEW_TAIL_CHARS + len(SHELL_VIEW_TRUNCATED_MARKER):
+                output = output[:SHELL_VIEW_HEAD_CHARS] + SHELL_VIEW_TRUNCATED_MARKER + output[-SHELL_VIEW_TAIL_CHARS:]
+        console = (view.console or [])[:data.get("start_record", 0)] if view else []
+        console = console + [ConsoleRecord(**record) for record in data.get("console") or []]
+        if console:
+            console[-1] = console[-1].model_copy(update={"output": output})
+        return ShellViewResponse(output=output, session_id=data.get("session_id", ""), console=console)
+
+    async def shell_view_updates(
+        self,
+        session_id: str,
+        shell_session_id: str,
+        poll_interval: float
+    ) -> AsyncGenerator[ShellViewResponse, None]:
+        """Follow shell session output, yielding the full view whenever it changes
+        
+        Output is pushed by the sandbox as it is produced, views are yielded at most every
+        SHELL_STREAM_INTERVAL seconds. If the sandbox cannot stream, or the stream drops,
+        output and console records added since the previous poll are fetched every
+        poll_interval seconds, resuming from the last received offset.
+        
+        Args:
+            session_id: Session ID
+            shell_session_id: Shell session ID
+            poll_interval: Polling interval in seconds when output cannot be pushed
+        """
+        view: Optional[ShellViewResponse] = None
+        sent: Optional[ShellViewResponse] = None
+        end_offset: Optional[int] = None
+
+        async def stream_views() -> AsyncGenerator[ShellViewResponse, None]:
+            nonlocal view, end_offset
+            sandbox = await self._get_sandbox(session_id)
+            async for data in sandbox.stream_shell(shell_session_id):
+                view = self._merge_shell_delta(view, data)
+                end_offset = data.get("end_offset")
+                yield view
+
+        try:
+            async for sent in latest_every(stream_views(), SHELL_STREAM_INTERVAL):
+                yield sent
+        except Exception as e:
+            logger.info(f"Shell output stream unavailable for session {session_id}, polling: {e}")
+        while True:
+            err = ""
+            try:
+                sandbox = await self._get_sandbox(session_id)
+                since_record = len(view.console) - 1 if view and view.console else None
+                result = await sandbox.view_shell_delta(shell_session_id, end_offset, since_record)
+                if result.success:
+                    new_view = self._merge_shell_delta(view, result.data)
+                    end_offset = result.data.get("end_offset")
+                else:
+                    err = result.message or "unknown error"
+            except Exception as e:
+                logger.exception(f"Failed to view shell output for session {session_id}: {e}")
+                err = str(e) or type(e).__name__
+            if err:
+                # Start over once the shell can be viewed again
+                new_view = ShellViewResponse(output=f"(Failed to view shell output: {err})", session_id=session_id)
+                end_offset = None
+            if new_view != sent:
+                yield new_view
+                sent = new_view
+            view = new_view
+            await asyncio.sleep(poll_interval)
+
     async def get_vnc_url(self, session_id: str) -> str:
         """Get the VNC URL for the Agent sandbox
         
@@ -196,15 +333,16 @@ class AgentService:
         sandbox = await self._get_sandbox(session_id)
         return sandbox.vnc_url
 
-    async def file_view(self, session_id: str, path: str) -> FileViewResponse:
+    async def file_view(self, session_id: str, path: str, if_none_match: Optional[str] = None) -> Optional[FileViewResponse]:
         """View file content
         
         Args:
             session_id: Session ID
             path: File path
+            if_none_match: Version of the content the caller already has
             
         Returns:
-            APIResponse: Response entity containing file content
+            APIResponse: Response entity containing file content, None if the version is unchanged
             
         Raises:
             ResourceNotFoundError: When Agent or Sandbox does not exist
@@ -214,7 +352,9 @@ class AgentService:
         err = ""
         try:
             sandbox = await self._get_sandbox(session_id)
-            result = await sandbox.file_read(path)
+            result = await sandbox.file_read(path, if_none_match=if_none_match)
+            if result.success and result.data.get("not_modified"):
+                return None
             logger.info(f"File read successfully: {path}")
             if result.success:
                 return FileViewResponse(**result.data)
@@ -227,6 +367,29 @@ class AgentService:
         
         return FileViewResponse(content=f"(Failed to read file content: {err})", file=path)
 
+    async def watch_file(self, session_id: str, path: str, poll_interval: float) -> AsyncGenerator[None, None]:
+        """Yield whenever a file may have changed
+        
+        Changes are pushed by the sandbox file change feed. Sandboxes without it, and
+        paths it does not watch (the sandbox rejects those), are polled every
+        poll_interval seconds instead.
+        
+        Args:
+            session_id: Session ID
+            path: File path
+            poll_interval: Polling interval in seconds when changes cannot be pushed
+        """
+        try:
+            sandbox = await self._get_sandbox(session_id)
+            async for batch in sandbox.watch_files([path]):
+                if batch.overflow or any(change.path == path for change in batch.changes):
+                    yield
+        except Exception as e:
+            logger.info(f"File change feed unavailable for session {session_id}, polling {path}: {e}")
+        while True:
+            await asyncio.sleep(poll_interval)
+            yield
+
     async def get_session_files(self, session_id: str) -> List[FileInfo]:
         session = await self._session_repository.find_by_id(session_id)
         if not session:
@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, BinaryIO, Tuple
+from typing import AsyncIterable, AsyncIterator, Dict, Any, Optional, BinaryIO, Tuple, Union
 import logging
 from app.domain.external.file import FileStorage
 from app.domain.models.file import FileInfo
@@ -10,13 +10,13 @@ class FileService:
     def __init__(self, file_storage: Optional[FileStorage] = None):
         self._file_storage = file_storage
 
-    async def upload_file(self, file_data: BinaryIO, filename: str, content_type: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> FileInfo:
+    async def upload_file(self, file_data: Union[BinaryIO, AsyncIterable[bytes]], filename: str, content_type: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> FileInfo:
         """Upload file"""
         if not self._file_storage:
             raise RuntimeError("File storage service not available")
         return await self._file_storage.upload_file(file_data, filename, content_type, metadata)
     
-    async def download_file(self, file_id: str) -> Tuple[BinaryIO, FileInfo]:
+    async def download_file(self, file_id: str) -> Tuple[AsyncIterator[bytes], FileInfo]:
         """Download file"""
         if not self._file_storage:
             raise RuntimeError("File storage service not available")
@@ -6,6 +6,7 @@ import uuid
 from enum import Enum
 from app.domain.models.plan import Plan, Step
 from app.domain.models.file import FileInfo
+from app.domain.models.timing import Timing
 import json
 
 
@@ -90,6 +91,7 @@ class StepEvent(BaseEvent):
     type: Literal["step"] = "step"
     step: Step
     status: StepStatus
+    timing: Optional[Timing] = None  # Span path -> duration stats, set when the step ends
 
 class MessageEvent(BaseEvent):
     """Message event"""
@@ -1,4 +1,4 @@
-from typing import Protocol, BinaryIO, Optional, Dict, Any, Tuple
+from typing import AsyncIterable, AsyncIterator, Protocol, BinaryIO, Optional, Dict, Any, Tuple, Union
 from app.domain.models.file import FileInfo
 
 class FileStorage(Protocol):
@@ -6,7 +6,7 @@ class FileStorage(Protocol):
     
     async def upload_file(
         self,
-        file_data: BinaryIO,
+        file_data: Union[BinaryIO, AsyncIterable[bytes]],
         filename: str,
         content_type: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None
@@ -14,7 +14,7 @@ class FileStorage(Protocol):
         """Upload file to storage
         
         Args:
-            file_data: Binary file data stream
+            file_data: Binary file data stream, or async iterable of chunks written as they arrive
             filename: Name of the file to be stored
             content_type: MIME type of the file (optional)
             metadata: Additional metadata to store with the file (optional)
@@ -27,25 +27,48 @@ class FileStorage(Protocol):
     async def download_file(
         self,
         file_id: str
-    ) -> Tuple[BinaryIO, FileInfo]:
+    ) -> Tuple[AsyncIterator[bytes], FileInfo]:
         """Download file from storage by file ID
         
         Args:
             file_id: File ID
             
         Returns:
-            FileDownloadResult containing file data and metadata for FastAPI streaming
+            File content as an async iterator of chunks and file metadata for FastAPI streaming
         """
         ...
     
 
     
+    async def link_file_by_hash(
+        self,
+        content_hash: str,
+        filename: str,
+        content_type: Optional[str] = None
+    ) -> Optional[FileInfo]:
+        """Reference a stored file with identical content instead of uploading it again
+        
+        The reference gets its own file ID and filename. The shared content stays in
+        storage until every reference to it is deleted.
+        
+        Args:
+            content_hash: SHA-256 hex digest of the file content
+            filename: Name of the file for this reference
+            content_type: MIME type of the file (optional)
+            
+        Returns:
+            FileInfo of the new reference, None if no file with identical content is stored
+        """
+        ...
+    
     async def delete_file(
         self,
         file_id: str
     ) -> bool:
         """Delete file from storage
         
+        Content shared with other references is only removed with the last one.
+        
         Args:
             file_id: File ID
             
@@ -1,5 +1,7 @@
-from typing import Any, Optional, Protocol, BinaryIO
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Protocol, BinaryIO, List, Union
 from app.domain.models.tool_result import ToolResult
+from app.domain.models.file import FileChangeBatch
+from app.domain.models.sandbox_operation import SandboxOperation
 from app.domain.external.browser import Browser
 from app.domain.external.llm import LLM
 
@@ -39,16 +41,62 @@ class Sandbox(Protocol):
         """
         ...
     
+    async def view_shell_delta(
+        self,
+        session_id: str,
+        since_offset: Optional[int] = None,
+        since_record: Optional[int] = None
+    ) -> ToolResult:
+        """View shell output and console records added since a previous view
+        
+        Args:
+            session_id: Session ID
+            since_offset: end_offset of the previous view, output before it is skipped if
+                the current command is still the one at since_record
+            since_record: Index of the first console record to return
+            
+        Returns:
+            Shell status information, start_offset and start_record tell where the returned
+            output and console records begin
+        """
+        ...
+    
+    def stream_shell(
+        self,
+        session_id: str,
+        since_offset: Optional[int] = None,
+        since_record: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Follow shell output as it is produced
+        
+        Args:
+            session_id: Session ID
+            since_offset: Resume after this output offset, as in view_shell_delta
+            since_record: Resume from this console record, as in view_shell_delta
+            
+        Returns:
+            Async iterator of shell view deltas in the view_shell_delta format, the first
+            one catches up from the given offsets, later ones carry new output, commands
+            and exits. Runs until the caller stops iterating
+            
+        Raises:
+            ConnectionError: The sandbox cannot stream shell output, callers should poll instead
+        """
+        ...
+    
     async def wait_for_process(
         self,
         session_id: str,
-        seconds: Optional[int] = None
+        seconds: Optional[int] = None,
+        since_offset: Optional[int] = None
     ) -> ToolResult:
         """Wait for process
         
         Args:
             session_id: Session ID
             seconds: Wait seconds
+            since_offset: Also return as soon as the process has output after this
+                byte offset, e.g. the end_offset of an earlier result
             
         Returns:
             Wait result
@@ -113,7 +161,9 @@ class Sandbox(Protocol):
         file: str, 
         start_line: int = None, 
         end_line: int = None, 
-        sudo: bool = False
+        sudo: bool = False,
+        if_none_match: Optional[str] = None,
+        tail_lines: Optional[int] = None
     ) -> ToolResult:
         """Read file content
         
@@ -122,9 +172,22 @@ class Sandbox(Protocol):
             start_line: Start line number
             end_line: End line number
             sudo: Whether to use sudo privileges
+            if_none_match: Content version from a previous read, content is omitted if unchanged
+            tail_lines: Read the last N lines instead of a line range
+            
+        Returns:
+            File content and version, not_modified is set when the version matches if_none_match
+        """
+        ...
+    
+    async def file_stat(self, file: str) -> ToolResult:
+        """Get file size, modification time and content hash
+        
+        Args:
+            file: File path
             
         Returns:
-            File content
+            File stat with size, mtime and sha256
         """
         ...
     
@@ -199,32 +262,58 @@ class Sandbox(Protocol):
         """
         ...
     
+    async def file_grep(
+        self,
+        path: str,
+        regex: str,
+        include: Optional[List[str]] = None,
+        context_lines: int = 0,
+        max_results: int = 200,
+        ignore_case: bool = False
+    ) -> ToolResult:
+        """Search file contents recursively under a directory
+        
+        Args:
+            path: Directory to search, or a single file
+            regex: Regular expression, matched against each line
+            include: Only search files matching one of these globs
+            context_lines: Lines of context before and after each match
+            max_results: Stop after this many matches
+            ignore_case: Whether to match case-insensitively
+            
+        Returns:
+            Matching lines with file and line number
+        """
+        ...
+    
     async def file_find(
         self, 
         path: str, 
-        glob_pattern: str
+        glob_pattern: str,
+        cursor: Optional[str] = None
     ) -> ToolResult:
         """Find files by name pattern
         
         Args:
             path: Search directory path
             glob_pattern: Glob matching pattern
+            cursor: next_cursor of a previous truncated result, to get the next page
             
         Returns:
-            Found file list
+            Found file list, with next_cursor when truncated
         """
         ...
     
     async def file_upload(
         self,
-        file_data: BinaryIO,
+        file_data: Union[BinaryIO, AsyncIterable[bytes]],
         path: str,
         filename: str = None
     ) -> ToolResult:
         """Upload file to sandbox
         
         Args:
-            file_data: File content as binary stream
+            file_data: File content as binary stream, or async iterable of chunks sent as they arrive
             path: Target file path in sandbox
             filename: Original filename (optional)
             
@@ -236,14 +325,48 @@ class Sandbox(Protocol):
     async def file_download(
         self,
         path: str
-    ) -> BinaryIO:
+    ) -> AsyncIterator[bytes]:
         """Download file from sandbox
         
         Args:
             path: File path in sandbox
             
         Returns:
-            File content as binary stream
+            File content as an async iterator of chunks, read from the sandbox while iterating
+        """
+        ...
+    
+    def watch_files(
+        self,
+        paths: Optional[List[str]] = None
+    ) -> AsyncIterator[FileChangeBatch]:
+        """Follow file changes in the sandbox
+        
+        Args:
+            paths: Only report changes under these paths, all watched roots if empty
+            
+        Returns:
+            Async iterator of debounced change batches, runs until the caller stops iterating.
+            A batch with overflow set means changes were lost and tracked files must be rescanned
+            
+        Raises:
+            ConnectionError: The sandbox cannot push file changes, callers should poll instead
+        """
+        ...
+    
+    async def batch(
+        self,
+        operations: List[SandboxOperation],
+        stop_on_error: bool = False
+    ) -> List[ToolResult]:
+        """Execute operations in order in a single round trip
+        
+        Args:
+            operations: Operations to execute
+            stop_on_error: Whether to skip the remaining operations after the first failure
+            
+        Returns:
+            Result of each executed operation in order, fewer than operations when stopped
         """
         ...
     
@@ -0,0 +1,27 @@
+from typing import Protocol
+from app.domain.external.sandbox import Sandbox
+from app.domain.models.sandbox_pool import SandboxPoolStats
+
+
+class SandboxPool(Protocol):
+    """Pool of pre-started sandboxes leased to new sessions"""
+
+    async def acquire(self) -> Sandbox:
+        """Lease a ready sandbox, creating one if the pool is empty
+
+        Returns:
+            Sandbox instance owned by the caller from now on
+        """
+        ...
+
+    async def start(self) -> None:
+        """Start warming and recycling sandboxes in the background"""
+        ...
+
+    async def stop(self) -> None:
+        """Stop background maintenance and destroy idle sandboxes"""
+        ...
+
+    def get_stats(self) -> SandboxPoolStats:
+        """Get hit rate, wait time and size metrics of the pool"""
+        ...
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -11,3 +11,15 @@ class FileInfo(BaseModel):
     size: Optional[int] = None
     upload_date: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = None
+
+
+class FileChange(BaseModel):
+    path: str
+    type: Literal["created", "modified", "deleted"]
+    is_dir: bool = False
+
+
+class FileChangeBatch(BaseModel):
+    changes: List[FileChange] = []
+    # Changes were lost, every tracked file may be stale
+    overflow: bool = False
@@ -27,6 +27,7 @@ class MCPServerConfig(BaseModel):
     enabled: bool = Field(default=True)
     description: Optional[str] = None
     env: Optional[Dict[str, str]] = None
+    timeout: Optional[float] = None  # Per-call deadline in seconds
     
     @field_validator("url")
     def validate_url_for_http_transport(cls, v: Optional[str], values) -> Optional[str]:
@@ -0,0 +1,31 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+
+class SandboxOperation(BaseModel):
+    """Sandbox API operation executed as part of a batch"""
+    method: str
+    params: Dict[str, Any] = {}
+
+    @classmethod
+    def view_shell(cls, session_id: str) -> "SandboxOperation":
+        return cls(method="/shell/view", params={"id": session_id})
+
+    @classmethod
+    def file_read(
+        cls,
+        file: str,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        sudo: bool = False
+    ) -> "SandboxOperation":
+        return cls(method="/file/read", params={
+            "file": file,
+            "start_line": start_line,
+            "end_line": end_line,
+            "sudo": sudo
+        })
+
+    @classmethod
+    def file_stat(cls, file: str) -> "SandboxOperation":
+        return cls(method="/file/stat", params={"file": file})
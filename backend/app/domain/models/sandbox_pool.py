@@ -0,0 +1,27 @@
+from pydantic import BaseModel, computed_field
+
+
+class SandboxPoolStats(BaseModel):
+    """Sandbox pool metrics"""
+    hits: int = 0
+    misses: int = 0
+    created: int = 0
+    recycled: int = 0
+    failed: int = 0
+    idle: int = 0
+    warming: int = 0
+    target_size: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @computed_field
+    @property
+    def avg_wait_ms(self) -> float:
+        total = self.hits + self.misses
+        return self.total_wait_ms / total if total else 0.0
@@ -0,0 +1,32 @@
+from typing import Dict, Iterable
+from pydantic import BaseModel
+
+
+class SpanStats(BaseModel):
+    """Aggregated duration of one timing span"""
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def merge(self, other: "SpanStats") -> None:
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+
+# Span path -> stats, nested spans are joined with ";" (collapsed stack format)
+Timing = Dict[str, SpanStats]
+
+
+def merge_timings(timings: Iterable[Timing]) -> Timing:
+    """Merge several timing breakdowns into one"""
+    merged: Timing = {}
+    for timing in timings:
+        for name, stats in timing.items():
+            merged.setdefault(name, SpanStats()).merge(stats)
+    return merged
@@ -5,6 +5,7 @@ from datetime import datetime
 from app.domain.models.session import Session, SessionStatus
 from app.domain.external.llm import LLM
 from app.domain.external.sandbox import Sandbox
+from app.domain.external.sandbox_pool import SandboxPool
 from app.domain.external.search import SearchEngine
 from app.domain.events.agent_events import BaseEvent, ErrorEvent, DoneEvent, PlanEvent, StepEvent, ToolEvent, MessageEvent, WaitEvent, AgentEventFactory
 from app.domain.repositories.agent_repository import AgentRepository
@@ -36,16 +37,20 @@ class AgentDomainService:
         file_storage: FileStorage,
         mcp_repository: MCPRepository,
         search_engine: Optional[SearchEngine] = None,
+        sandbox_pool: Optional[SandboxPool] = None,
+        max_steps: Optional[int] = None,
     ):
         self._repository = agent_repository
         self._session_repository =session_repository
         self._llm = llm
         self._sandbox_cls = sandbox_cls
+        self._sandbox_pool = sandbox_pool
         self._search_engine = search_engine
         self._task_cls = task_cls
         self._json_parser = json_parser
         self._file_storage = file_storage
         self._mcp_repository = mcp_repository
+        self._max_steps = max_steps
         logger.info("AgentDomainService initialization completed")
             
     async def shutdown(self) -> None:
@@ -61,7 +66,10 @@ class AgentDomainService:
         if sandbox_id:
             sandbox = await self._sandbox_cls.get(sandbox_id)
         if not sandbox:
-            sandbox = await self._sandbox_cls.create()
+            if self._sandbox_pool:
+                sandbox = await self._sandbox_pool.acquire()
+            else:
+                sandbox = await self._sandbox_cls.create()
             session.sandbox_id = sandbox.id
             await self._session_repository.save(session)
         browser = await sandbox.get_browser()
@@ -83,6 +91,7 @@ class AgentDomainService:
             json_parser=self._json_parser,
             agent_repository=self._repository,
             mcp_repository=self._mcp_repository,
+            max_steps=self._max_steps,
         )
 
         task = self._task_cls.create(task_runner)
@@ -1,4 +1,4 @@
-from typing import Optional, AsyncGenerator, List
+from typing import Dict, Optional, AsyncGenerator, List, Tuple
 import asyncio
 import logging
 from app.domain.events.agent_events import (
@@ -31,8 +31,11 @@ from app.domain.repositories.session_repository import SessionRepository
 from app.domain.repositories.mcp_repository import MCPRepository
 from app.domain.models.session import SessionStatus
 from app.domain.models.file import FileInfo
+from app.domain.models.tool_result import ToolResult
+from app.domain.models.sandbox_operation import SandboxOperation
 from app.domain.utils.json_parser import JsonParser
 from app.domain.services.tools.mcp import MCPTool
+from app.domain.utils.profiler import Profiler
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +54,7 @@ class AgentTaskRunner(TaskRunner):
         file_storage: FileStorage,
         mcp_repository: MCPRepository,
         search_engine: Optional[SearchEngine] = None,
+        max_steps: Optional[int] = None,
     ):
         self._session_id = session_id
         self._agent_id = agent_id
@@ -64,6 +68,9 @@ class AgentTaskRunner(TaskRunner):
         self._file_storage = file_storage
         self._mcp_repository = mcp_repository
         self._mcp_tool = MCPTool()
+        self._profiler = Profiler()
+        # One sync at a time per path, tool events and the file change feed may overlap
+        self._file_sync_locks: Dict[str, asyncio.Lock] = {}
         self._flow = PlanActFlow(
             self._agent_id,
             self._repository,
@@ -75,12 +82,16 @@ class AgentTaskRunner(TaskRunner):
             self._json_parser,
             self._mcp_tool,
             self._search_engine,
+            self._profiler,
+            max_steps,
         )
 
     async def _put_and_add_event(self, task: Task, event: AgentEvent) -> None:
-        event_id = await task.output_stream.put(event.model_dump_json())
+        with self._profiler.span("event_stream"):
+            event_id = await task.output_stream.put(event.model_dump_json())
         event.id = event_id
-        await self._session_repository.add_event(self._session_id, event)
+        with self._profiler.span("repository"):
+            await self._session_repository.add_event(self._session_id, event)
     
     async def _pop_event(self, task: Task) -> AgentEvent:
         event_id, event_str = await task.input_stream.pop()
@@ -92,25 +103,86 @@ class AgentTaskRunner(TaskRunner):
         return event
     
     async def _get_browser_screenshot(self) -> str:
-        screenshot = await self._browser.screenshot()
-        result = await self._file_storage.upload_file(screenshot, "screenshot.png")
+        with self._profiler.span("screenshot"):
+            screenshot = await self._browser.screenshot()
+            with self._profiler.span("storage"):
+                result = await self._file_storage.upload_file(screenshot, "screenshot.png")
         return result.file_id
 
-    async def _sync_file_to_storage(self, file_path: str) -> Optional[FileInfo]:
-        """Upload or update file and return FileInfo"""
+    async def _sync_file_to_storage(self, file_path: str, file_stat: Optional[ToolResult] = None) -> Optional[FileInfo]:
+        """Upload or update file and return FileInfo
+        
+        Files whose content hash matches the stored version are not transferred, and
+        content already in storage (from any session) is reused instead of uploaded.
+        
+        Args:
+            file_path: File path in sandbox
+            file_stat: Result of Sandbox.file_stat if already fetched
+        """
         try:
-            file_info = await self._session_repository.get_file_by_path(self._session_id, file_path)
-            file_data = await self._sandbox.file_download(file_path)
-            if file_info:
-                await self._session_repository.remove_file(self._session_id, file_info.file_id)
-            file_name = file_path.split("/")[-1]
-            file_info = await self._file_storage.upload_file(file_data, file_name)
-            file_info.file_path = file_path
-            await self._session_repository.add_file(self._session_id, file_info)
-            return file_info
+            lock = self._file_sync_locks.setdefault(file_path, asyncio.Lock())
+            async with lock, self._profiler.span("file_sync"):
+                if file_stat is None:
+                    with self._profiler.span("sandbox"):
+                        file_stat = await self._sandbox.file_stat(file_path)
+                # Sandboxes without the stat endpoint always get a full sync
+                content_hash = file_stat.data.get("sha256") if file_stat.success and file_stat.data else None
+                with self._profiler.span("repository"):
+                    file_info = await self._session_repository.get_file_by_path(self._session_id, file_path)
+                if content_hash and file_info and (file_info.metadata or {}).get("sha256") == content_hash:
+                    logger.debug(f"File {file_path} unchanged, skipping sync")
+                    return file_info
+                
+                file_name = file_path.split("/")[-1]
+                stored_info = None
+                if content_hash:
+                    with self._profiler.span("storage"):
+                        stored_info = await self._file_storage.link_file_by_hash(content_hash, file_name)
+                if stored_info:
+                    logger.debug(f"File {file_path} content already stored, linked as {stored_info.file_id}")
+                else:
+                    with self._profiler.span("sandbox"):
+                        file_data = await self._sandbox.file_download(file_path)
+                    # The download streams straight into storage, so the transfer is timed here
+                    with self._profiler.span("storage"):
+                        stored_info = await self._file_storage.upload_file(file_data, file_name)
+                stored_info.file_path = file_path
+                with self._profiler.span("repository"):
+                    if file_info:
+                        await self._session_repository.remove_file_by_path(self._session_id, file_path)
+                    await self._session_repository.add_file(self._session_id, stored_info)
+                return stored_info
         except Exception as e:
             logger.exception(f"Agent {self._agent_id} failed to sync file: {e}")
     
+    async def _follow_file_changes(self) -> None:
+        """Keep session files in storage up to date as they change in the sandbox
+        
+        Only files already synced to the session are updated, e.g. a report rewritten by
+        a shell command. When the feed lost changes, every session file is synced again.
+        Sandboxes without a file change feed rely on tool events alone.
+        """
+        try:
+            async for batch in self._sandbox.watch_files():
+                updated = {
+                    change.path for change in batch.changes
+                    if not change.is_dir and change.type in ("created", "modified")
+                }
+                if not updated and not batch.overflow:
+                    continue
+                session = await self._session_repository.find_by_id(self._session_id)
+                if not session:
+                    return
+                if batch.overflow:
+                    logger.info(f"Agent {self._agent_id} file change feed overflowed, resyncing {len(session.files)} files")
+                for file_info in session.files:
+                    if batch.overflow or file_info.file_path in updated:
+                        await self._sync_file_to_storage(file_info.file_path)
+        except ConnectionError as e:
+            logger.info(f"Agent {self._agent_id} file change feed unavailable: {e}")
+        except Exception as e:
+            logger.exception(f"Agent {self._agent_id} failed to follow file changes: {e}")
+    
     async def _sync_file_to_sandbox(self, file_id: str) -> Optional[FileInfo]:
         """Download file from storage to sandbox"""
         try:
@@ -128,8 +200,12 @@ class AgentTaskRunner(TaskRunner):
         attachments: List[FileInfo] = []
         try:
             if event.attachments:
-                for attachment in event.attachments:
-                    file_info = await self._sync_file_to_storage(attachment.file_path)
+                with self._profiler.span("sandbox"):
+                    file_stats = await self._sandbox.batch([
+                        SandboxOperation.file_stat(attachment.file_path) for attachment in event.attachments
+                    ])
+                for attachment, file_stat in zip(event.attachments, file_stats):
+                    file_info = await self._sync_file_to_storage(attachment.file_path, file_stat)
                     if file_info:
                         attachments.append(file_info)
             event.attachments = attachments
@@ -151,6 +227,21 @@ class AgentTaskRunner(TaskRunner):
             logger.exception(f"Agent {self._agent_id} failed to sync attachments to event: {e}")
     
 
+    async def _read_file_with_stat(self, file_path: str) -> Tuple[ToolResult, Optional[ToolResult]]:
+        """Read a file and stat it in one sandbox round trip
+
+        Returns:
+            File read result and file stat result, the stat is None if the batch did not return it
+        """
+        with self._profiler.span("sandbox"):
+            results = await self._sandbox.batch([
+                SandboxOperation.file_read(file_path),
+                SandboxOperation.file_stat(file_path),
+            ])
+        if not results:
+            return ToolResult(success=False, message=f"No result for reading {file_path}"), None
+        return results[0], results[1] if len(results) > 1 else None
+
     # TODO: refactor this function
     async def _gen_tool_content(self, event: ToolEvent):
         """Generate tool content"""
@@ -162,17 +253,18 @@ class AgentTaskRunner(TaskRunner):
                     event.tool_content = SearchToolContent(results=event.function_result.data.get("results", []))
                 elif event.tool_name == "shell":
                     if "id" in event.function_args:
-                        shell_result = await self._sandbox.view_shell(event.function_args["id"])
+                        with self._profiler.span("sandbox"):
+                            shell_result = await self._sandbox.view_shell(event.function_args["id"])
                         event.tool_content = ShellToolContent(console=shell_result.data.get("console", []))
                     else:
                         event.tool_content = ShellToolContent(console="(No Console)")
                 elif event.tool_name == "file":
                     if "file" in event.function_args:
                         file_path = event.function_args["file"]
-                        file_read_result = await self._sandbox.file_read(file_path)
-                        file_content: str = file_read_result.data.get("content", "")
+                        file_read_result, file_stat_result = await self._read_file_with_stat(file_path)
+                        file_content: str = (file_read_result.data or {}).get("content", "")
                         event.tool_content = FileToolContent(content=file_content)
-                        await self._sync_file_to_storage(file_path)
+                        await self._sync_file_to_storage(file_path, file_stat_result)
                     else:
                         event.tool_content = FileToolContent(content="(No Content)")
                 elif event.tool_name == "mcp":
@@ -203,9 +295,11 @@ class AgentTaskRunner(TaskRunner):
 
     async def run(self, task: Task) -> None:
         """Process agent's message queue and run the agent's flow"""
+        file_watch: Optional[asyncio.Task] = None
         try:
             logger.info(f"Agent {self._agent_id} message processing task started")
             await self._sandbox.ensure_sandbox()
+            file_watch = asyncio.create_task(self._follow_file_changes())
             await self._mcp_tool.initialized(await self._mcp_repository.get_mcp_config())
             while not await task.input_stream.is_empty():
                 event = await self._pop_event(task)
@@ -223,10 +317,12 @@ class AgentTaskRunner(TaskRunner):
                 async for event in self._run_flow(message, attachments):
                     await self._put_and_add_event(task, event)
                     if isinstance(event, TitleEvent):
-                        await self._session_repository.update_title(self._session_id, event.title)
+                        with self._profiler.span("repository"):
+                            await self._session_repository.update_title(self._session_id, event.title)
                     elif isinstance(event, MessageEvent):
-                        await self._session_repository.update_latest_message(self._session_id, event.message, event.timestamp)
-                        await self._session_repository.increment_unread_message_count(self._session_id)
+                        with self._profiler.span("repository"):
+                            await self._session_repository.update_latest_message(self._session_id, event.message, event.timestamp)
+                            await self._session_repository.increment_unread_message_count(self._session_id)
                     elif isinstance(event, WaitEvent):
                         await self._session_repository.update_status(self._session_id, SessionStatus.WAITING)
                         return
@@ -242,6 +338,9 @@ class AgentTaskRunner(TaskRunner):
             logger.exception(f"Agent {self._agent_id} task encountered exception: {str(e)}")
             await self._put_and_add_event(task, ErrorEvent(error=f"Task error: {str(e)}"))
             await self._session_repository.update_status(self._session_id, SessionStatus.COMPLETED)
+        finally:
+            if file_watch:
+                file_watch.cancel()
     
     async def _run_flow(self, message: str, attachments: List[str] = []) -> AsyncGenerator[BaseEvent, None]:
         """Process a single message through the agent's flow and yield events"""
@@ -253,7 +352,8 @@ class AgentTaskRunner(TaskRunner):
         async for event in self._flow.run(message, attachments):
             if isinstance(event, ToolEvent):
                 # TODO: move to tool function
-                await self._gen_tool_content(event)
+                with self._profiler.span("tool_content"):
+                    await self._gen_tool_content(event)
             elif isinstance(event, MessageEvent):
                 await self._sync_message_attachments_to_storage(event)
             yield event
@@ -1,13 +1,17 @@
 import json
 import logging
 import asyncio
+import functools
+import random
 import uuid
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, AsyncGenerator, Callable, Mapping, Tuple
 from app.domain.external.llm import LLM
 from app.domain.models.agent import Agent
 from app.domain.models.memory import Memory
 from app.domain.services.tools.base import BaseTool
+from app.domain.services.tools.cache import ToolResultCache
 from app.domain.models.tool_result import ToolResult
 from app.domain.events.agent_events import (
     BaseEvent,
@@ -19,6 +23,7 @@ from app.domain.events.agent_events import (
 )
 from app.domain.repositories.agent_repository import AgentRepository
 from app.domain.utils.json_parser import JsonParser
+from app.domain.utils.profiler import Profiler
 
 logger = logging.getLogger(__name__)
 class BaseAgent(ABC):
@@ -32,6 +37,9 @@ class BaseAgent(ABC):
     max_iterations: int = 100
     max_retries: int = 3
     retry_interval: float = 1.0
+    max_retry_interval: float = 10.0
+    # Errors caused by the call itself (bad arguments, unknown function), retrying cannot fix them
+    non_retryable_errors: Tuple[type, ...] = (ValueError, TypeError, KeyError, AttributeError, NotImplementedError)
     tool_choice: Optional[str] = None
 
     def __init__(
@@ -40,47 +48,101 @@ class BaseAgent(ABC):
         agent_repository: AgentRepository,
         llm: LLM,
         json_parser: JsonParser,
-        tools: List[BaseTool] = []
+        tools: List[BaseTool] = [],
+        tool_cache: Optional[ToolResultCache] = None,
+        profiler: Optional[Profiler] = None
     ):
         self._agent_id = agent_id
         self._repository = agent_repository
         self.llm = llm
         self.json_parser = json_parser
         self.tools = tools
+        self.tool_cache = tool_cache
+        self.profiler = profiler or Profiler()
         self.memory = None
+        # Function name -> (tool, callable), rebuilt only when a tool set version changes
+        self._tool_registry: Mapping[str, Tuple[BaseTool, Callable]] = MappingProxyType({})
+        self._tool_schemas: List[Dict[str, Any]] = []
+        self._tool_versions: Optional[Tuple[int, ...]] = None
+    
+    def _ensure_tool_registry(self) -> None:
+        """Build the function dispatch table and tool schemas once per tool set version"""
+        versions = tuple(tool.version for tool in self.tools)
+        if versions == self._tool_versions:
+            return
+        registry = {}
+        schemas = []
+        for tool in self.tools:
+            schemas.extend(tool.get_tools())
+            for function_name, function in tool.get_functions().items():
+                # First tool registering a function name wins, same as the previous linear scan
+                registry.setdefault(function_name, (tool, function))
+        self._tool_registry = MappingProxyType(registry)
+        self._tool_schemas = schemas
+        self._tool_versions = versions
+        logger.debug(f"Agent {self.name} tool registry built with {len(registry)} functions")
     
     def get_available_tools(self) -> Optional[List[Dict[str, Any]]]:
         """Get all available tools list"""
-        available_tools = []
-        for tool in self.tools:
-            available_tools.extend(tool.get_tools())
-        return available_tools
+        self._ensure_tool_registry()
+        return self._tool_schemas
     
     def get_tool(self, function_name: str) -> BaseTool:
         """Get specified tool"""
-        for tool in self.tools:
-            if tool.has_function(function_name):
-                return tool
-        raise ValueError(f"Unknown tool: {function_name}")
+        self._ensure_tool_registry()
+        entry = self._tool_registry.get(function_name)
+        if entry is None:
+            raise ValueError(f"Unknown tool: {function_name}")
+        return entry[0]
+
+    def _get_retry_delay(self, retries: int) -> float:
+        """Exponential backoff with jitter, so concurrent sessions don't retry in lockstep"""
+        delay = min(self.retry_interval * 2 ** (retries - 1), self.max_retry_interval)
+        return random.uniform(delay / 2, delay)
 
     async def invoke_tool(self, tool: BaseTool, function_name: str, arguments: Dict[str, Any]) -> ToolResult:
-        """Invoke specified tool, with retry mechanism"""
+        """Invoke specified tool, with deadline and retry mechanism
+
+        Each call is bounded by the function's timeout (or the tool's default timeout).
+        Timeouts and non-retryable errors fail immediately, other errors are retried with
+        jittered exponential backoff. Cancellation propagates into the running call.
+        """
 
+        self._ensure_tool_registry()
+        entry = self._tool_registry.get(function_name)
+        if entry is not None and entry[0] is tool:
+            function = entry[1]
+        else:
+            function = functools.partial(tool.invoke_function, function_name)
+
+        if self.tool_cache:
+            cached_result = self.tool_cache.get(tool.cache_scope, function_name, function, arguments)
+            if cached_result is not None:
+                return cached_result
+
+        timeout = getattr(function, "_tool_timeout", None) or tool.timeout
         retries = 0
-        while retries <= self.max_retries:
+        while True:
             try:
-                return await tool.invoke_function(function_name, **arguments)
+                result = await asyncio.wait_for(function(**arguments), timeout=timeout)
+                if self.tool_cache:
+                    self.tool_cache.put(tool.cache_scope, function_name, function, arguments, result)
+                return result
+            except (asyncio.TimeoutError, TimeoutError) as e:
+                last_error = str(e) or f"Tool execution timed out after {timeout} seconds"
+                logger.warning(f"Tool execution timed out, {function_name}, {arguments}: {last_error}")
+                break
             except Exception as e:
                 last_error = str(e)
-                retries += 1
-                if retries <= self.max_retries:
-                    await asyncio.sleep(self.retry_interval)
-                else:
+                if isinstance(e, self.non_retryable_errors) or retries >= self.max_retries:
                     logger.exception(f"Tool execution failed, {function_name}, {arguments}")
                     break
+                retries += 1
+                delay = self._get_retry_delay(retries)
+                logger.warning(f"Tool execution failed, {function_name}, retrying in {delay:.2f}s ({retries}/{self.max_retries}): {last_error}")
+                await asyncio.sleep(delay)
         
-        #raise ValueError(f"Tool execution failed, retried {self.max_retries} times: {last_error}")
-        return ToolResult(success=False, error=last_error)
+        return ToolResult(success=False, message=last_error)
     
     async def execute(self, request: str, format: Optional[str] = None) -> AsyncGenerator[BaseEvent, None]:
         format = format or self.format
@@ -95,7 +157,8 @@ class BaseAgent(ABC):
                 
                 function_name = tool_call["function"]["name"]
                 tool_call_id = tool_call["id"] or str(uuid.uuid4())
-                function_args = await self.json_parser.parse(tool_call["function"]["arguments"])
+                with self.profiler.span("json_parse"):
+                    function_args = await self.json_parser.parse(tool_call["function"]["arguments"])
                 
                 tool = self.get_tool(function_name)
 
@@ -108,7 +171,8 @@ class BaseAgent(ABC):
                     function_args=function_args
                 )
 
-                result = await self.invoke_tool(tool, function_name, function_args)
+                with self.profiler.span(f"tool.{tool.name}"):
+                    result = await self.invoke_tool(tool, function_name, function_args)
                 
                 # Generate event after tool call
                 yield ToolEvent(
@@ -135,7 +199,8 @@ class BaseAgent(ABC):
     
     async def _ensure_memory(self):
         if not self.memory:
-            self.memory = await self._repository.get_memory(self._agent_id, self.name)
+            with self.profiler.span("repository"):
+                self.memory = await self._repository.get_memory(self._agent_id, self.name)
     
     async def _add_to_memory(self, messages: List[Dict[str, Any]]) -> None:
         """Update memory and save to repository"""
@@ -145,7 +210,8 @@ class BaseAgent(ABC):
                 "role": "system", "content": self.system_prompt,
             })
         self.memory.add_messages(messages)
-        await self._repository.save_memory(self._agent_id, self.name, self.memory)
+        with self.profiler.span("repository"):
+            await self._repository.save_memory(self._agent_id, self.name, self.memory)
 
     async def ask_with_messages(self, messages: List[Dict[str, Any]], format: Optional[str] = None) -> Dict[str, Any]:
         await self._add_to_memory(messages)
@@ -154,10 +220,11 @@ class BaseAgent(ABC):
         if format:
             response_format = {"type": format}
 
-        message = await self.llm.ask(self.memory.get_messages(), 
-                                     tools=self.get_available_tools(), 
-                                     response_format=response_format,
-                                     tool_choice=self.tool_choice)
+        with self.profiler.span("llm"):
+            message = await self.llm.ask(self.memory.get_messages(), 
+                                         tools=self.get_available_tools(), 
+                                         response_format=response_format,
+                                         tool_choice=self.tool_choice)
         if message.get("tool_calls"):
             message["tool_calls"] = message["tool_calls"][:1]
         await self._add_to_memory([message])
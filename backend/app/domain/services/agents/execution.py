@@ -21,13 +21,17 @@ from app.domain.events.agent_events import (
     WaitEvent,
 )
 from app.domain.services.tools.base import BaseTool
+from app.domain.services.tools.cache import ToolResultCache
+from app.domain.utils.profiler import Profiler
 from app.domain.services.tools.shell import ShellTool
 from app.domain.services.tools.browser import BrowserTool
 from app.domain.services.tools.search import SearchTool
 from app.domain.services.tools.file import FileTool
 from app.domain.services.tools.message import MessageTool
 from app.domain.utils.json_parser import JsonParser
+from app.domain.models.timing import Timing
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -47,28 +51,39 @@ class ExecutionAgent(BaseAgent):
         llm: LLM,
         tools: List[BaseTool],
         json_parser: JsonParser,
+        tool_cache: Optional[ToolResultCache] = None,
+        profiler: Optional[Profiler] = None,
     ):
         super().__init__(
             agent_id=agent_id,
             agent_repository=agent_repository,
             llm=llm,
             json_parser=json_parser,
-            tools=tools
+            tools=tools,
+            tool_cache=tool_cache,
+            profiler=profiler,
         )
     
+    def _collect_step_timing(self, started: float) -> Timing:
+        """Collect spans recorded during the step, plus the step wall time"""
+        self.profiler.record("step", (time.perf_counter() - started) * 1000)
+        return self.profiler.collect()
+
     async def execute_step(self, plan: Plan, step: Step, message: str = "", attachments: List[str] = []) -> AsyncGenerator[BaseEvent, None]:
         message = EXECUTION_PROMPT.format(goal=plan.goal, step=step.description, message=message, attachments=attachments)
         step.status = ExecutionStatus.RUNNING
+        started = time.perf_counter()
         yield StepEvent(status=StepStatus.STARTED, step=step)
         async for event in self.execute(message):
             if isinstance(event, ErrorEvent):
                 step.status = ExecutionStatus.FAILED
                 step.error = event.error
-                yield StepEvent(status=StepStatus.FAILED, step=step)
+                yield StepEvent(status=StepStatus.FAILED, step=step, timing=self._collect_step_timing(started))
+                started = time.perf_counter()
             elif isinstance(event, MessageEvent):
                 step.status = ExecutionStatus.COMPLETED
                 step.result = event.message
-                yield StepEvent(status=StepStatus.COMPLETED, step=step)
+                yield StepEvent(status=StepStatus.COMPLETED, step=step, timing=self._collect_step_timing(started))
             elif isinstance(event, ToolEvent):
                 if event.function_name == "message_ask_user":
                     if event.status == ToolStatus.CALLING:
@@ -20,6 +20,8 @@ from app.domain.events.agent_events import (
 )
 from app.domain.external.sandbox import Sandbox
 from app.domain.services.tools.base import BaseTool
+from app.domain.services.tools.cache import ToolResultCache
+from app.domain.utils.profiler import Profiler
 from app.domain.services.tools.file import FileTool
 from app.domain.services.tools.shell import ShellTool
 from app.domain.repositories.agent_repository import AgentRepository
@@ -44,6 +46,8 @@ class PlannerAgent(BaseAgent):
         llm: LLM,
         tools: List[BaseTool],
         json_parser: JsonParser,
+        tool_cache: Optional[ToolResultCache] = None,
+        profiler: Optional[Profiler] = None,
     ):
         super().__init__(
             agent_id=agent_id,
@@ -51,6 +55,8 @@ class PlannerAgent(BaseAgent):
             llm=llm,
             json_parser=json_parser,
             tools=tools,
+            tool_cache=tool_cache,
+            profiler=profiler,
         )
 
 
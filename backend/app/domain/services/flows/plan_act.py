@@ -10,6 +10,9 @@ from app.domain.events.agent_events import (
     MessageEvent,
     DoneEvent,
     TitleEvent,
+    ErrorEvent,
+    StepEvent,
+    StepStatus,
 )
 from app.domain.models.plan import ExecutionStatus
 from app.domain.services.agents.planner import PlannerAgent
@@ -21,6 +24,7 @@ from app.domain.external.search import SearchEngine
 from app.domain.external.file import FileStorage
 from app.domain.repositories.agent_repository import AgentRepository
 from app.domain.utils.json_parser import JsonParser
+from app.domain.utils.profiler import Profiler
 from app.domain.repositories.session_repository import SessionRepository
 from app.domain.models.session import SessionStatus
 from app.domain.services.tools.mcp import MCPTool
@@ -29,6 +33,7 @@ from app.domain.services.tools.browser import BrowserTool
 from app.domain.services.tools.file import FileTool
 from app.domain.services.tools.message import MessageTool
 from app.domain.services.tools.search import SearchTool
+from app.domain.services.tools.cache import ToolResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +46,9 @@ class AgentStatus(str, Enum):
     UPDATING = "updating"
 
 class PlanActFlow(BaseFlow):
+    # Default step budget of one plan, bounds runaway plan/update loops
+    max_steps: int = 50
+
     def __init__(
         self,
         agent_id: str,
@@ -53,6 +61,8 @@ class PlanActFlow(BaseFlow):
         json_parser: JsonParser,
         mcp_tool: MCPTool,
         search_engine: Optional[SearchEngine] = None,
+        profiler: Optional[Profiler] = None,
+        max_steps: Optional[int] = None,
     ):
         self._agent_id = agent_id
         self._repository = agent_repository
@@ -60,6 +70,8 @@ class PlanActFlow(BaseFlow):
         self._session_repository = session_repository
         self.status = AgentStatus.IDLE
         self.plan = None
+        if max_steps is not None:
+            self.max_steps = max_steps
 
         tools = [
             ShellTool(sandbox),
@@ -73,6 +85,10 @@ class PlanActFlow(BaseFlow):
         if search_engine:
             tools.append(SearchTool(search_engine))
 
+        # Tool results are shared by both agents of this session
+        self.tool_cache = ToolResultCache()
+        self.profiler = profiler or Profiler()
+
         # Create planner and execution agents
         self.planner = PlannerAgent(
             agent_id=self._agent_id,
@@ -80,6 +96,8 @@ class PlanActFlow(BaseFlow):
             llm=llm,
             tools=tools,
             json_parser=json_parser,
+            tool_cache=self.tool_cache,
+            profiler=self.profiler,
         )
         logger.debug(f"Created planner agent for Agent {self._agent_id}")
             
@@ -89,6 +107,8 @@ class PlanActFlow(BaseFlow):
             llm=llm,
             tools=tools,
             json_parser=json_parser,
+            tool_cache=self.tool_cache,
+            profiler=self.profiler,
         )
         logger.debug(f"Created execution agent for Agent {self._agent_id}")
 
@@ -117,13 +137,21 @@ class PlanActFlow(BaseFlow):
 
         logger.info(f"Agent {self._agent_id} started processing message: {message[:50]}...")
         step = None
+        # A resumed plan keeps counting the steps it already started
+        executed_steps = 0
+        for event in session.events:
+            if isinstance(event, PlanEvent) and event.status == PlanStatus.CREATED:
+                executed_steps = 0
+            elif isinstance(event, StepEvent) and event.status == StepStatus.STARTED:
+                executed_steps += 1
         while True:
             if self.status == AgentStatus.IDLE:
                 logger.info(f"Agent {self._agent_id} state changed from {AgentStatus.IDLE} to {AgentStatus.PLANNING}")
                 self.status = AgentStatus.PLANNING
             elif self.status == AgentStatus.PLANNING:
-                # Create plan
+                # Create plan, a new plan gets a fresh step budget
                 logger.info(f"Agent {self._agent_id} started creating plan")
+                executed_steps = 0
                 async for event in self.planner.create_plan(message, attachments):
                     if isinstance(event, PlanEvent) and event.status == PlanStatus.CREATED:
                         self.plan = event.plan
@@ -145,6 +173,12 @@ class PlanActFlow(BaseFlow):
                     logger.info(f"Agent {self._agent_id} has no more steps, state changed from {AgentStatus.EXECUTING} to {AgentStatus.COMPLETED}")
                     self.status = AgentStatus.CONCLUDING
                     continue
+                if executed_steps >= self.max_steps:
+                    logger.warning(f"Agent {self._agent_id} exhausted step budget of {self.max_steps}, state changed from {AgentStatus.EXECUTING} to {AgentStatus.CONCLUDING}")
+                    yield ErrorEvent(error=f"Step budget of {self.max_steps} steps exhausted, concluding with partial results")
+                    self.status = AgentStatus.CONCLUDING
+                    continue
+                executed_steps += 1
                 # Execute step
                 logger.info(f"Agent {self._agent_id} started executing step {step.id}: {step.description[:50]}...")
                 async for event in self.executor.execute_step(self.plan, step, message, attachments):
@@ -173,7 +207,7 @@ class PlanActFlow(BaseFlow):
                 break
         yield DoneEvent()
         
-        logger.info(f"Agent {self._agent_id} message processing completed")
+        logger.info(f"Agent {self._agent_id} message processing completed, tool cache stats: {self.tool_cache.get_stats()}")
     
     def is_done(self) -> bool:
         return self.status == AgentStatus.IDLE
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Awaitable, Optional
 import inspect
 from app.domain.models.tool_result import ToolResult
 
@@ -6,7 +6,11 @@ def tool(
     name: str, 
     description: str,
     parameters: Dict[str, Dict[str, Any]],
-    required: List[str]
+    required: List[str],
+    idempotent: bool = False,
+    path_args: Optional[List[str]] = None,
+    invalidates: bool = False,
+    timeout: Optional[float] = None
 ) -> Callable:
     """Tool registration decorator
     
@@ -15,6 +19,13 @@ def tool(
         description: Tool description
         parameters: Tool parameter definitions
         required: List of required parameters
+        idempotent: Whether repeated calls with the same arguments return the same result,
+            making the result cacheable until invalidated
+        path_args: Names of parameters holding sandbox paths the function reads or writes
+        invalidates: Whether the function changes state seen by idempotent functions.
+            Invalidates cached results for path_args, or every result of the tool's
+            cache scope when no path_args are given
+        timeout: Deadline in seconds for a single call, overrides the tool's default timeout
         
     Returns:
         Decorator function
@@ -38,6 +49,10 @@ def tool(
         func._function_name = name
         func._tool_description = description
         func._tool_schema = schema
+        func._tool_idempotent = idempotent
+        func._tool_path_args = path_args or []
+        func._tool_invalidates = invalidates
+        func._tool_timeout = timeout
         
         return func
     
@@ -47,10 +62,41 @@ class BaseTool:
     """Base tool class, providing common tool calling methods"""
 
     name: str = ""
+    # Scope shared by tools whose results depend on the same state, None disables result caching
+    cache_scope: Optional[str] = None
+    # Default deadline in seconds for a single function call, None disables the deadline
+    timeout: Optional[float] = 120
     
     def __init__(self):
         """Initialize base tool class"""
         self._tools_cache = None
+        self._functions_cache = None
+    
+    @property
+    def version(self) -> int:
+        """Version of the tool set, changes whenever the available functions change
+        
+        Returns:
+            Tool set version
+        """
+        return 0
+    
+    def get_functions(self) -> Dict[str, Callable[..., Awaitable[ToolResult]]]:
+        """Get function name to bound method mapping, built once per instance
+        
+        Returns:
+            Mapping of function name to callable
+        """
+        if self._functions_cache is not None:
+            return self._functions_cache
+        
+        functions = {}
+        for _, method in inspect.getmembers(self, inspect.ismethod):
+            if hasattr(method, '_function_name'):
+                functions[method._function_name] = method
+        
+        self._functions_cache = functions
+        return functions
     
     def get_tools(self) -> List[Dict[str, Any]]:
         """Get all registered tools
@@ -61,13 +107,8 @@ class BaseTool:
         if self._tools_cache is not None:
             return self._tools_cache
         
-        tools = []
-        for _, method in inspect.getmembers(self, inspect.ismethod):
-            if hasattr(method, '_tool_schema'):
-                tools.append(method._tool_schema)
-        
-        self._tools_cache = tools
-        return tools
+        self._tools_cache = [method._tool_schema for method in self.get_functions().values()]
+        return self._tools_cache
     
     def has_function(self, function_name: str) -> bool:
         """Check if specified function exists
@@ -78,10 +119,7 @@ class BaseTool:
         Returns:
             Whether the tool exists
         """
-        for _, method in inspect.getmembers(self, inspect.ismethod):
-            if hasattr(method, '_function_name') and method._function_name == function_name:
-                return True
-        return False
+        return function_name in self.get_functions()
     
     async def invoke_function(self, function_name: str, **kwargs) -> ToolResult:
         """Invoke specified tool
@@ -96,8 +134,7 @@ class BaseTool:
         Raises:
             ValueError: Raised when tool doesn't exist
         """
-        for _, method in inspect.getmembers(self, inspect.ismethod):
-            if hasattr(method, '_function_name') and method._function_name == function_name:
-                return await method(**kwargs)
-        
-        raise ValueError(f"Tool '{function_name}' not found") 
\ No newline at end of file
+        method = self.get_functions().get(function_name)
+        if method is None:
+            raise ValueError(f"Tool '{function_name}' not found")
+        return await method(**kwargs)
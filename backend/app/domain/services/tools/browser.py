@@ -7,6 +7,9 @@ class BrowserTool(BaseTool):
     """Browser tool class, providing browser interaction functions"""
 
     name: str = "browser"
+    # The browser runs in the sandbox, pages can download files into it
+    cache_scope = "sandbox"
+    timeout = 60
     
     def __init__(self, browser: Browser):
         """Initialize browser tool class
@@ -40,7 +43,8 @@ class BrowserTool(BaseTool):
                 "description": "Complete URL to visit. Must include protocol prefix."
             }
         },
-        required=["url"]
+        required=["url"],
+        invalidates=True
     )
     async def browser_navigate(self, url: str) -> ToolResult:
         """Navigate browser to specified URL
@@ -62,7 +66,8 @@ class BrowserTool(BaseTool):
                 "description": "Complete URL to visit after restart. Must include protocol prefix."
             }
         },
-        required=["url"]
+        required=["url"],
+        invalidates=True
     )
     async def browser_restart(self, url: str) -> ToolResult:
         """Restart browser and navigate to specified URL
@@ -92,7 +97,8 @@ class BrowserTool(BaseTool):
                 "description": "(Optional) Y coordinate of click position"
             }
         },
-        required=[]
+        required=[],
+        invalidates=True
     )
     async def browser_click(
         self,
@@ -137,7 +143,8 @@ class BrowserTool(BaseTool):
                 "description": "Whether to press Enter key after input"
             }
         },
-        required=["text", "press_enter"]
+        required=["text", "press_enter"],
+        invalidates=True
     )
     async def browser_input(
         self,
@@ -201,7 +208,8 @@ class BrowserTool(BaseTool):
                 "description": "Key name to simulate (e.g., Enter, Tab, ArrowUp), supports key combinations (e.g., Control+Enter)."
             }
         },
-        required=["key"]
+        required=["key"],
+        invalidates=True
     )
     async def browser_press_key(
         self,
@@ -307,7 +315,8 @@ class BrowserTool(BaseTool):
                 "description": "JavaScript code to execute. Note that the runtime environment is browser console."
             }
         },
-        required=["javascript"]
+        required=["javascript"],
+        invalidates=True
     )
     async def browser_console_exec(
         self,
@@ -0,0 +1,176 @@
+import json
+import time
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from pydantic import BaseModel
+from app.domain.models.tool_result import ToolResult
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses of shell results whose process is still running, or has ended
+RUNNING_STATUSES = ("running", "output")
+FINISHED_STATUSES = ("completed", "terminated", "already_terminated")
+
+
+class ToolCacheStats(BaseModel):
+    """Tool result cache statistics for a single function"""
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _CacheEntry:
+    __slots__ = ("scope", "generation", "paths", "result")
+
+    def __init__(self, scope: str, generation: int, paths: List[str], result: ToolResult):
+        self.scope = scope
+        self.generation = generation
+        self.paths = paths
+        self.result = result
+
+
+def _is_under(path: str, dependency: str) -> bool:
+    """Whether path is the dependency itself or inside the dependency directory"""
+    if path == dependency:
+        return True
+    return path.startswith(dependency.rstrip("/") + "/")
+
+
+class ToolResultCache:
+    """Per-session cache of idempotent tool results
+
+    Results are keyed by (function name, normalized arguments). Writes invalidate
+    entries depending on the written paths, and state-changing functions without
+    paths (e.g. shell commands) bump a per-scope generation that invalidates every
+    entry of that scope. While a state-changing call leaves a process running in
+    the background (its result reports status "running"), the scope is held and
+    nothing is served from or stored in the cache until the next call for that
+    process reports it is no longer running, or the hold expires after hold_ttl
+    seconds (the agent may never check on the process again).
+    """
+
+    def __init__(self, max_entries: int = 256, hold_ttl: float = 300):
+        self._max_entries = max_entries
+        self._hold_ttl = hold_ttl
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._generations: Dict[str, int] = defaultdict(int)
+        # Scope -> identifier of each background process that may still change state -> hold time
+        self._holds: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._stats: Dict[str, ToolCacheStats] = defaultdict(ToolCacheStats)
+
+    @staticmethod
+    def _make_key(function_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        """Build cache key from function name and normalized arguments"""
+        normalized = {k: v for k, v in arguments.items() if v is not None}
+        return function_name, json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _get_paths(function: Callable, arguments: Dict[str, Any]) -> List[str]:
+        """Get sandbox paths referenced by the function arguments"""
+        paths = []
+        for arg in getattr(function, "_tool_path_args", []):
+            value = arguments.get(arg)
+            if isinstance(value, str) and value:
+                paths.append(value)
+        return paths
+
+    @staticmethod
+    def is_cacheable(function: Callable) -> bool:
+        return getattr(function, "_tool_idempotent", False)
+
+    def get(self, scope: Optional[str], function_name: str, function: Callable, arguments: Dict[str, Any]) -> Optional[ToolResult]:
+        """Get cached result for an idempotent function call
+
+        Returns:
+            Cached tool result, None on miss or for non-cacheable functions
+        """
+        if scope is None or not self.is_cacheable(function):
+            return None
+        key = self._make_key(function_name, arguments)
+        entry = self._entries.get(key)
+        stats = self._stats[function_name]
+        if self._is_held(scope):
+            stats.misses += 1
+            return None
+        if entry is None or entry.generation != self._generations[scope]:
+            if entry is not None:
+                del self._entries[key]
+            stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        stats.hits += 1
+        logger.debug(f"Tool cache hit for {function_name} (hit rate {stats.hit_rate:.0%})")
+        return entry.result.model_copy(deep=True)
+
+    def put(self, scope: Optional[str], function_name: str, function: Callable, arguments: Dict[str, Any], result: ToolResult) -> None:
+        """Store a successful idempotent result, or apply invalidation for state-changing functions"""
+        if scope is None:
+            return
+        if getattr(function, "_tool_invalidates", False):
+            paths = self._get_paths(function, arguments)
+            if paths:
+                self.invalidate_paths(paths)
+            else:
+                self.invalidate_scope(scope)
+            self._update_holds(scope, arguments, result)
+            return
+        if not self.is_cacheable(function) or not result.success or self._is_held(scope):
+            return
+        key = self._make_key(function_name, arguments)
+        self._entries[key] = _CacheEntry(
+            scope=scope,
+            generation=self._generations[scope],
+            paths=self._get_paths(function, arguments),
+            result=result.model_copy(deep=True),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _update_holds(self, scope: str, arguments: Dict[str, Any], result: ToolResult) -> None:
+        """Track background processes left running by state-changing calls"""
+        if not result.success or not isinstance(result.data, dict):
+            return
+        process_id = str(arguments.get("id", ""))
+        status = result.data.get("status")
+        if status in RUNNING_STATUSES:
+            self._holds[scope][process_id] = time.monotonic()
+        elif result.data.get("returncode") is not None or status in FINISHED_STATUSES:
+            self._holds[scope].pop(process_id, None)
+
+    def _is_held(self, scope: str) -> bool:
+        """Whether a background process of the scope may still change state, dropping expired holds"""
+        holds = self._holds[scope]
+        expired = [pid for pid, since in holds.items() if time.monotonic() - since >= self._hold_ttl]
+        for process_id in expired:
+            logger.debug(f"Tool cache hold on process {process_id} expired")
+            del holds[process_id]
+        return bool(holds)
+
+    def invalidate_paths(self, paths: List[str]) -> None:
+        """Drop entries that depend on any of the given paths"""
+        stale = [
+            key for key, entry in self._entries.items()
+            if any(_is_under(path, dependency) for path in paths for dependency in entry.paths)
+        ]
+        for key in stale:
+            del self._entries[key]
+            self._stats[key[0]].invalidations += 1
+
+    def invalidate_scope(self, scope: str) -> None:
+        """Invalidate every entry of a scope by bumping its generation"""
+        self._generations[scope] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss statistics per function"""
+        return {
+            function_name: {**stats.model_dump(), "hit_rate": round(stats.hit_rate, 4)}
+            for function_name, stats in self._stats.items()
+        }
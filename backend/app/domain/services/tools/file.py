@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from app.domain.external.sandbox import Sandbox
 from app.domain.services.tools.base import tool, BaseTool
 from app.domain.models.tool_result import ToolResult
@@ -7,6 +7,8 @@ class FileTool(BaseTool):
     """File tool class, providing file operation functions"""
 
     name: str = "file"
+    cache_scope = "sandbox"
+    timeout = 60
     
     def __init__(self, sandbox: Sandbox):
         """Initialize file tool class
@@ -33,18 +35,25 @@ class FileTool(BaseTool):
                 "type": "integer",
                 "description": "(Optional) Ending line number (exclusive)"
             },
+            "tail_lines": {
+                "type": "integer",
+                "description": "(Optional) Read only the last N lines, e.g. of a large log file. Overrides start_line and end_line"
+            },
             "sudo": {
                 "type": "boolean",
                 "description": "(Optional) Whether to use sudo privileges"
             }
         },
-        required=["file"]
+        required=["file"],
+        idempotent=True,
+        path_args=["file"]
     )
     async def file_read(
         self,
         file: str,
         start_line: Optional[int] = None,
         end_line: Optional[int] = None,
+        tail_lines: Optional[int] = None,
         sudo: Optional[bool] = False
     ) -> ToolResult:
         """Read file content
@@ -53,6 +62,7 @@ class FileTool(BaseTool):
             file: Absolute path of the file to read
             start_line: (Optional) Starting line, 0-based
             end_line: (Optional) Ending line (exclusive)
+            tail_lines: (Optional) Read the last N lines instead of a line range
             sudo: (Optional) Whether to use sudo privileges
             
         Returns:
@@ -63,7 +73,8 @@ class FileTool(BaseTool):
             file=file,
             start_line=start_line,
             end_line=end_line,
-            sudo=sudo
+            sudo=sudo,
+            tail_lines=tail_lines
         )
     
     @tool(
@@ -95,7 +106,9 @@ class FileTool(BaseTool):
                 "description": "(Optional) Whether to use sudo privileges"
             }
         },
-        required=["file", "content"]
+        required=["file", "content"],
+        path_args=["file"],
+        invalidates=True
     )
     async def file_write(
         self,
@@ -157,7 +170,9 @@ class FileTool(BaseTool):
                 "description": "(Optional) Whether to use sudo privileges"
             }
         },
-        required=["file", "old_str", "new_str"]
+        required=["file", "old_str", "new_str"],
+        path_args=["file"],
+        invalidates=True
     )
     async def file_str_replace(
         self,
@@ -202,7 +217,9 @@ class FileTool(BaseTool):
                 "description": "(Optional) Whether to use sudo privileges"
             }
         },
-        required=["file", "regex"]
+        required=["file", "regex"],
+        idempotent=True,
+        path_args=["file"]
     )
     async def file_find_in_content(
         self,
@@ -227,6 +244,72 @@ class FileTool(BaseTool):
             sudo=sudo
         )
     
+    @tool(
+        name="file_grep",
+        description="Search file contents recursively under a directory with a regular expression, like grep -rn. Skips binary files and directories such as .git and node_modules. Use instead of running grep in the shell.",
+        parameters={
+            "path": {
+                "type": "string",
+                "description": "Absolute path of the directory (or single file) to search"
+            },
+            "regex": {
+                "type": "string",
+                "description": "Regular expression pattern matched against each line"
+            },
+            "include": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "(Optional) Only search files matching these glob patterns, e.g. [\"*.py\"]"
+            },
+            "context_lines": {
+                "type": "integer",
+                "description": "(Optional) Lines of context to return before and after each match"
+            },
+            "max_results": {
+                "type": "integer",
+                "description": "(Optional) Maximum number of matches to return, defaults to 200"
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "(Optional) Whether to match case-insensitively"
+            }
+        },
+        required=["path", "regex"],
+        idempotent=True,
+        path_args=["path"]
+    )
+    async def file_grep(
+        self,
+        path: str,
+        regex: str,
+        include: Optional[List[str]] = None,
+        context_lines: Optional[int] = 0,
+        max_results: Optional[int] = 200,
+        ignore_case: Optional[bool] = False
+    ) -> ToolResult:
+        """Search file contents recursively under a directory
+        
+        Args:
+            path: Absolute path of the directory or file to search
+            regex: Regular expression pattern matched against each line
+            include: (Optional) Glob patterns of files to search
+            context_lines: (Optional) Lines of context around each match
+            max_results: (Optional) Maximum number of matches
+            ignore_case: (Optional) Whether to match case-insensitively
+            
+        Returns:
+            Matching lines with file paths and 0-based line numbers
+        """
+        # Directly call sandbox's file_grep method
+        return await self.sandbox.file_grep(
+            path=path,
+            regex=regex,
+            include=include,
+            context_lines=context_lines or 0,
+            max_results=max_results or 200,
+            ignore_case=bool(ignore_case)
+        )
+    
     @tool(
         name="file_find_by_name",
         description="Find files by name pattern in specified directory. Use for locating files with specific naming patterns.",
@@ -237,27 +320,36 @@ class FileTool(BaseTool):
             },
             "glob": {
                 "type": "string",
-                "description": "Filename pattern using glob syntax wildcards"
+                "description": "Filename pattern using glob syntax wildcards, ** matches any number of directories"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "(Optional) next_cursor of a previous truncated result, to get the next page of files"
             }
         },
-        required=["path", "glob"]
+        required=["path", "glob"],
+        idempotent=True,
+        path_args=["path"]
     )
     async def file_find_by_name(
         self,
         path: str,
-        glob: str
+        glob: str,
+        cursor: Optional[str] = None
     ) -> ToolResult:
         """Find files by name pattern in specified directory
         
         Args:
             path: Absolute path of directory to search
             glob: Filename pattern using glob syntax wildcards
+            cursor: (Optional) next_cursor of a previous truncated result
             
         Returns:
-            Search results
+            Search results, with next_cursor when truncated
         """
         # Directly call sandbox's file_find method
         return await self.sandbox.file_find(
             path=path,
-            glob_pattern=glob
+            glob_pattern=glob,
+            cursor=cursor
         ) 
\ No newline at end of file
@@ -1,6 +1,8 @@
 import os
 import logging
-from typing import Dict, Any, List, Optional
+from datetime import timedelta
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
@@ -23,6 +25,8 @@ class MCPClientManager:
         self._clients: Dict[str, ClientSession] = {}
         self._exit_stack = AsyncExitStack()
         self._tools_cache: Dict[str, List[MCPTool]] = {}
+        # 工具名称 -> (服务器名称, 原始工具名称)
+        self._tool_index: Dict[str, Tuple[str, str]] = {}
         self._initialized = False
         self._config = config
     
@@ -229,6 +233,7 @@ class MCPClientManager:
                     tool_name = f"{server_name}_{tool.name}"
                 else:
                     tool_name = f"mcp_{server_name}_{tool.name}"
+                self._tool_index[tool_name] = (server_name, tool.name)
                 
                 # 转换为标准工具格式
                 tool_schema = {
@@ -243,20 +248,36 @@ class MCPClientManager:
         
         return all_tools
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> ToolResult:
-        """调用 MCP 工具"""
-        try:
-            # 解析工具名称
-            server_name = None
-            original_tool_name = None
-            
-            # 查找匹配的服务器名称
+    def _resolve_tool(self, tool_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """将工具名称解析为 (服务器名称, 原始工具名称)"""
+        # 优先从工具索引解析工具名称
+        server_name, original_tool_name = self._tool_index.get(tool_name, (None, None))
+        
+        # 索引未命中时查找匹配的服务器名称
+        if not server_name:
             for srv_name in self._config.mcpServers.keys():
                 expected_prefix = srv_name if srv_name.startswith('mcp_') else f"mcp_{srv_name}"
                 if tool_name.startswith(f"{expected_prefix}_"):
                     server_name = srv_name
                     original_tool_name = tool_name[len(expected_prefix) + 1:]
                     break
+        return server_name, original_tool_name
+
+    def get_server_timeout(self, tool_name: str) -> Optional[float]:
+        """获取工具所属服务器配置的超时时间，未配置时返回 None"""
+        server_name, _ = self._resolve_tool(tool_name)
+        if not server_name or server_name not in self._config.mcpServers:
+            return None
+        return self._config.mcpServers[server_name].timeout
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> ToolResult:
+        """调用 MCP 工具
+
+        超时优先使用服务器配置的 timeout，其次使用调用方传入的 timeout；
+        调用方取消时会将取消传递到正在进行的请求。
+        """
+        try:
+            server_name, original_tool_name = self._resolve_tool(tool_name)
             
             if not server_name or not original_tool_name:
                 raise ValueError(f"无法解析 MCP 工具名称: {tool_name}")
@@ -269,8 +290,10 @@ class MCPClientManager:
                     message=f"MCP 服务器 {server_name} 未连接"
                 )
             
-            # 调用工具
-            result = await session.call_tool(original_tool_name, arguments)
+            # 调用工具，带读取超时
+            server_timeout = self._config.mcpServers[server_name].timeout or timeout
+            read_timeout = timedelta(seconds=server_timeout) if server_timeout else None
+            result = await session.call_tool(original_tool_name, arguments, read_timeout_seconds=read_timeout)
             
             # 处理结果
             if result:
@@ -305,6 +328,7 @@ class MCPClientManager:
             await self._exit_stack.aclose()
             self._clients.clear()
             self._tools_cache.clear()
+            self._tool_index.clear()
             self._initialized = False
             logger.info("MCP 客户端管理器已清理")
             
@@ -321,32 +345,54 @@ class MCPTool(BaseTool):
         super().__init__()
         self._initialized = False
         self._tools = []
+        self._version = 0
+        self.manager = None
     
     async def initialized(self, config: Optional[MCPConfig] = None):
         """确保管理器已初始化"""
         if not self._initialized:
             self.manager = MCPClientManager(config)
             await self.manager.initialize()
-            self._tools = await self.manager.get_all_tools()
+            self._set_tools(await self.manager.get_all_tools())
             self._initialized = True
 
+    def _set_tools(self, tools: List[Dict[str, Any]]):
+        """更新动态工具集并使函数注册表失效"""
+        self._tools = tools
+        self._functions_cache = None
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """工具集版本，MCP 工具集变化时递增"""
+        return self._version
+
     def get_tools(self) -> List[Dict[str, Any]]:
         """获取同步工具定义（基础工具）"""
         return self._tools
 
-    def has_function(self, function_name: str) -> bool:
-        """检查指定函数是否存在（包括动态 MCP 工具）"""
-        # 检查是否是 MCP 工具
-        for tool in self._tools:
-            if tool['function']['name'] == function_name:
-                return True
-        return False
+    def get_functions(self) -> Dict[str, Callable[..., Awaitable[ToolResult]]]:
+        """获取函数名称到调用函数的映射（包括动态 MCP 工具）"""
+        if self._functions_cache is None:
+            functions = {}
+            for tool in self._tools:
+                name = tool['function']['name']
+                function = partial(self.invoke_function, name)
+                # 服务器配置的超时可能长于工具默认超时，外层 wait_for 不能先于它触发
+                server_timeout = self.manager.get_server_timeout(name) if self.manager else None
+                if server_timeout:
+                    function._tool_timeout = max(server_timeout, self.timeout or 0)
+                functions[name] = function
+            self._functions_cache = functions
+        return self._functions_cache
     
     async def invoke_function(self, function_name: str, **kwargs) -> ToolResult:
         """调用工具函数"""
-        return await self.manager.call_tool(function_name, kwargs)
+        return await self.manager.call_tool(function_name, kwargs, timeout=self.timeout)
     
     async def cleanup(self):
         """清理资源"""
         if self.manager:
-            await self.manager.cleanup() 
+            await self.manager.cleanup()
+            self._set_tools([])
+            self._initialized = False
@@ -7,6 +7,8 @@ class SearchTool(BaseTool):
     """Search tool class, providing search engine interaction functions"""
 
     name: str = "search"
+    cache_scope = "search"
+    timeout = 30
     
     def __init__(self, search_engine: SearchEngine):
         """Initialize search tool class
@@ -31,7 +33,8 @@ class SearchTool(BaseTool):
                 "description": "(Optional) Time range filter for search results."
             }
         },
-        required=["query"]
+        required=["query"],
+        idempotent=True
     )
     async def info_search_web(
         self,
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from app.domain.external.sandbox import Sandbox
 from app.domain.services.tools.base import tool, BaseTool
 from app.domain.models.tool_result import ToolResult
@@ -7,6 +7,9 @@ class ShellTool(BaseTool):
     """Shell tool class, providing Shell interaction related functions"""
 
     name: str = "shell"
+    # Shell commands can change any file, so every call invalidates the whole sandbox scope
+    cache_scope = "sandbox"
+    timeout = 60
     
     def __init__(self, sandbox: Sandbox):
         """Initialize Shell tool class
@@ -16,6 +19,14 @@ class ShellTool(BaseTool):
         """
         super().__init__()
         self.sandbox = sandbox
+        # End offset of the output last returned per session, shell_wait returns on output after it
+        self._seen_offsets: Dict[str, int] = {}
+    
+    def _track_offset(self, id: str, result: ToolResult) -> ToolResult:
+        """Remember how far the output of the session's current command has been seen"""
+        if result.success and isinstance(result.data, dict) and "end_offset" in result.data:
+            self._seen_offsets[id] = result.data["end_offset"]
+        return result
         
     @tool(
         name="shell_exec",
@@ -27,14 +38,15 @@ class ShellTool(BaseTool):
             },
             "exec_dir": {
                 "type": "string",
-                "description": "Working directory for command execution (must use absolute path)"
+                "description": "Working directory for command execution (must use absolute path). The session keeps the directory a previous `cd` moved to, exec_dir only changes it when it differs from the exec_dir of the previous command"
             },
             "command": {
                 "type": "string",
                 "description": "Shell command to execute"
             }
         },
-        required=["id", "exec_dir", "command"]
+        required=["id", "exec_dir", "command"],
+        invalidates=True
     )
     async def shell_exec(
         self,
@@ -52,7 +64,7 @@ class ShellTool(BaseTool):
         Returns:
             Command execution result
         """
-        return await self.sandbox.exec_command(id, exec_dir, command)
+        return self._track_offset(id, await self.sandbox.exec_command(id, exec_dir, command))
     
     @tool(
         name="shell_view",
@@ -63,7 +75,8 @@ class ShellTool(BaseTool):
                 "description": "Unique identifier of the target shell session"
             }
         },
-        required=["id"]
+        required=["id"],
+        invalidates=True
     )
     async def shell_view(self, id: str) -> ToolResult:
         """View Shell session content
@@ -74,11 +87,11 @@ class ShellTool(BaseTool):
         Returns:
             Shell session content
         """
-        return await self.sandbox.view_shell(id)
+        return self._track_offset(id, await self.sandbox.view_shell(id))
     
     @tool(
         name="shell_wait",
-        description="Wait for the running process in a specified shell session to return. Use after running commands that require longer runtime.",
+        description="Wait for the running process in a specified shell session to return or print new output. Use after running commands that require longer runtime.",
         parameters={
             "id": {
                 "type": "string",
@@ -86,10 +99,13 @@ class ShellTool(BaseTool):
             },
             "seconds": {
                 "type": "integer",
-                "description": "Wait duration in seconds"
+                "description": "Maximum wait duration in seconds"
             }
         },
-        required=["id"]
+        required=["id"],
+        invalidates=True,
+        # Bounded by the wait duration on the sandbox side
+        timeout=600
     )
     async def shell_wait(
         self,
@@ -98,6 +114,9 @@ class ShellTool(BaseTool):
     ) -> ToolResult:
         """Wait for the running process in Shell session to return
         
+        Returns as soon as the process exits or prints output not returned by an earlier
+        shell call, instead of always waiting the full duration.
+        
         Args:
             id: Unique identifier of the target Shell session
             seconds: Wait time (seconds)
@@ -105,7 +124,9 @@ class ShellTool(BaseTool):
         Returns:
             Wait result
         """
-        return await self.sandbox.wait_for_process(id, seconds)
+        return self._track_offset(
+            id, await self.sandbox.wait_for_process(id, seconds, since_offset=self._seen_offsets.get(id))
+        )
     
     @tool(
         name="shell_write_to_process",
@@ -124,7 +145,8 @@ class ShellTool(BaseTool):
                 "description": "Whether to press Enter key after input"
             }
         },
-        required=["id", "input", "press_enter"]
+        required=["id", "input", "press_enter"],
+        invalidates=True
     )
     async def shell_write_to_process(
         self,
@@ -142,7 +164,7 @@ class ShellTool(BaseTool):
         Returns:
             Write result
         """
-        return await self.sandbox.write_to_process(id, input, press_enter)
+        return self._track_offset(id, await self.sandbox.write_to_process(id, input, press_enter))
     
     @tool(
         name="shell_kill_process",
@@ -153,7 +175,8 @@ class ShellTool(BaseTool):
                 "description": "Unique identifier of the target shell session"
             }
         },
-        required=["id"]
+        required=["id"],
+        invalidates=True
     )
     async def shell_kill_process(self, id: str) -> ToolResult:
         """Terminate the running process in Shell session
@@ -0,0 +1,35 @@
+from typing import List, NamedTuple
+
+
+class LineRangeDiff(NamedTuple):
+    """Replace lines [start_line, end_line) of the old content with lines
+
+    Lines are split on "\\n" only, so joining the patched lines with "\\n" restores
+    the new content exactly.
+    """
+    start_line: int
+    end_line: int
+    lines: List[str]
+
+
+def line_range_diff(old: str, new: str) -> LineRangeDiff:
+    """Single changed line range between two versions of a text
+
+    The common leading and trailing lines are kept, everything in between is
+    replaced. Appends, in-place edits and truncations become small patches.
+    """
+    old_lines = old.split("\n")
+    new_lines = new.split("\n")
+    prefix = 0
+    limit = min(len(old_lines), len(new_lines))
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+    return LineRangeDiff(
+        start_line=prefix,
+        end_line=len(old_lines) - suffix,
+        lines=new_lines[prefix:len(new_lines) - suffix],
+    )
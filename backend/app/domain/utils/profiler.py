@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple
+from app.domain.models.timing import SpanStats, Timing
+
+
+class Profiler:
+    """Lightweight timing spans for one session
+
+    Spans are aggregated by path until collected, nested spans record their full
+    path (e.g. "tool_content;file_sync;repository"), so collected timings can be
+    rendered as a flame graph. The open span path lives in a context variable, so
+    concurrent tasks of a session (e.g. the file change feed) nest their spans
+    independently.
+    """
+
+    def __init__(self):
+        self._path: ContextVar[Tuple[str, ...]] = ContextVar("profiler_path", default=())
+        self._spans: Timing = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under the given span name"""
+        stack = self._path.get() + (name,)
+        token = self._path.set(stack)
+        path = ";".join(stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._path.reset(token)
+            self.record(path, (time.perf_counter() - started) * 1000)
+
+    def record(self, path: str, elapsed_ms: float) -> None:
+        """Record an externally measured duration"""
+        self._spans.setdefault(path, SpanStats()).add(elapsed_ms)
+
+    def collect(self) -> Timing:
+        """Return spans recorded since the last collection and start over"""
+        spans, self._spans = self._spans, {}
+        return spans
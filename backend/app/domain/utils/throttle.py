@@ -0,0 +1,39 @@
+import asyncio
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+
+async def latest_every(source: AsyncIterator[T], interval: float) -> AsyncIterator[T]:
+    """Yield the latest item of source at most once per interval
+
+    An item arriving after a quiet period is yielded immediately, items arriving faster
+    are skipped except for the last one, which is yielded when the interval has passed.
+    Errors of source are raised to the caller.
+    """
+    loop = asyncio.get_running_loop()
+    next_item = asyncio.ensure_future(anext(source))
+    latest = None
+    has_latest = False
+    last_yield = -interval
+    try:
+        while True:
+            timeout = max(0, last_yield + interval - loop.time()) if has_latest else None
+            done, _ = await asyncio.wait({next_item}, timeout=timeout)
+            if done:
+                try:
+                    latest = next_item.result()
+                except StopAsyncIteration:
+                    break
+                has_latest = True
+                next_item = asyncio.ensure_future(anext(source))
+                if loop.time() - last_yield < interval:
+                    continue
+            yield latest
+            has_latest = False
+            last_yield = loop.time()
+        if has_latest:
+            yield latest
+    finally:
+        next_item.cancel()
+        await asyncio.gather(next_item, return_exceptions=True)
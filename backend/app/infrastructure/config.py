@@ -35,6 +35,13 @@ class Settings(BaseSettings):
     sandbox_https_proxy: str | None = None
     sandbox_http_proxy: str | None = None
     sandbox_no_proxy: str | None = None
+    sandbox_shell_mode: str = "process"  # Shell mode requested for sandbox shell sessions: process or pty
+    sandbox_pool_min_size: int = 0  # Pre-started sandboxes kept ready, 0 disables the pool
+    sandbox_pool_max_size: int = 4
+    sandbox_pool_ttl_minutes: int = 20  # Recycle idle pooled sandboxes, keep below sandbox_ttl_minutes
+    
+    # Agent configuration
+    agent_max_steps: int = 50  # Steps executed per plan before concluding with partial results
     
     # Search engine configuration
     search_provider: str | None = None  # "google", "baidu"
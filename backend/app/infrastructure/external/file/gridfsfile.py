@@ -1,9 +1,10 @@
+import hashlib
 import logging
-import io
-from typing import BinaryIO, Optional, Dict, Any, Tuple
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
 
 from app.domain.external.file import FileStorage
 from app.domain.models.file import FileInfo
@@ -14,7 +15,18 @@ logger = logging.getLogger(__name__)
 
 
 class GridFSFileStorage(FileStorage):
-    """MongoDB GridFS-based file storage implementation"""
+    """MongoDB GridFS-based file storage implementation
+    
+    Streamed uploads record the SHA-256 of their content in metadata.sha256, so
+    callers can reuse an identical stored file instead of uploading it again.
+    Reuse creates a link document in the "<bucket>.links" collection with its own
+    ID and filename that points at the shared GridFS file. The GridFS file counts
+    its references (itself plus its links) in metadata.refCount and is only
+    removed when the last reference is deleted.
+    """
+    
+    # Whether the content hash index exists, shared by all instances
+    _hash_index_ready = False
     
     def __init__(self, mongodb: MongoDB, bucket_name: str = "fs"):
         """
@@ -45,8 +57,25 @@ class GridFSFileStorage(FileStorage):
         database = self.mongodb.client[self.settings.mongodb_database]
         return database[f"{self.bucket_name}.files"]
     
-    def _create_file_info(self, file_info: Dict[str, Any], file_id: str) -> FileInfo:
-        """Create FileInfo object from GridFS file metadata"""
+    def _get_links_collection(self):
+        """Get links collection for references to shared files"""
+        if not self.mongodb.client:
+            raise RuntimeError("MongoDB client not initialized")
+        
+        database = self.mongodb.client[self.settings.mongodb_database]
+        return database[f"{self.bucket_name}.links"]
+    
+    def _create_file_info(self, file_info: Dict[str, Any], file_id: str, link: Optional[Dict[str, Any]] = None) -> FileInfo:
+        """Create FileInfo object from GridFS file metadata, named after the link if given"""
+        if link:
+            return FileInfo(
+                file_id=str(link['_id']),
+                filename=link.get('filename', f"file_{file_id}"),
+                content_type=link.get('contentType') or file_info.get('metadata', {}).get('contentType'),
+                size=file_info.get('length', 0),
+                upload_date=link.get('uploadDate', datetime.utcnow()),
+                metadata=file_info.get('metadata')
+            )
         return FileInfo(
             file_id=str(file_info['_id']),
             filename=file_info.get('filename', f"file_{file_id}"),
@@ -56,9 +85,45 @@ class GridFSFileStorage(FileStorage):
             metadata=file_info.get('metadata')
         )
     
+    async def _resolve(self, file_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Resolve a file ID to its GridFS file document and, for a link, the link document
+        
+        Returns:
+            (GridFS file document, link document), the file document is None if not found
+        """
+        try:
+            obj_id = ObjectId(file_id)
+        except Exception:
+            raise ValueError(f"Invalid file ID format: {file_id}")
+        
+        file_info = await self._get_files_collection().find_one({"_id": obj_id})
+        if file_info:
+            # A file whose own reference was deleted only lives on for its links
+            if file_info.get('metadata', {}).get('detached'):
+                return None, None
+            return file_info, None
+        
+        link = await self._get_links_collection().find_one({"_id": obj_id})
+        if not link:
+            return None, None
+        file_info = await self._get_files_collection().find_one({"_id": link['fileId']})
+        return file_info, link
+    
+    async def _release(self, obj_id: ObjectId) -> None:
+        """Drop one reference to a GridFS file, removing it with the last one"""
+        # Files stored before reference counting have a single implicit reference
+        file_info = await self._get_files_collection().find_one_and_update(
+            {"_id": obj_id},
+            [{"$set": {"metadata.refCount": {"$subtract": [{"$ifNull": ["$metadata.refCount", 1]}, 1]}}}],
+            return_document=ReturnDocument.AFTER
+        )
+        if file_info and file_info.get('metadata', {}).get('refCount', 0) <= 0:
+            await self._get_gridfs_bucket().delete(obj_id)
+            logger.info(f"Stored file {obj_id} has no references left, removed")
+    
     async def upload_file(
         self,
-        file_data: BinaryIO,
+        file_data: Union[BinaryIO, bytes, AsyncIterable[bytes]],
         filename: str,
         content_type: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None
@@ -71,23 +136,42 @@ class GridFSFileStorage(FileStorage):
             file_metadata = {
                 'filename': filename,
                 'uploadDate': datetime.utcnow(),
-                **(metadata or {})
+                **(metadata or {}),
+                'refCount': 1
             }
             
             if content_type:
                 file_metadata['contentType'] = content_type
             
-            # Upload directly from file stream to avoid loading entire file into memory
-            file_id = await bucket.upload_from_stream(
-                filename,
-                file_data,
-                metadata=file_metadata
-            )
-            
-            # Get file size (can be retrieved from GridFS if needed)
-            files_collection = self._get_files_collection()
-            file_info = await files_collection.find_one({"_id": file_id})
-            file_size = file_info.get('length', 0) if file_info else 0
+            if isinstance(file_data, AsyncIterable):
+                # Write chunks as they arrive, only one chunk is held in memory
+                grid_in = bucket.open_upload_stream(filename, metadata=file_metadata)
+                file_size = 0
+                digest = hashlib.sha256()
+                try:
+                    async for chunk in file_data:
+                        await grid_in.write(chunk)
+                        digest.update(chunk)
+                        file_size += len(chunk)
+                    file_metadata['sha256'] = digest.hexdigest()
+                    await grid_in.set('metadata', file_metadata)
+                except BaseException:
+                    await grid_in.abort()
+                    raise
+                await grid_in.close()
+                file_id = grid_in._id
+            else:
+                # Upload directly from file stream to avoid loading entire file into memory
+                file_id = await bucket.upload_from_stream(
+                    filename,
+                    file_data,
+                    metadata=file_metadata
+                )
+                
+                # Get file size (can be retrieved from GridFS if needed)
+                files_collection = self._get_files_collection()
+                file_info = await files_collection.find_one({"_id": file_id})
+                file_size = file_info.get('length', 0) if file_info else 0
             
             logger.info(f"File uploaded successfully: {filename} (ID: {file_id})")
             
@@ -104,26 +188,18 @@ class GridFSFileStorage(FileStorage):
             logger.error(f"Failed to upload file {filename}: {str(e)}")
             raise
     
-    async def download_file(self, file_id: str) -> Tuple[BinaryIO, FileInfo]:
-        """Download file by file ID"""
+    async def download_file(self, file_id: str) -> Tuple[AsyncIterator[bytes], FileInfo]:
+        """Download file by file ID as a stream of GridFS chunks"""
         try:
             bucket = self._get_gridfs_bucket()
-            files_collection = self._get_files_collection()
-            
-            # Convert ObjectId
-            try:
-                obj_id = ObjectId(file_id)
-            except Exception:
-                raise ValueError(f"Invalid file ID format: {file_id}")
             
-            # Get file information
-            file_info = await files_collection.find_one({"_id": obj_id})
+            # Get file information, following links to the shared file
+            file_info, link = await self._resolve(file_id)
             if not file_info:
                 raise FileNotFoundError(f"File not found with ID: {file_id}")
-            stream = io.BytesIO()
-            await bucket.download_to_stream(obj_id, stream)
-            stream.seek(0)
-            return stream, self._create_file_info(file_info, file_id)
+            # The grid out reads one stored chunk per iteration
+            grid_out = await bucket.open_download_stream(file_info['_id'])
+            return grid_out, self._create_file_info(file_info, file_id, link)
             
         except FileNotFoundError:
             raise
@@ -131,25 +207,70 @@ class GridFSFileStorage(FileStorage):
             logger.error(f"Failed to download file {file_id}: {str(e)}")
             raise
     
-    async def delete_file(self, file_id: str) -> bool:
-        """Delete file"""
+    async def _ensure_hash_index(self) -> None:
+        if GridFSFileStorage._hash_index_ready:
+            return
+        await self._get_files_collection().create_index("metadata.sha256", sparse=True)
+        GridFSFileStorage._hash_index_ready = True
+
+    async def link_file_by_hash(
+        self,
+        content_hash: str,
+        filename: str,
+        content_type: Optional[str] = None
+    ) -> Optional[FileInfo]:
+        """Reference a stored file with identical content under a new ID and filename"""
         try:
-            bucket = self._get_gridfs_bucket()
-            files_collection = self._get_files_collection()
-            
-            # Convert ObjectId
+            await self._ensure_hash_index()
+            # Take the reference atomically, files already released to zero are being removed
+            file_info = await self._get_files_collection().find_one_and_update(
+                {"metadata.sha256": content_hash, "metadata.refCount": {"$not": {"$lte": 0}}},
+                [{"$set": {"metadata.refCount": {"$add": [{"$ifNull": ["$metadata.refCount", 1]}, 1]}}}],
+                return_document=ReturnDocument.AFTER
+            )
+            if not file_info:
+                return None
+            link = {
+                '_id': ObjectId(),
+                'fileId': file_info['_id'],
+                'filename': filename,
+                'uploadDate': datetime.utcnow()
+            }
+            if content_type:
+                link['contentType'] = content_type
             try:
-                obj_id = ObjectId(file_id)
-            except Exception:
-                raise ValueError(f"Invalid file ID format: {file_id}")
-            
+                await self._get_links_collection().insert_one(link)
+            except BaseException:
+                await self._release(file_info['_id'])
+                raise
+            return self._create_file_info(file_info, str(file_info['_id']), link)
+        except Exception as e:
+            logger.error(f"Failed to link file by hash {content_hash}: {str(e)}")
+            return None
+
+    async def delete_file(self, file_id: str) -> bool:
+        """Delete file, the stored content is kept while other references use it"""
+        try:
             # Check if file exists
-            file_info = await files_collection.find_one({"_id": obj_id})
+            file_info, link = await self._resolve(file_id)
             if not file_info:
                 return False
             
-            # Delete file
-            await bucket.delete(obj_id)
+            # Only the call that removes the reference may release it,
+            # concurrent deletes of the same ID would release it twice
+            if link:
+                result = await self._get_links_collection().delete_one({"_id": link['_id']})
+                removed = result.deleted_count == 1
+            else:
+                # Hide this ID right away, the content may live on for its links
+                result = await self._get_files_collection().update_one(
+                    {"_id": file_info['_id'], "metadata.detached": {"$ne": True}},
+                    {"$set": {"metadata.detached": True}}
+                )
+                removed = result.modified_count == 1
+            if not removed:
+                return False
+            await self._release(file_info['_id'])
             logger.info(f"File deleted successfully: {file_id}")
             return True
             
@@ -160,20 +281,12 @@ class GridFSFileStorage(FileStorage):
     async def get_file_info(self, file_id: str) -> Optional[FileInfo]:
         """Get file information"""
         try:
-            files_collection = self._get_files_collection()
-            
-            # Convert ObjectId
-            try:
-                obj_id = ObjectId(file_id)
-            except Exception:
-                raise ValueError(f"Invalid file ID format: {file_id}")
-            
-            # Get file information
-            file_info = await files_collection.find_one({"_id": obj_id})
+            # Get file information, following links to the shared file
+            file_info, link = await self._resolve(file_id)
             if not file_info:
                 return None
             
-            return self._create_file_info(file_info, file_id)
+            return self._create_file_info(file_info, file_id, link)
             
         except Exception as e:
             logger.error(f"Failed to get file info {file_id}: {str(e)}")
@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+import docker
+from pydantic import BaseModel
+from app.domain.models.timing import SpanStats
+
+logger = logging.getLogger(__name__)
+
+
+class DockerClientStats(BaseModel):
+    """Docker control plane metrics"""
+    operations: Dict[str, SpanStats] = {}
+    errors: Dict[str, int] = {}
+    inspect_cache_hits: int = 0
+    inspect_cache_misses: int = 0
+
+
+class AsyncDockerClient:
+    """Non-blocking Docker control plane
+
+    The docker SDK is synchronous, so every daemon call runs on a small dedicated
+    executor instead of the event loop (or the default executor shared with other
+    blocking work). One Docker client, and therefore one pooled connection set to
+    the daemon socket, is shared by the whole process. Container inspections are
+    cached briefly and concurrent lookups of the same container are coalesced.
+    """
+
+    # Calls slower than this are logged as warnings
+    slow_call_seconds: float = 1.0
+
+    def __init__(self, max_workers: int = 4, inspect_ttl: float = 10.0):
+        self._client: Optional[docker.DockerClient] = None
+        self._client_lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker")
+        self._inspect_ttl = inspect_ttl
+        # Container name -> (inspect attributes, monotonic fetch time)
+        self._inspect_cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = DockerClientStats()
+
+    def _get_client(self) -> docker.DockerClient:
+        """Create the shared client on first use, called from the executor"""
+        with self._client_lock:
+            if self._client is None:
+                self._client = docker.from_env(max_pool_size=self._max_workers)
+            return self._client
+
+    async def _run(self, operation: str, func: Callable[[], Any]) -> Any:
+        """Run a blocking Docker call on the executor and record its latency"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, func)
+        except Exception:
+            self._stats.errors[operation] = self._stats.errors.get(operation, 0) + 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stats.operations.setdefault(operation, SpanStats()).add(elapsed * 1000)
+            if elapsed >= self.slow_call_seconds:
+                logger.warning(f"Slow Docker {operation} call: {elapsed:.2f}s")
+
+    async def run_container(self, **config) -> Dict[str, Any]:
+        """Create and start a container
+
+        Args:
+            **config: Arguments of docker's containers.run, must include detach=True
+
+        Returns:
+            Container inspect attributes after start
+        """
+        def run() -> Dict[str, Any]:
+            container = self._get_client().containers.run(**config)
+            container.reload()
+            return container.attrs
+
+        attrs = await self._run("create", run)
+        self._inspect_cache[attrs["Name"].lstrip("/")] = (attrs, time.monotonic())
+        return attrs
+
+    async def inspect_container(self, name: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Get container inspect attributes
+
+        Args:
+            name: Container name or ID
+            use_cache: Whether a recent cached inspection may be returned
+
+        Raises:
+            docker.errors.NotFound: Container does not exist
+        """
+        if use_cache:
+            cached = self._inspect_cache.get(name)
+            if cached and time.monotonic() - cached[1] < self._inspect_ttl:
+                self._stats.inspect_cache_hits += 1
+                return cached[0]
+        self._stats.inspect_cache_misses += 1
+
+        inflight = self._inflight.get(name)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.ensure_future(
+            self._run("inspect", lambda: self._get_client().api.inspect_container(name))
+        )
+        self._inflight[name] = future
+        try:
+            attrs = await asyncio.shield(future)
+            self._inspect_cache[name] = (attrs, time.monotonic())
+            return attrs
+        finally:
+            if self._inflight.get(name) is future:
+                del self._inflight[name]
+
+    async def remove_container(self, name: str, force: bool = True) -> None:
+        """Remove a container
+
+        Args:
+            name: Container name or ID
+            force: Kill the container if it is running
+        """
+        self.invalidate(name)
+        await self._run("remove", lambda: self._get_client().api.remove_container(name, force=force))
+
+    def invalidate(self, name: str) -> None:
+        """Drop the cached inspection of a container"""
+        self._inspect_cache.pop(name, None)
+
+    def get_stats(self) -> DockerClientStats:
+        return self._stats.model_copy(deep=True)
+
+    async def close(self) -> None:
+        """Close the shared client and stop the executor"""
+        logger.info(f"Closing Docker client, stats: {self._stats.model_dump()}")
+        if self._client is not None:
+            client, self._client = self._client, None
+            await asyncio.get_running_loop().run_in_executor(self._executor, client.close)
+        self._executor.shutdown(wait=False)
+        get_docker_client.cache_clear()
+
+
+@lru_cache
+def get_docker_client() -> AsyncDockerClient:
+    """Get the shared Docker control plane client"""
+    return AsyncDockerClient()
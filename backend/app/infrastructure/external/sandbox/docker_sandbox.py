@@ -1,14 +1,19 @@
-from typing import Dict, Any, Optional, List, BinaryIO
+from typing import AsyncIterable, AsyncIterator, Dict, Any, Optional, List, BinaryIO, Union
 import uuid
 import httpx
 import docker
 import socket
 import logging
 import asyncio
-import io
+from contextlib import asynccontextmanager
 from async_lru import alru_cache
 from app.infrastructure.config import get_settings
+from app.infrastructure.external.sandbox.docker_client import get_docker_client
+from app.infrastructure.external.sandbox.sandbox_registry import SandboxRegistry
+from app.infrastructure.external.sandbox.rpc_channel import SandboxRpcChannel, RpcUnavailableError
 from app.domain.models.tool_result import ToolResult
+from app.domain.models.sandbox_operation import SandboxOperation
+from app.domain.models.file import FileChangeBatch
 from app.domain.external.sandbox import Sandbox
 from app.infrastructure.external.browser.playwright_browser import PlaywrightBrowser
 from app.domain.external.browser import Browser
@@ -16,15 +21,39 @@ from app.domain.external.llm import LLM
 
 logger = logging.getLogger(__name__)
 
+# Live sandbox instances by ID, shared by every session of this process
+_registry = SandboxRegistry()
+
 class DockerSandbox(Sandbox):
+    # Per-endpoint deadlines in seconds, instead of one long timeout for every request
+    connect_timeout: float = 10
+    request_timeout: float = 60
+    transfer_timeout: float = 600
+    # Read size when streaming downloads, bounds memory per transfer
+    transfer_chunk_size: int = 64 * 1024
+    # Extra time on top of server-side waits (the sandbox waits 60 seconds by default)
+    wait_timeout_margin: float = 10
+    default_wait_seconds: int = 60
+    # Readiness: overall deadline, server-side long-poll duration, retry delay while the API is down
+    ready_timeout: float = 60
+    ready_poll_timeout: float = 30
+    ready_retry_interval: float = 0.5
+    # Send JSON API calls over the multiplexed WebSocket channel, falling back to HTTP
+    use_rpc: bool = True
+
     def __init__(self, ip: str = None, container_name: str = None):
         """Initialize Docker sandbox and API interaction client"""
-        self.client = httpx.AsyncClient(timeout=600)
+        self.client = httpx.AsyncClient(timeout=self._get_timeout())
         self.ip = ip
         self.base_url = f"http://{self.ip}:8080"
         self._vnc_url = f"ws://{self.ip}:5901"
         self._cdp_url = f"http://{self.ip}:9222"
         self._container_name = container_name
+        self._rpc = SandboxRpcChannel(f"ws://{self.ip}:8080/api/v1/rpc", connect_timeout=self.connect_timeout)
+        # Requests and streams currently using the connections, closed after eviction once this drops to zero
+        self._holders = 0
+        self._retired = False
+        self._closing: Optional[asyncio.Task] = None
     
     @property
     def id(self) -> str:
@@ -43,17 +72,17 @@ class DockerSandbox(Sandbox):
         return self._vnc_url
 
     @staticmethod
-    def _get_container_ip(container) -> str:
+    def _get_container_ip(attrs: Dict[str, Any]) -> str:
         """Get container IP address from network settings
         
         Args:
-            container: Docker container instance
+            attrs: Docker container inspect attributes
             
         Returns:
             Container IP address
         """
         # Get container network settings
-        network_settings = container.attrs['NetworkSettings']
+        network_settings = attrs['NetworkSettings']
         ip_address = network_settings['IPAddress']
         
         # If default network has no IP, try to get IP from other networks
@@ -68,12 +97,8 @@ class DockerSandbox(Sandbox):
         return ip_address
 
     @staticmethod
-    def _create_task() -> 'DockerSandbox':
-        """Create a new Docker sandbox (static method)
-        
-        Args:
-            image: Docker image name
-            name_prefix: Container name prefix
+    async def _create_container() -> 'DockerSandbox':
+        """Create a new Docker sandbox container
             
         Returns:
             DockerSandbox instance
@@ -86,9 +111,6 @@ class DockerSandbox(Sandbox):
         container_name = f"{name_prefix}-{str(uuid.uuid4())[:8]}"
         
         try:
-            # Create Docker client
-            docker_client = docker.from_env()
-
             # Prepare container configuration
             container_config = {
                 "image": image,
@@ -108,12 +130,9 @@ class DockerSandbox(Sandbox):
             if settings.sandbox_network:
                 container_config["network"] = settings.sandbox_network
             
-            # Create container
-            container = docker_client.containers.run(**container_config)
-            
-            # Get container IP address
-            container.reload()  # Refresh container info
-            ip_address = DockerSandbox._get_container_ip(container)
+            # Create container and get its IP address
+            attrs = await get_docker_client().run_container(**container_config)
+            ip_address = DockerSandbox._get_container_ip(attrs)
             
             # Create and return DockerSandbox instance
             return DockerSandbox(
@@ -124,103 +143,248 @@ class DockerSandbox(Sandbox):
         except Exception as e:
             raise Exception(f"Failed to create Docker sandbox: {str(e)}")
 
+    @staticmethod
+    def _get_non_running_services(services: List[Dict[str, Any]]) -> List[str]:
+        return [
+            f"{service.get('name', 'unknown')}({service.get('statename', '')})"
+            for service in services
+            if service.get("statename", "") != "RUNNING"
+        ]
+
+    async def _check_services_status(self, timeout: float) -> bool:
+        """Fallback for sandbox images without the readiness endpoint, a single status check"""
+        response = await self.client.get(
+            f"{self.base_url}/api/v1/supervisor/status",
+            timeout=self._get_timeout(timeout)
+        )
+        response.raise_for_status()
+        tool_result = ToolResult(**response.json())
+        services = (tool_result.data or []) if tool_result.success else []
+        return bool(services) and not self._get_non_running_services(services)
+
     async def ensure_sandbox(self) -> None:
-        """Ensure sandbox is ready by checking that all services are RUNNING"""
-        max_retries = 30  # Maximum number of retries
-        retry_interval = 2  # Seconds between retries
+        """Ensure sandbox is ready by waiting until all services are RUNNING
+        
+        Long-polls the sandbox readiness endpoint, which returns as soon as every
+        supervisord program is RUNNING, until ready_timeout expires. While the sandbox
+        API itself is still starting, connection attempts are retried quickly.
+        """
+        async with self._hold():
+            await self._wait_until_ready()
+
+    async def _wait_until_ready(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.ready_timeout
+        supports_ready = True
+        attempt = 0
         
-        for attempt in range(max_retries):
+        while (remaining := deadline - loop.time()) > 0:
+            attempt += 1
             try:
-                response = await self.client.get(f"{self.base_url}/api/v1/supervisor/status")
-                response.raise_for_status()
-                
-                # Parse response as ToolResult
-                tool_result = ToolResult(**response.json())
-                
-                if not tool_result.success:
-                    logger.warning(f"Supervisor status check failed: {tool_result.message}")
-                    await asyncio.sleep(retry_interval)
-                    continue
-                
-                services = tool_result.data or []
-                if not services:
-                    logger.warning("No services found in supervisor status")
-                    await asyncio.sleep(retry_interval)
+                if supports_ready:
+                    wait_seconds = min(remaining, self.ready_poll_timeout)
+                    response = await self.client.get(
+                        f"{self.base_url}/api/v1/supervisor/ready",
+                        params={"timeout": wait_seconds},
+                        timeout=self._get_timeout(wait_seconds + self.wait_timeout_margin)
+                    )
+                    if self._is_missing_route(response):
+                        logger.info("Sandbox has no readiness endpoint, falling back to status checks")
+                        supports_ready = False
+                        continue
+                    response.raise_for_status()
+                    tool_result = ToolResult(**response.json())
+                    readiness = tool_result.data or {}
+                    if tool_result.success and readiness.get("ready"):
+                        logger.info(f"All {len(readiness.get('services', []))} services are RUNNING - sandbox is ready after {readiness.get('waited_seconds')}s wait")
+                        return
+                    non_running = self._get_non_running_services(readiness.get("services", []))
+                    logger.info(f"Waiting for services to start... Non-running: {', '.join(non_running)} (attempt {attempt})")
                     continue
                 
-                # Check if all services are RUNNING
-                all_running = True
-                non_running_services = []
-                
-                for service in services:
-                    service_name = service.get("name", "unknown")
-                    state_name = service.get("statename", "")
-                    
-                    if state_name != "RUNNING":
-                        all_running = False
-                        non_running_services.append(f"{service_name}({state_name})")
-                
-                if all_running:
-                    logger.info(f"All {len(services)} services are RUNNING - sandbox is ready")
-                    return  # Success - all services are running
-                else:
-                    logger.info(f"Waiting for services to start... Non-running: {', '.join(non_running_services)} (attempt {attempt + 1}/{max_retries})")
-                    await asyncio.sleep(retry_interval)
-                    
-            except Exception as e:
-                logger.warning(f"Failed to check supervisor status (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                await asyncio.sleep(retry_interval)
-        
-        # If we reach here, we've exhausted all retries
-        error_message = f"Sandbox services failed to start after {max_retries} attempts ({max_retries * retry_interval} seconds)"
+                if await self._check_services_status(min(remaining, self.request_timeout)):
+                    logger.info("All services are RUNNING - sandbox is ready")
+                    return
+            except httpx.HTTPError as e:
+                # Sandbox API not reachable yet
+                logger.debug(f"Sandbox not reachable yet (attempt {attempt}): {str(e)}")
+            await asyncio.sleep(min(self.ready_retry_interval, max(deadline - loop.time(), 0)))
+        
+        error_message = f"Sandbox services failed to start within {self.ready_timeout} seconds"
         logger.error(error_message)
+        self._evict("health check failed")
         raise Exception(error_message)
 
+    @staticmethod
+    def _is_missing_route(response: httpx.Response) -> bool:
+        """Whether a response is a 404 for an endpoint the sandbox does not have
+
+        A 404 raised by the endpoint itself carries an error message of its own, while
+        an unknown route only gets the framework's default "Not Found" detail.
+        """
+        if response.status_code != 404:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            return True
+        return not isinstance(body, dict) or "success" not in body or body.get("message") in (None, "", "Not Found")
+
+    def _get_timeout(self, read: Optional[float] = None) -> httpx.Timeout:
+        return httpx.Timeout(read or self.request_timeout, connect=self.connect_timeout)
+
+    async def _post(self, path: str, json: Dict[str, Any], timeout: Optional[float] = None) -> ToolResult:
+        """Call a sandbox API endpoint with a deadline
+        
+        Args:
+            path: API path
+            json: Request body
+            timeout: Read deadline in seconds, defaults to request_timeout
+            
+        Returns:
+            Tool result returned by the sandbox
+            
+        Raises:
+            TimeoutError: The sandbox did not answer before the deadline
+        """
+        async with self._hold():
+            return await self._send(path, json, timeout)
+
+    async def _send(self, path: str, json: Dict[str, Any], timeout: Optional[float]) -> ToolResult:
+        if self.use_rpc and not self._rpc.unsupported:
+            try:
+                _, body = await self._rpc.call(
+                    path.removeprefix("/api/v1"),
+                    json,
+                    timeout=timeout or self.request_timeout
+                )
+                return ToolResult(**body)
+            except RpcUnavailableError as e:
+                # Nothing was sent, so the request is safe to repeat over HTTP
+                logger.debug(f"Falling back to HTTP for {path}: {e}")
+            except ConnectionError as e:
+                self._evict(f"request {path} failed: {e!r}")
+                raise
+
+        try:
+            response = await self.client.post(
+                f"{self.base_url}{path}",
+                json=json,
+                timeout=self._get_timeout(timeout)
+            )
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"Sandbox request {path} timed out") from e
+        except httpx.TransportError as e:
+            self._evict(f"request {path} failed: {e!r}")
+            raise
+        return ToolResult(**response.json())
+
+    def _evict(self, reason: str) -> None:
+        """Drop this instance from the registry so the next lookup re-resolves the sandbox"""
+        if _registry.evict(self.id, self, reason=reason):
+            get_docker_client().invalidate(self.id)
+            self._retire()
+
+    def _retire(self) -> None:
+        """Close the connections of an evicted instance once no request is using them"""
+        self._retired = True
+        if self._holders == 0:
+            self._schedule_close()
+
+    def _schedule_close(self) -> None:
+        if self._closing is None:
+            self._closing = asyncio.create_task(self._close_connections())
+
+    def _acquire(self) -> None:
+        self._holders += 1
+
+    def _release(self) -> None:
+        self._holders -= 1
+        if self._retired and self._holders == 0:
+            self._schedule_close()
+
+    @asynccontextmanager
+    async def _hold(self):
+        """Keep the connections open while in use, even if the instance is evicted meanwhile"""
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _close_connections(self) -> None:
+        await self._rpc.close()
+        if not self.client.is_closed:
+            await self.client.aclose()
+
     async def exec_command(self, session_id: str, exec_dir: str, command: str) -> ToolResult:
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/shell/exec",
+        # Sent with every command, so sandboxes at a fixed address follow the setting too
+        return await self._post(
+            "/api/v1/shell/exec",
             json={
                 "id": session_id,
                 "exec_dir": exec_dir,
-                "command": command
+                "command": command,
+                "mode": get_settings().sandbox_shell_mode
             }
         )
-        return ToolResult(**response.json())
 
     async def view_shell(self, session_id: str) -> ToolResult:
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/shell/view",
+        return await self._post(
+            "/api/v1/shell/view",
             json={"id": session_id}
         )
-        return ToolResult(**response.json())
 
-    async def wait_for_process(self, session_id: str, seconds: Optional[int] = None) -> ToolResult:
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/shell/wait",
+    async def view_shell_delta(self, session_id: str, since_offset: Optional[int] = None,
+                               since_record: Optional[int] = None) -> ToolResult:
+        return await self._post(
+            "/api/v1/shell/view",
+            json={"id": session_id, "since_offset": since_offset, "since_record": since_record}
+        )
+
+    async def stream_shell(self, session_id: str, since_offset: Optional[int] = None,
+                           since_record: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Follow shell output over the RPC channel
+        
+        Raises:
+            ConnectionError: The RPC channel is disabled or unavailable, or the sandbox has no shell stream
+        """
+        if not self.use_rpc:
+            raise RpcUnavailableError("RPC channel is disabled")
+        async with self._hold():
+            async for event in self._rpc.stream(
+                "/shell/stream",
+                {"id": session_id, "since_offset": since_offset, "since_record": since_record}
+            ):
+                yield event
+
+    async def wait_for_process(self, session_id: str, seconds: Optional[int] = None,
+                               since_offset: Optional[int] = None) -> ToolResult:
+        return await self._post(
+            "/api/v1/shell/wait",
             json={
                 "id": session_id,
-                "seconds": seconds
-            }
+                "seconds": seconds,
+                "since_offset": since_offset
+            },
+            timeout=(seconds or self.default_wait_seconds) + self.wait_timeout_margin
         )
-        return ToolResult(**response.json())
 
     async def write_to_process(self, session_id: str, input_text: str, press_enter: bool = True) -> ToolResult:
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/shell/write",
+        return await self._post(
+            "/api/v1/shell/write",
             json={
                 "id": session_id,
                 "input": input_text,
                 "press_enter": press_enter
             }
         )
-        return ToolResult(**response.json())
 
     async def kill_process(self, session_id: str) -> ToolResult:
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/shell/kill",
+        return await self._post(
+            "/api/v1/shell/kill",
             json={"id": session_id}
         )
-        return ToolResult(**response.json())
 
     async def file_write(self, file: str, content: str, append: bool = False, 
                         leading_newline: bool = False, trailing_newline: bool = False, 
@@ -238,8 +402,8 @@ class DockerSandbox(Sandbox):
         Returns:
             Result of write operation
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/write",
+        return await self._post(
+            "/api/v1/file/write",
             json={
                 "file": file,
                 "content": content,
@@ -249,10 +413,11 @@ class DockerSandbox(Sandbox):
                 "sudo": sudo
             }
         )
-        return ToolResult(**response.json())
 
     async def file_read(self, file: str, start_line: int = None, 
-                        end_line: int = None, sudo: bool = False) -> ToolResult:
+                        end_line: int = None, sudo: bool = False,
+                        if_none_match: Optional[str] = None,
+                        tail_lines: Optional[int] = None) -> ToolResult:
         """Read file content
         
         Args:
@@ -260,20 +425,23 @@ class DockerSandbox(Sandbox):
             start_line: Start line number
             end_line: End line number
             sudo: Whether to use sudo privileges
+            if_none_match: Content version from a previous read, content is omitted if unchanged
+            tail_lines: Read the last N lines instead of a line range
             
         Returns:
-            File content
+            File content and version, not_modified is set when the version matches if_none_match
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/read",
+        return await self._post(
+            "/api/v1/file/read",
             json={
                 "file": file,
                 "start_line": start_line,
                 "end_line": end_line,
-                "sudo": sudo
+                "sudo": sudo,
+                "if_none_match": if_none_match,
+                "tail_lines": tail_lines
             }
         )
-        return ToolResult(**response.json())
         
     async def file_exists(self, path: str) -> ToolResult:
         """Check if file exists
@@ -284,11 +452,10 @@ class DockerSandbox(Sandbox):
         Returns:
             Whether file exists
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/exists",
+        return await self._post(
+            "/api/v1/file/exists",
             json={"path": path}
         )
-        return ToolResult(**response.json())
         
     async def file_delete(self, path: str) -> ToolResult:
         """Delete file
@@ -299,11 +466,10 @@ class DockerSandbox(Sandbox):
         Returns:
             Result of delete operation
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/delete",
+        return await self._post(
+            "/api/v1/file/delete",
             json={"path": path}
         )
-        return ToolResult(**response.json())
         
     async def file_list(self, path: str) -> ToolResult:
         """List directory contents
@@ -314,11 +480,10 @@ class DockerSandbox(Sandbox):
         Returns:
             List of directory contents
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/list",
+        return await self._post(
+            "/api/v1/file/list",
             json={"path": path}
         )
-        return ToolResult(**response.json())
 
     async def file_replace(self, file: str, old_str: str, new_str: str, sudo: bool = False) -> ToolResult:
         """Replace string in file
@@ -332,8 +497,8 @@ class DockerSandbox(Sandbox):
         Returns:
             Result of replace operation
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/replace",
+        return await self._post(
+            "/api/v1/file/replace",
             json={
                 "file": file,
                 "old_str": old_str,
@@ -341,7 +506,6 @@ class DockerSandbox(Sandbox):
                 "sudo": sudo
             }
         )
-        return ToolResult(**response.json())
 
     async def file_search(self, file: str, regex: str, sudo: bool = False) -> ToolResult:
         """Search in file content
@@ -354,78 +518,229 @@ class DockerSandbox(Sandbox):
         Returns:
             Search results
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/search",
+        return await self._post(
+            "/api/v1/file/search",
             json={
                 "file": file,
                 "regex": regex,
                 "sudo": sudo
             }
         )
-        return ToolResult(**response.json())
 
-    async def file_find(self, path: str, glob_pattern: str) -> ToolResult:
+    async def file_grep(self, path: str, regex: str, include: Optional[List[str]] = None,
+                        context_lines: int = 0, max_results: int = 200,
+                        ignore_case: bool = False) -> ToolResult:
+        """Search file contents recursively under a directory
+        
+        Args:
+            path: Directory to search, or a single file
+            regex: Regular expression, matched against each line
+            include: Only search files matching one of these globs
+            context_lines: Lines of context before and after each match
+            max_results: Stop after this many matches
+            ignore_case: Whether to match case-insensitively
+            
+        Returns:
+            Matching lines with file and line number
+        """
+        return await self._post(
+            "/api/v1/file/grep",
+            json={
+                "path": path,
+                "regex": regex,
+                "include": include,
+                "context_lines": context_lines,
+                "max_results": max_results,
+                "ignore_case": ignore_case
+            }
+        )
+
+    async def file_find(self, path: str, glob_pattern: str, cursor: Optional[str] = None) -> ToolResult:
         """Find files by name pattern
         
         Args:
             path: Search directory path
             glob_pattern: Glob match pattern
+            cursor: next_cursor of a previous truncated result, to get the next page
             
         Returns:
-            List of found files
+            List of found files, with next_cursor when truncated
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/find",
+        return await self._post(
+            "/api/v1/file/find",
             json={
                 "path": path,
-                "glob": glob_pattern
+                "glob": glob_pattern,
+                "cursor": cursor
             }
         )
-        return ToolResult(**response.json())
 
-    async def file_upload(self, file_data: BinaryIO, path: str, filename: str = None) -> ToolResult:
+    async def file_stat(self, file: str) -> ToolResult:
+        """Get file size, modification time and content hash
+        
+        Args:
+            file: File path
+            
+        Returns:
+            File stat with size, mtime and sha256
+        """
+        return await self._post(
+            "/api/v1/file/stat",
+            json={"file": file}
+        )
+
+    async def _multipart_upload_body(
+        self,
+        file_data: AsyncIterable[bytes],
+        path: str,
+        filename: str,
+        boundary: str
+    ) -> AsyncIterator[bytes]:
+        """Encode an upload form around a chunk stream without buffering the file"""
+        quoted_filename = filename.replace('"', '%22')
+        yield (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="path"\r\n\r\n{path}\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{quoted_filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode()
+        async for chunk in file_data:
+            yield chunk
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    async def file_upload(
+        self,
+        file_data: Union[BinaryIO, AsyncIterable[bytes]],
+        path: str,
+        filename: str = None
+    ) -> ToolResult:
         """Upload file to sandbox
         
         Args:
-            file_data: File content as binary stream
+            file_data: File content as binary stream, or async iterable of chunks sent as they arrive
             path: Target file path in sandbox
             filename: Original filename (optional)
             
         Returns:
             Upload operation result
         """
-        # Prepare form data for upload
-        files = {"file": (filename or "upload", file_data, "application/octet-stream")}
-        data = {"path": path}
-        
-        response = await self.client.post(
-            f"{self.base_url}/api/v1/file/upload",
-            files=files,
-            data=data
-        )
+        url = f"{self.base_url}/api/v1/file/upload"
+        timeout = self._get_timeout(self.transfer_timeout)
+        try:
+            async with self._hold():
+                if isinstance(file_data, AsyncIterable):
+                    boundary = uuid.uuid4().hex
+                    response = await self.client.post(
+                        url,
+                        content=self._multipart_upload_body(file_data, path, filename or "upload", boundary),
+                        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                        timeout=timeout
+                    )
+                else:
+                    # Prepare form data for upload, httpx streams file objects from disk
+                    files = {"file": (filename or "upload", file_data, "application/octet-stream")}
+                    response = await self.client.post(url, files=files, data={"path": path}, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"Upload to {path} timed out") from e
         return ToolResult(**response.json())
 
-    async def file_download(self, path: str) -> BinaryIO:
+    async def _iter_download(self, response: httpx.Response, path: str) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in response.aiter_bytes(self.transfer_chunk_size):
+                yield chunk
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"Download of {path} timed out") from e
+        finally:
+            await response.aclose()
+            self._release()
+
+    async def file_download(self, path: str) -> AsyncIterator[bytes]:
         """Download file from sandbox
         
+        The response status is checked before returning, the body is read from the
+        sandbox while iterating and the connection is released when iteration ends.
+        
         Args:
             path: File path in sandbox
             
         Returns:
-            File content as binary stream
+            File content as an async iterator of chunks
         """
-        response = await self.client.get(
+        request = self.client.build_request(
+            "GET",
             f"{self.base_url}/api/v1/file/download",
-            params={"path": path}
+            params={"path": path},
+            timeout=self._get_timeout(self.transfer_timeout)
         )
-        response.raise_for_status()
+        # Held until the returned iterator finishes
+        self._acquire()
+        try:
+            response = await self.client.send(request, stream=True)
+            if response.is_error:
+                await response.aread()
+                await response.aclose()
+                response.raise_for_status()
+        except httpx.TimeoutException as e:
+            self._release()
+            raise TimeoutError(f"Download of {path} timed out") from e
+        except BaseException:
+            self._release()
+            raise
+        return self._iter_download(response, path)
+    
+    async def watch_files(self, paths: Optional[List[str]] = None) -> AsyncIterator[FileChangeBatch]:
+        """Follow file changes in the sandbox over the RPC channel
+        
+        Args:
+            paths: Only report changes under these paths, all watched roots if empty
+            
+        Returns:
+            Async iterator of debounced change batches
+            
+        Raises:
+            ConnectionError: The RPC channel is disabled or unavailable, or the sandbox has no file watcher
+        """
+        if not self.use_rpc:
+            raise RpcUnavailableError("RPC channel is disabled")
+        async with self._hold():
+            async for event in self._rpc.stream("/file/watch", {"paths": paths}):
+                yield FileChangeBatch.model_validate(event)
+    
+    async def batch(self, operations: List[SandboxOperation], stop_on_error: bool = False) -> List[ToolResult]:
+        """Execute operations in order in a single round trip
+        
+        Args:
+            operations: Operations to execute
+            stop_on_error: Whether to skip the remaining operations after the first failure
+            
+        Returns:
+            Result of each executed operation in order, fewer than operations when stopped
+        """
+        if not operations:
+            return []
+        result = await self._post(
+            "/api/v1/batch",
+            json={
+                "operations": [operation.model_dump() for operation in operations],
+                "stop_on_error": stop_on_error
+            }
+        )
+        if result.success and result.data:
+            return [
+                ToolResult(success=item["success"], message=item.get("message"), data=item.get("data"))
+                for item in result.data.get("results", [])
+            ]
         
-        # Return the response content as a BinaryIO stream
-        # TODO: change to real stream
-        return io.BytesIO(response.content)
+        # Sandbox images without the batch endpoint, run the operations one by one
+        logger.debug(f"Batch request failed ({result.message}), executing {len(operations)} operations separately")
+        results = []
+        for operation in operations:
+            results.append(await self._post(f"/api/v1{operation.method}", json=operation.params))
+            if stop_on_error and not results[-1].success:
+                break
+        return results
     
     @staticmethod
-    @alru_cache(maxsize=128, typed=True)
+    @alru_cache(maxsize=128, typed=True, ttl=60)
     async def _resolve_hostname_to_ip(hostname: str) -> str:
         """Resolve hostname to IP address
         
@@ -437,7 +752,8 @@ class DockerSandbox(Sandbox):
             
         Note:
             This method is cached using LRU cache with a maximum size of 128 entries.
-            The cache helps reduce repeated DNS lookups for the same hostname.
+            The cache helps reduce repeated DNS lookups for the same hostname, and
+            expires after a minute so address changes are picked up by get().
         """
         try:
             # First check if hostname is already in IP address format
@@ -462,12 +778,11 @@ class DockerSandbox(Sandbox):
     
     async def destroy(self) -> bool:
         """Destroy Docker sandbox"""
+        _registry.evict(self.id, self, reason="destroyed")
         try:
-            if self.client:
-                await self.client.aclose()
-            if self.container_name:
-                docker_client = docker.from_env()
-                docker_client.containers.get(self.container_name).remove(force=True)
+            await self._close_connections()
+            if self._container_name:
+                await get_docker_client().remove_container(self._container_name)
             return True
         except Exception as e:
             logger.error(f"Failed to destroy Docker sandbox: {str(e)}")
@@ -485,42 +800,6 @@ class DockerSandbox(Sandbox):
         """
         return PlaywrightBrowser(self.cdp_url)
 
-    @staticmethod
-    @alru_cache(maxsize=128, typed=True)
-    async def _resolve_hostname_to_ip(hostname: str) -> str:
-        """Resolve hostname to IP address
-        
-        Args:
-            hostname: Hostname to resolve
-            
-        Returns:
-            Resolved IP address, or None if resolution fails
-            
-        Note:
-            This method is cached using LRU cache with a maximum size of 128 entries.
-            The cache helps reduce repeated DNS lookups for the same hostname.
-        """
-        try:
-            # First check if hostname is already in IP address format
-            try:
-                socket.inet_pton(socket.AF_INET, hostname)
-                # If successfully parsed, it's an IPv4 address format, return directly
-                return hostname
-            except OSError:
-                # Not a valid IP address format, proceed with DNS resolution
-                pass
-                
-            # Use socket.getaddrinfo for DNS resolution
-            addr_info = socket.getaddrinfo(hostname, None, family=socket.AF_INET)
-            # Return the first IPv4 address found
-            if addr_info and len(addr_info) > 0:
-                return addr_info[0][4][0]  # Return sockaddr[0] from (family, type, proto, canonname, sockaddr), which is the IP address
-            return None
-        except Exception as e:
-            # Log error and return None on failure
-            logger.error(f"Failed to resolve hostname {hostname}: {str(e)}")
-            return None
-
     @classmethod
     async def create(cls) -> Sandbox:
         """Create a new sandbox instance
@@ -533,30 +812,49 @@ class DockerSandbox(Sandbox):
         if settings.sandbox_address:
             # Chrome CDP needs IP address
             ip = await cls._resolve_hostname_to_ip(settings.sandbox_address)
-            return DockerSandbox(ip=ip)
-    
-        return await asyncio.to_thread(DockerSandbox._create_task)
+            sandbox = DockerSandbox(ip=ip)
+        else:
+            sandbox = await DockerSandbox._create_container()
+        _registry.register(sandbox)
+        return sandbox
     
     @classmethod
-    @alru_cache(maxsize=128, typed=True)
-    async def get(cls, id: str) -> Sandbox:
+    async def get(cls, id: str) -> Optional[Sandbox]:
         """Get sandbox by ID
         
+        Returns the registered live instance while its address is unchanged, so its
+        keep-alive connections are reused; otherwise registers a fresh instance.
+        
         Args:
             id: Sandbox ID
             
         Returns:
-            Sandbox instance
+            Sandbox instance, None if the sandbox container no longer exists
         """
         settings = get_settings()
         if settings.sandbox_address:
             ip = await cls._resolve_hostname_to_ip(settings.sandbox_address)
-            return DockerSandbox(ip=ip, container_name=id)
+        else:
+            try:
+                attrs = await get_docker_client().inspect_container(id)
+            except docker.errors.NotFound:
+                logger.warning(f"Sandbox container {id} not found")
+                stale = _registry.evict(id, reason="container not found")
+                if stale is not None:
+                    stale._retire()
+                return None
+            ip = cls._get_container_ip(attrs)
 
-        docker_client = docker.from_env()
-        container = docker_client.containers.get(id)
-        container.reload()
-        
-        ip_address = cls._get_container_ip(container)
-        logger.info(f"IP address: {ip_address}")
-        return DockerSandbox(ip=ip_address, container_name=id)
+        # Looked up after the address is known, so concurrent lookups end up with one instance
+        sandbox = _registry.get(id)
+        if sandbox is not None:
+            if sandbox.ip == ip and not sandbox.client.is_closed:
+                return sandbox
+            _registry.evict(id, sandbox, reason=f"address changed from {sandbox.ip} to {ip}")
+            # The old address is gone, nothing useful can use these connections anymore
+            await sandbox._close_connections()
+
+        logger.info(f"Registering sandbox {id} at {ip}")
+        sandbox = DockerSandbox(ip=ip, container_name=id)
+        _registry.register(sandbox)
+        return sandbox
@@ -0,0 +1,174 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import itertools
+import logging
+import orjson
+import websockets
+from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+logger = logging.getLogger(__name__)
+
+
+class RpcUnavailableError(ConnectionError):
+    """The channel could not be opened, the request was not sent"""
+
+
+class SandboxRpcChannel:
+    """Multiplexed request channel to the sandbox API over one WebSocket
+
+    Requests carry an ID so any number of them can be in flight on the same
+    connection, and stream methods push events tagged with their request ID until
+    the final response. The connection is opened on first use and reopened after
+    it drops. Sandboxes without the RPC endpoint are remembered so callers can
+    fall back to plain HTTP.
+    """
+
+    def __init__(self, url: str, connect_timeout: float = 10):
+        self._url = url
+        self._connect_timeout = connect_timeout
+        self._ws: Optional[websockets.ClientConnection] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # Request ID -> queue receiving ("event", data) or ("result", (status, body))
+        self._pending: Dict[int, asyncio.Queue] = {}
+        self.unsupported = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self._ws is not None
+
+    async def _connect(self) -> websockets.ClientConnection:
+        async with self._connect_lock:
+            if self._ws is not None:
+                return self._ws
+            try:
+                ws = await websockets.connect(
+                    self._url,
+                    open_timeout=self._connect_timeout,
+                    max_size=None,
+                    compression=None,
+                )
+            except InvalidStatus as e:
+                # Older sandbox image without the RPC endpoint
+                self.unsupported = True
+                raise RpcUnavailableError(f"Sandbox has no RPC endpoint: {e}") from e
+            except (OSError, asyncio.TimeoutError) as e:
+                raise RpcUnavailableError(f"Failed to open RPC channel: {e!r}") from e
+            logger.debug(f"RPC channel connected to {self._url}")
+            self._ws = ws
+            self._reader = asyncio.create_task(self._read(ws))
+            return ws
+
+    async def _read(self, ws: websockets.ClientConnection) -> None:
+        """Route incoming frames to the queue of their request"""
+        try:
+            async for frame in ws:
+                message = orjson.loads(frame)
+                queue = self._pending.get(message.get("id"))
+                if queue is None:
+                    continue
+                if "event" in message:
+                    queue.put_nowait(("event", message["event"]))
+                else:
+                    queue.put_nowait(("result", (message.get("status", 200), message.get("result") or {})))
+        except ConnectionClosed as e:
+            logger.debug(f"RPC channel closed: {e}")
+        except Exception as e:
+            logger.warning(f"RPC channel reader failed: {e!r}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            error = ConnectionError("Sandbox RPC channel closed")
+            for queue in self._pending.values():
+                queue.put_nowait(("error", error))
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        ws = await self._connect()
+        try:
+            await ws.send(orjson.dumps(message).decode())
+        except ConnectionClosed as e:
+            raise ConnectionError("Sandbox RPC channel closed") from e
+
+    async def _cancel(self, request_id: int) -> None:
+        if self._ws is not None:
+            try:
+                await self._ws.send(orjson.dumps({"id": request_id, "cancel": True}).decode())
+            except ConnectionClosed:
+                pass
+
+    async def call(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Tuple[int, Dict[str, Any]]:
+        """Send a request and wait for its response
+
+        Args:
+            method: Sandbox API path relative to /api/v1, e.g. /shell/exec
+            params: Request body
+            timeout: Deadline in seconds for the response
+
+        Returns:
+            HTTP-equivalent status code and response body
+
+        Raises:
+            RpcUnavailableError: The channel could not be opened, the request was not sent
+            ConnectionError: The channel dropped while the request was in flight
+            TimeoutError: No response before the deadline
+        """
+        request_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[request_id] = queue
+        finished = False
+        try:
+            await self._send({"id": request_id, "method": method, "params": params})
+            while True:
+                kind, payload = await asyncio.wait_for(queue.get(), timeout=timeout)
+                if kind == "error":
+                    finished = True
+                    raise payload
+                if kind == "result":
+                    finished = True
+                    return payload
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"Sandbox RPC {method} timed out") from e
+        finally:
+            self._pending.pop(request_id, None)
+            # Timed out or the caller was cancelled, stop the work in the sandbox too
+            if not finished:
+                await self._cancel(request_id)
+
+    async def stream(self, method: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Send a stream request and yield its pushed events until the final response
+
+        Raises:
+            RpcUnavailableError: The channel could not be opened
+            ConnectionError: The channel dropped or the sandbox rejected the request
+        """
+        request_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[request_id] = queue
+        finished = False
+        try:
+            await self._send({"id": request_id, "method": method, "params": params})
+            while True:
+                kind, payload = await queue.get()
+                if kind == "event":
+                    yield payload
+                    continue
+                finished = True
+                if kind == "error":
+                    raise payload
+                status, body = payload
+                if status >= 400:
+                    raise ConnectionError(f"Sandbox RPC {method} failed: {body.get('message')}")
+                return
+        finally:
+            self._pending.pop(request_id, None)
+            if not finished:
+                await self._cancel(request_id)
+
+    async def close(self) -> None:
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            await ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
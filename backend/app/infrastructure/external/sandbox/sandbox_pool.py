@@ -0,0 +1,178 @@
+from collections import deque
+from typing import Deque, Optional, Set, Tuple, Type
+import asyncio
+import logging
+import time
+from app.domain.external.sandbox import Sandbox
+from app.domain.external.sandbox_pool import SandboxPool
+from app.domain.models.sandbox_pool import SandboxPoolStats
+
+logger = logging.getLogger(__name__)
+
+
+class DockerSandboxPool(SandboxPool):
+    """Keeps pre-started, health-checked sandboxes ready for new sessions
+
+    The pool warms sandboxes up to a target size between min_size and max_size.
+    Every miss grows the target by one (up to max_size), every idle sandbox that
+    reaches its TTL unused shrinks it back towards min_size. Idle sandboxes are
+    recycled before the sandbox's own inactivity timeout kills them, and dropped
+    as soon as a health check fails.
+    """
+
+    def __init__(
+        self,
+        sandbox_cls: Type[Sandbox],
+        min_size: int = 1,
+        max_size: int = 4,
+        ttl_seconds: float = 20 * 60,
+        check_interval: float = 30,
+        health_check_timeout: float = 10,
+        ready_timeout: float = 120,
+    ):
+        self._sandbox_cls = sandbox_cls
+        self._min_size = min_size
+        self._max_size = max(max_size, min_size)
+        self._ttl_seconds = ttl_seconds
+        self._check_interval = check_interval
+        self._health_check_timeout = health_check_timeout
+        self._ready_timeout = ready_timeout
+        self._target_size = min_size
+        # (sandbox, monotonic creation time), oldest first
+        self._idle: Deque[Tuple[Sandbox, float]] = deque()
+        self._warming = 0
+        self._background: Set[asyncio.Task] = set()
+        self._warm_tasks: Set[asyncio.Task] = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._stats = SandboxPoolStats(target_size=min_size)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine in the background, keeping a reference until it is done"""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def _is_expired(self, created_at: float) -> bool:
+        return time.monotonic() - created_at >= self._ttl_seconds
+
+    def _record_wait(self, started: float) -> None:
+        wait_ms = (time.monotonic() - started) * 1000
+        self._stats.total_wait_ms += wait_ms
+        self._stats.max_wait_ms = max(self._stats.max_wait_ms, wait_ms)
+
+    async def _destroy(self, sandbox: Sandbox) -> None:
+        try:
+            await sandbox.destroy()
+        except Exception as e:
+            logger.warning(f"Failed to destroy pooled sandbox {sandbox.id}: {e}")
+
+    async def _warm_one(self) -> None:
+        """Create a sandbox and add it to the pool once all its services are running"""
+        sandbox = None
+        try:
+            sandbox = await self._sandbox_cls.create()
+            await asyncio.wait_for(sandbox.ensure_sandbox(), timeout=self._ready_timeout)
+            self._idle.append((sandbox, time.monotonic()))
+            self._stats.created += 1
+            logger.info(f"Sandbox {sandbox.id} warmed, {len(self._idle)} idle in pool")
+        except Exception as e:
+            self._stats.failed += 1
+            logger.warning(f"Failed to warm sandbox: {e}")
+            if sandbox:
+                await self._destroy(sandbox)
+        except BaseException:
+            # Cancelled by stop(), the half-started container must not leak
+            if sandbox:
+                await self._destroy(sandbox)
+            raise
+        finally:
+            self._warming -= 1
+
+    def _replenish(self) -> None:
+        """Start warming sandboxes until idle plus warming reaches the target size"""
+        missing = self._target_size - len(self._idle) - self._warming
+        for _ in range(max(missing, 0)):
+            self._warming += 1
+            task = self._spawn(self._warm_one())
+            self._warm_tasks.add(task)
+            task.add_done_callback(self._warm_tasks.discard)
+
+    async def _check_idle(self) -> None:
+        """Recycle expired idle sandboxes and drop unhealthy ones"""
+        for entry in list(self._idle):
+            sandbox, created_at = entry
+            if self._is_expired(created_at):
+                healthy = False
+                self._stats.recycled += 1
+                # Nobody needed it during its lifetime, shrink towards min_size
+                self._target_size = max(self._target_size - 1, self._min_size)
+            else:
+                try:
+                    await asyncio.wait_for(sandbox.ensure_sandbox(), timeout=self._health_check_timeout)
+                    healthy = True
+                except Exception as e:
+                    logger.warning(f"Pooled sandbox {sandbox.id} failed health check: {e!r}")
+                    self._stats.failed += 1
+                    healthy = False
+            # The sandbox may have been leased while being checked
+            if not healthy and entry in self._idle:
+                self._idle.remove(entry)
+                self._spawn(self._destroy(sandbox))
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                await self._check_idle()
+                self._replenish()
+            except Exception as e:
+                logger.exception(f"Sandbox pool maintenance failed: {e}")
+            await asyncio.sleep(self._check_interval)
+
+    async def start(self) -> None:
+        if self._maintenance_task is None:
+            logger.info(f"Starting sandbox pool (min={self._min_size}, max={self._max_size}, ttl={self._ttl_seconds}s)")
+            self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        cancelled = list(self._warm_tasks)
+        if self._maintenance_task:
+            cancelled.append(self._maintenance_task)
+            self._maintenance_task = None
+        for task in cancelled:
+            task.cancel()
+        # Warm-ups destroy their sandbox when cancelled, pending destroys run to completion
+        await asyncio.gather(*cancelled, *self._background, return_exceptions=True)
+        idle = [sandbox for sandbox, _ in self._idle]
+        self._idle.clear()
+        await asyncio.gather(*(self._destroy(sandbox) for sandbox in idle))
+        logger.info(f"Sandbox pool stopped, destroyed {len(idle)} idle sandboxes, stats: {self.get_stats()}")
+
+    async def acquire(self) -> Sandbox:
+        started = time.monotonic()
+        while self._idle:
+            sandbox, created_at = self._idle.popleft()
+            if self._is_expired(created_at):
+                self._stats.recycled += 1
+                self._spawn(self._destroy(sandbox))
+                continue
+            self._stats.hits += 1
+            self._record_wait(started)
+            self._replenish()
+            logger.info(f"Leased pooled sandbox {sandbox.id} (hit rate {self._stats.hit_rate:.0%})")
+            return sandbox
+
+        self._stats.misses += 1
+        self._target_size = min(self._target_size + 1, self._max_size)
+        self._replenish()
+        sandbox = await self._sandbox_cls.create()
+        self._record_wait(started)
+        logger.info(f"Sandbox pool empty, created sandbox {sandbox.id} on demand (hit rate {self._stats.hit_rate:.0%})")
+        return sandbox
+
+    def get_stats(self) -> SandboxPoolStats:
+        return self._stats.model_copy(update={
+            "idle": len(self._idle),
+            "warming": self._warming,
+            "target_size": self._target_size,
+        })
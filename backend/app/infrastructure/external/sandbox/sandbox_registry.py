@@ -0,0 +1,46 @@
+from typing import Dict, Optional
+import logging
+from app.domain.external.sandbox import Sandbox
+
+logger = logging.getLogger(__name__)
+
+
+class SandboxRegistry:
+    """Maps sandbox ID to its live sandbox instance
+
+    Every lookup of the same sandbox returns the same instance, so all sessions and
+    API requests share its keep-alive connections. Entries are evicted when the
+    sandbox is destroyed, fails to answer, or its address changes; the next lookup
+    then builds a fresh instance.
+    """
+
+    def __init__(self):
+        self._sandboxes: Dict[str, Sandbox] = {}
+
+    def get(self, sandbox_id: str) -> Optional[Sandbox]:
+        return self._sandboxes.get(sandbox_id)
+
+    def register(self, sandbox: Sandbox) -> None:
+        self._sandboxes[sandbox.id] = sandbox
+
+    def evict(self, sandbox_id: str, sandbox: Optional[Sandbox] = None, reason: str = "") -> Optional[Sandbox]:
+        """Remove a sandbox from the registry
+
+        Args:
+            sandbox_id: Sandbox ID
+            sandbox: Only evict if the registered instance is this one, so a stale
+                instance cannot evict its replacement
+            reason: Eviction reason for logging
+
+        Returns:
+            Evicted instance, None if nothing was evicted
+        """
+        current = self._sandboxes.get(sandbox_id)
+        if current is None or (sandbox is not None and current is not sandbox):
+            return None
+        del self._sandboxes[sandbox_id]
+        logger.info(f"Evicted sandbox {sandbox_id} from registry: {reason}")
+        return current
+
+    def __len__(self) -> int:
+        return len(self._sandboxes)
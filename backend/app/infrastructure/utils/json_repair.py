@@ -0,0 +1,284 @@
+import re
+from typing import List, Optional
+
+import orjson
+
+
+# Precompiled patterns, shared by every repair call
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*[ \t]*\n?(.*?)(?:```|$)", re.DOTALL)
+_COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+_BARE_TOKEN_PATTERN = re.compile(r"[^\s,:{}\[\]\"']+")
+_NUMBER_PATTERN = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_HEX4_PATTERN = re.compile(r"[0-9a-fA-F]{4}")
+
+# Literals that LLMs (and Python reprs) emit in place of JSON literals
+_LITERALS = {
+    "true": "true",
+    "True": "true",
+    "false": "false",
+    "False": "false",
+    "null": "null",
+    "None": "null",
+    "undefined": "null",
+    "NaN": "null",
+    "Infinity": "null",
+    "-Infinity": "null",
+}
+
+_VALID_ESCAPES = frozenset('"\\/bfnrt')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_STRING_TERMINATORS = frozenset(",:}]")
+
+# Parser states for an open container
+_KEY = 0     # object expects a key
+_COLON = 1   # object expects ':' after a key
+_VALUE = 2   # expects a value
+_AFTER = 3   # a value was just completed
+
+
+class _Frame:
+    __slots__ = ("closer", "state")
+
+    def __init__(self, closer: str):
+        self.closer = closer
+        self.state = _KEY if closer == "}" else _VALUE
+
+
+def extract_json_text(text: str) -> str:
+    """Strip markdown fences and surrounding prose, keeping the JSON-like part"""
+    if "```" in text:
+        for match in _FENCE_PATTERN.finditer(text):
+            block = match.group(1)
+            if "{" in block or "[" in block:
+                text = block
+                break
+    return text.strip()
+
+
+def _is_string_end(text: str, index: int) -> bool:
+    """Whether the quote at index closes the string (followed by a JSON delimiter or EOF)"""
+    n = len(text)
+    index += 1
+    while index < n and text[index] in " \t\r\n":
+        index += 1
+    return index >= n or text[index] in _STRING_TERMINATORS
+
+
+def _read_string(text: str, start: int) -> tuple:
+    """Read a single or double quoted string starting at start
+
+    Returns:
+        Tuple of (JSON encoded string, index after the closing quote)
+    """
+    quote = text[start]
+    n = len(text)
+    out = ['"']
+    i = start + 1
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            nxt = text[i + 1] if i + 1 < n else ""
+            if nxt and nxt in _VALID_ESCAPES:
+                out.append("\\" + nxt)
+                i += 2
+            elif nxt == "u" and _HEX4_PATTERN.match(text, i + 2):
+                out.append(text[i:i + 6])
+                i += 6
+            elif nxt == "'":
+                out.append("'")
+                i += 2
+            else:
+                out.append("\\\\")
+                i += 1
+            continue
+        if ch == quote:
+            if _is_string_end(text, i):
+                out.append('"')
+                return "".join(out), i + 1
+            # Unescaped quote inside the string
+            out.append('\\"' if ch == '"' else ch)
+        elif ch == '"':
+            out.append('\\"')
+        elif ch in _CONTROL_ESCAPES:
+            out.append(_CONTROL_ESCAPES[ch])
+        elif ch < " ":
+            out.append("\\u%04x" % ord(ch))
+        else:
+            out.append(ch)
+        i += 1
+    # Truncated string
+    out.append('"')
+    return "".join(out), n
+
+
+def _encode_bare_token(token: str, as_key: bool) -> str:
+    """Encode an unquoted token as a JSON literal, number or string"""
+    if not as_key:
+        if token in _LITERALS:
+            return _LITERALS[token]
+        if _NUMBER_PATTERN.fullmatch(token):
+            return token
+        try:
+            number = float(token)
+            if number == number and number not in (float("inf"), float("-inf")):
+                return orjson.dumps(number).decode()
+        except ValueError:
+            pass
+    return orjson.dumps(token).decode()
+
+
+def repair_json(text: str) -> Optional[str]:
+    """Repair common LLM JSON mistakes without any network round trip
+
+    Handles markdown fences, surrounding prose, comments, trailing or missing
+    commas, unquoted keys, single-quoted strings, unescaped inner quotes,
+    raw control characters, Python literals and truncated output.
+
+    Repairs that would have to discard or invent content in the middle of the
+    document (e.g. a stray ':' from an unquoted URL) are refused, so callers
+    can fall back to a smarter strategy instead of getting silently wrong data.
+
+    Args:
+        text: Raw LLM output
+
+    Returns:
+        Repaired JSON text, or None if no object or array can be found or the
+        repair would lose input
+    """
+    text = extract_json_text(text)
+    start = -1
+    for i, ch in enumerate(text):
+        if ch == "{" or ch == "[":
+            start = i
+            break
+    if start < 0:
+        return None
+
+    out: List[str] = []
+    stack: List[_Frame] = []
+    pending_comma = False
+    lossy = False
+    n = len(text)
+    i = start
+
+    def begin_value() -> Optional[_Frame]:
+        """Prepare output for the next token and return the current frame"""
+        nonlocal pending_comma
+        frame = stack[-1] if stack else None
+        if frame is None:
+            return None
+        if frame.state == _AFTER:
+            # Missing comma between two values
+            pending_comma = True
+            frame.state = _KEY if frame.closer == "}" else _VALUE
+        elif frame.state == _COLON:
+            # Missing colon between key and value
+            out.append(":")
+            frame.state = _VALUE
+        if pending_comma:
+            out.append(",")
+            pending_comma = False
+        return frame
+
+    def finish_value() -> None:
+        if stack:
+            stack[-1].state = _AFTER
+
+    def close_frame(truncated: bool = False) -> None:
+        nonlocal pending_comma, lossy
+        frame = stack.pop()
+        # A trailing comma is simply never emitted
+        pending_comma = False
+        if frame.state == _COLON:
+            # Only truncated output may end on a key, otherwise the key is
+            # a fragment of a value that could not be parsed
+            if not truncated:
+                lossy = True
+            out.append(":null")
+        elif frame.state == _VALUE and frame.closer == "}":
+            out.append("null")
+        out.append(frame.closer)
+        finish_value()
+
+    while i < n:
+        ch = text[i]
+        if ch in " \t\r\n":
+            i += 1
+        elif ch == "{" or ch == "[":
+            frame = begin_value()
+            if frame is not None and frame.state == _KEY:
+                # Container used as a key is not recoverable, drop the key slot
+                out.append('"":')
+                frame.state = _VALUE
+            out.append(ch)
+            stack.append(_Frame("}" if ch == "{" else "]"))
+            i += 1
+        elif ch == "}" or ch == "]":
+            i += 1
+            if stack:
+                close_frame()
+            if not stack:
+                break
+        elif ch == ",":
+            i += 1
+            if stack and stack[-1].state == _AFTER:
+                pending_comma = True
+                stack[-1].state = _KEY if stack[-1].closer == "}" else _VALUE
+        elif ch == ":":
+            i += 1
+            if stack and stack[-1].state == _COLON:
+                out.append(":")
+                stack[-1].state = _VALUE
+            else:
+                # A colon inside an unquoted value, the rest cannot be trusted
+                lossy = True
+                break
+        elif ch == '"' or ch == "'":
+            frame = begin_value()
+            encoded, i = _read_string(text, i)
+            out.append(encoded)
+            if frame is not None and frame.state == _KEY:
+                frame.state = _COLON
+            else:
+                finish_value()
+        elif ch == "/" and i + 1 < n and text[i + 1] in "/*":
+            match = _COMMENT_PATTERN.match(text, i)
+            i = match.end() if match else n
+        else:
+            match = _BARE_TOKEN_PATTERN.match(text, i)
+            if not match:
+                lossy = True
+                break
+            frame = begin_value()
+            as_key = frame is not None and frame.state == _KEY
+            out.append(_encode_bare_token(match.group(), as_key))
+            i = match.end()
+            if as_key:
+                frame.state = _COLON
+            else:
+                finish_value()
+
+    if lossy:
+        return None
+
+    # Close anything left open by truncated output
+    while stack:
+        close_frame(truncated=True)
+
+    return "".join(out)
+
+
+def loads_tolerant(text: str):
+    """Parse JSON text, repairing it locally if strict parsing fails
+
+    Raises:
+        ValueError: If the text cannot be parsed even after repair
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+    repaired = repair_json(text)
+    if repaired is None:
+        raise ValueError("No repairable JSON object or array found")
+    return orjson.loads(repaired)
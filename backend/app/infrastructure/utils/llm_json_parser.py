@@ -1,21 +1,36 @@
-import json
 import re
 from typing import Any, Dict, List, Optional, Union
 from enum import Enum
 import logging
 
+import orjson
+
 from app.domain.utils.json_parser import JsonParser
 from app.infrastructure.external.llm.openai_llm import OpenAILLM
+from app.infrastructure.utils.json_repair import loads_tolerant
 
 
 logger = logging.getLogger(__name__)
 
+# Markdown code block patterns, compiled once instead of on every parse
+_MARKDOWN_BLOCK_PATTERNS = [
+    re.compile(r'```json\s*\n(.*?)\n```', re.DOTALL | re.IGNORECASE),
+    re.compile(r'```\s*\n(.*?)\n```', re.DOTALL | re.IGNORECASE),
+    re.compile(r'`([^`]*)`', re.DOTALL | re.IGNORECASE),
+]
+
+# JSON object/array patterns used by the regex extract strategy
+_JSON_EXTRACT_PATTERNS = [
+    re.compile(r'\{.*\}', re.DOTALL),  # Object
+    re.compile(r'\[.*\]', re.DOTALL),  # Array
+]
+
 class ParseStrategy(Enum):
     """JSON parsing strategy enumeration"""
     DIRECT = "direct"
     MARKDOWN_BLOCK = "markdown_block"
     REGEX_EXTRACT = "regex_extract"
-    CLEANUP_AND_PARSE = "cleanup_and_parse"
+    LOCAL_REPAIR = "local_repair"
     LLM_EXTRACT_AND_FIX = "llm_extract_and_fix"
 
 
@@ -24,17 +39,27 @@ class LLMJsonParser(JsonParser):
     A robust parser for converting LLM string output to JSON.
     Handles various formats including markdown code blocks, malformed JSON, etc.
     Inherits from domain JsonParser interface and uses LLM when needed.
+    Local strategies are always tried first; the LLM round trip is a metered last resort.
     """
     
     def __init__(self):
         self.llm = OpenAILLM()
         self.strategies = [
-            self._try_direct_parse,
-            self._try_markdown_block_parse,
-            #self._try_regex_extract,
-            self._try_cleanup_and_parse,
-            self._try_llm_extract_and_fix,
+            (ParseStrategy.DIRECT, self._try_direct_parse),
+            (ParseStrategy.MARKDOWN_BLOCK, self._try_markdown_block_parse),
+            #(ParseStrategy.REGEX_EXTRACT, self._try_regex_extract),
+            (ParseStrategy.LOCAL_REPAIR, self._try_local_repair),
+            (ParseStrategy.LLM_EXTRACT_AND_FIX, self._try_llm_extract_and_fix),
         ]
+        # Number of successful parses per strategy
+        self._strategy_hits: Dict[ParseStrategy, int] = {strategy: 0 for strategy, _ in self.strategies}
+        self._total_parses = 0
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get successful parse counts per strategy"""
+        stats = {strategy.value: count for strategy, count in self._strategy_hits.items()}
+        stats["total"] = self._total_parses
+        return stats
     
     async def parse(self, text: str, default_value: Optional[Any] = None) -> Union[Dict, List, Any]:
         """
@@ -52,23 +77,30 @@ class LLMJsonParser(JsonParser):
             ValueError: If all parsing strategies fail and no default value provided
         """
 
-        logger.info(f"Parsing text: {text}")
+        logger.debug(f"Parsing text: {text}")
         if not text or not text.strip():
             if default_value is not None:
                 return default_value
             raise ValueError("Empty input string")
         
         cleaned_output = text.strip()
+        self._total_parses += 1
         
         # Try each parsing strategy
-        for strategy in self.strategies:
+        for strategy, handler in self.strategies:
+            if strategy == ParseStrategy.LLM_EXTRACT_AND_FIX:
+                logger.warning(
+                    f"Local JSON parsing failed, falling back to LLM "
+                    f"({self._strategy_hits[strategy] + 1}/{self._total_parses} parses so far)"
+                )
             try:
-                result = await strategy(cleaned_output)
+                result = await handler(cleaned_output)
                 if result is not None:
-                    logger.info(f"Successfully parsed using strategy: {strategy.__name__}")
+                    self._strategy_hits[strategy] += 1
+                    logger.debug(f"Successfully parsed using strategy: {strategy.value}")
                     return result
             except Exception as e:
-                logger.warning(f"Strategy {strategy.__name__} failed: {str(e)}")
+                logger.debug(f"Strategy {strategy.value} failed: {str(e)}")
                 continue
         
         # If all strategies fail
@@ -80,69 +112,38 @@ class LLMJsonParser(JsonParser):
     
     async def _try_direct_parse(self, text: str) -> Optional[Any]:
         """Try to parse the text directly as JSON"""
-        return json.loads(text)
+        return orjson.loads(text)
     
     async def _try_markdown_block_parse(self, text: str) -> Optional[Any]:
         """Extract and parse JSON from markdown code blocks"""
-        # Pattern to match JSON in markdown code blocks
-        patterns = [
-            r'```json\s*\n(.*?)\n```',
-            r'```\s*\n(.*?)\n```',
-            r'`([^`]*)`',
-        ]
+        if "`" not in text:
+            return None
         
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-            for match in matches:
+        for pattern in _MARKDOWN_BLOCK_PATTERNS:
+            for match in pattern.findall(text):
                 try:
-                    return json.loads(match.strip())
-                except json.JSONDecodeError:
+                    return orjson.loads(match.strip())
+                except orjson.JSONDecodeError:
                     continue
         
         return None
     
     async def _try_regex_extract(self, text: str) -> Optional[Any]:
         """Extract JSON using regex patterns"""
-        # Look for JSON object patterns
-        json_patterns = [
-            r'\{.*\}',  # Object
-            r'\[.*\]',  # Array
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
-            for match in matches:
+        for pattern in _JSON_EXTRACT_PATTERNS:
+            for match in pattern.findall(text):
                 try:
-                    return json.loads(match)
-                except json.JSONDecodeError:
+                    return orjson.loads(match)
+                except orjson.JSONDecodeError:
                     continue
         
         return None
     
-    async def _try_cleanup_and_parse(self, text: str) -> Optional[Any]:
-        """Clean up common formatting issues and try parsing"""
-        # Remove common prefixes/suffixes
-        prefixes = ["json:", "result:", "output:", "response:"]
-        suffixes = [".", "..."]
-        
-        cleaned = text
-        
-        # Remove prefixes
-        for prefix in prefixes:
-            if cleaned.lower().startswith(prefix.lower()):
-                cleaned = cleaned[len(prefix):].strip()
-        
-        # Remove suffixes
-        for suffix in suffixes:
-            if cleaned.endswith(suffix):
-                cleaned = cleaned[:-len(suffix)].strip()
-        
-        # Fix common JSON formatting issues
-        cleaned = self._fix_json_formatting(cleaned)
-        
+    async def _try_local_repair(self, text: str) -> Optional[Any]:
+        """Repair common formatting issues locally and try parsing"""
         try:
-            return json.loads(cleaned)
-        except json.JSONDecodeError:
+            return loads_tolerant(text)
+        except ValueError:
             return None
     
     async def _try_llm_extract_and_fix(self, text: str) -> Optional[Any]:
@@ -184,56 +185,11 @@ JSON:"""
                 response_format={"type": "json_object"}
             )
             
-            content = response.get("content", "").strip()
+            content = (response.get("content") or "").strip()
             if content and content != "null":
-                return json.loads(content)
+                return orjson.loads(content)
             return None
             
         except Exception as e:
             logger.warning(f"LLM JSON extraction failed: {str(e)}")
             return None
-    
-    def _fix_json_formatting(self, text: str) -> str:
-        """Fix common JSON formatting issues"""
-        # Replace single quotes with double quotes (but not inside strings)
-        # This is a simplified approach - might need more sophisticated handling
-        text = re.sub(r"(?<!\\)'([^']*?)(?<!\\)'", r'"\1"', text)
-        
-        # Fix trailing commas
-        text = re.sub(r',(\s*[}\]])', r'\1', text)
-        
-        # Fix missing quotes around keys
-        text = re.sub(r'(\w+):', r'"\1":', text)
-        
-        # Fix unescaped double quotes in string values
-        # This handles cases like: "key": "value with " unescaped quotes"
-        def fix_unescaped_quotes_in_values(match):
-            key_part = match.group(1)  # "key": "
-            value_content = match.group(2)  # value content that may contain unescaped quotes
-            
-            # Escape any unescaped double quotes in the value content
-            # Use negative lookbehind to avoid escaping already escaped quotes
-            escaped_content = re.sub(r'(?<!\\)"', r'\\"', value_content)
-            
-            return f'{key_part}{escaped_content}"'
-        
-        # Pattern to match: "key": "value content with potential " unescaped quotes"
-        # Captures everything from key to the final quote of the value
-        text = re.sub(r'("[\w\s\-_]+"\s*:\s*")(.*?)"(?=\s*[,}\]])', fix_unescaped_quotes_in_values, text)
-        
-        # Fix unescaped double quotes in array string values
-        # This handles cases like: ["item with " quotes", "another item"]
-        def fix_unescaped_quotes_in_array_values(match):
-            quote_and_content = match.group(1)  # " + content that may contain unescaped quotes
-            value_content = quote_and_content[1:]  # remove the leading quote
-            
-            # Escape any unescaped double quotes in the value content
-            escaped_content = re.sub(r'(?<!\\)"', r'\\"', value_content)
-            
-            return f'"{escaped_content}"'
-        
-        # Pattern to match string values in arrays: "content with potential " quotes"
-        # Look for quotes that are preceded by [ or , (with optional whitespace) and followed by , or ] (with optional whitespace)
-        text = re.sub(r'(?<=[\[,]\s*)(".*?)"(?=\s*[,\]])', fix_unescaped_quotes_in_array_values, text)
-        
-        return text
@@ -60,7 +60,10 @@ async def download_file(
     headers = {
         'Content-Disposition': f'attachment; filename*=UTF-8\'\'{encoded_filename}'
     }
+    if file_info.size is not None:
+        headers['Content-Length'] = str(file_info.size)
     
+    # Chunks are read from storage as the client consumes them
     return StreamingResponse(
         file_data,
         media_type=file_info.content_type or 'application/octet-stream',
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import session_routes, file_routes
+from . import session_routes, file_routes, status_routes
 from .session_routes import get_agent_service
 
 def create_api_router() -> APIRouter:
@@ -9,6 +9,7 @@ def create_api_router() -> APIRouter:
     # Include all sub-routers
     api_router.include_router(session_routes.router)
     api_router.include_router(file_routes.router)
+    api_router.include_router(status_routes.router)
     
     return api_router
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from sse_starlette.sse import EventSourceResponse
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator, List, Optional
 from sse_starlette.event import ServerSentEvent
 from datetime import datetime
 import asyncio
@@ -11,10 +11,12 @@ from app.application.services.agent_service import AgentService
 from app.interfaces.schemas.request import ChatRequest, FileViewRequest, ShellViewRequest
 from app.interfaces.schemas.response import (
     APIResponse, CreateSessionResponse, GetSessionResponse, 
-    ListSessionItem, ListSessionResponse
+    ListSessionItem, ListSessionResponse, SessionProfileResponse,
+    FileViewResponse, FileDiffResponse, ShellViewResponse, ShellDeltaResponse
 )
 from app.interfaces.schemas.event import SSEEventFactory
 from app.domain.models.file import FileInfo
+from app.domain.utils.line_diff import line_range_diff
 
 logger = logging.getLogger(__name__)
 SESSION_POLL_INTERVAL = 5
@@ -49,6 +51,15 @@ async def get_session(
         events=SSEEventFactory.from_events(session.events)
     ))
 
+@router.get("/{session_id}/profile", response_model=APIResponse[SessionProfileResponse])
+async def get_session_profile(
+    session_id: str,
+    agent_service: AgentService = Depends(get_agent_service)
+) -> APIResponse[SessionProfileResponse]:
+    """Get per-step latency breakdown (LLM, tools, file sync, storage, repository) of a session"""
+    profile = await agent_service.get_session_profile(session_id)
+    return APIResponse.success(profile)
+
 @router.delete("/{session_id}", response_model=APIResponse[None])
 async def delete_session(
     session_id: str,
@@ -146,18 +157,43 @@ async def view_shell(
         request: Shell view request containing session ID
         
     Returns:
-        EventSourceResponse with shell output updates
+        EventSourceResponse with shell output updates, sent only when the output changes
     """
     async def event_generator() -> AsyncGenerator[ServerSentEvent, None]:
-        while True:
-            result = await agent_service.shell_view(session_id, request.session_id)
-            yield ServerSentEvent(
-                event="shell",
-                data=result.model_dump_json()
-            )
-            await asyncio.sleep(TOOL_POLL_INTERVAL)
+        sent: Optional[ShellViewResponse] = None
+        async for result in agent_service.shell_view_updates(session_id, request.session_id, TOOL_POLL_INTERVAL):
+            if result == sent:
+                continue
+            yield _shell_view_event(sent, result, request.diff)
+            sent = result
     return EventSourceResponse(event_generator())
 
+def _shell_view_event(sent: Optional[ShellViewResponse], result: ShellViewResponse, diff: bool) -> ServerSentEvent:
+    """Full view event, or the changed console records when the client already has an earlier view"""
+    if diff and sent is not None and sent.console and result.console is not None:
+        start = 0
+        while start < min(len(sent.console), len(result.console)) and sent.console[start] == result.console[start]:
+            start += 1
+        records = result.console[start:]
+        append = False
+        if start < len(sent.console) and records:
+            previous, current = sent.console[start], records[0]
+            # Running commands only grow their output, send what was added
+            if (previous.ps1, previous.command) == (current.ps1, current.command) \
+                    and current.output.startswith(previous.output):
+                records[0] = current.model_copy(update={"output": current.output[len(previous.output):]})
+                append = True
+        return ServerSentEvent(
+            event="shell_delta",
+            data=ShellDeltaResponse(
+                session_id=result.session_id,
+                start_record=start,
+                append=append,
+                console=records
+            ).model_dump_json()
+        )
+    return ServerSentEvent(event="shell", data=result.model_dump_json())
+
 @router.post("/{session_id}/file")
 async def view_file(
     session_id: str,
@@ -173,18 +209,45 @@ async def view_file(
         request: File view request containing file path
         
     Returns:
-        EventSourceResponse with file content updates
+        EventSourceResponse with file content updates, sent only when the content changes
     """
     async def event_generator() -> AsyncGenerator[ServerSentEvent, None]:
-        while True:
-            result = await agent_service.file_view(session_id, request.file)
-            yield ServerSentEvent(
-                event="file",
-                data=result.model_dump_json()
-            )
-            await asyncio.sleep(TOOL_POLL_INTERVAL)
+        # Re-read the file when the sandbox reports a change to it
+        changes = agent_service.watch_file(session_id, request.file, TOOL_POLL_INTERVAL)
+        sent: Optional[FileViewResponse] = None
+        try:
+            while True:
+                result = await agent_service.file_view(
+                    session_id, request.file, sent.version if sent else None
+                )
+                if result is not None:
+                    # Touched but identical files and repeated errors are not resent
+                    if sent is None or result.content != sent.content:
+                        yield _file_view_event(sent, result, request.diff)
+                    sent = result
+                await anext(changes)
+        finally:
+            await changes.aclose()
     return EventSourceResponse(event_generator())
 
+def _file_view_event(sent: Optional[FileViewResponse], result: FileViewResponse, diff: bool) -> ServerSentEvent:
+    """Full content event, or the changed line range when the client already has an earlier version"""
+    if diff and sent is not None:
+        start_line, end_line, lines = line_range_diff(sent.content, result.content)
+        # Rewrites of most of the file are cheaper to send whole
+        if sum(len(line) + 1 for line in lines) < len(result.content):
+            return ServerSentEvent(
+                event="file_diff",
+                data=FileDiffResponse(
+                    file=result.file,
+                    version=result.version,
+                    start_line=start_line,
+                    end_line=end_line,
+                    lines=lines
+                ).model_dump_json()
+            )
+    return ServerSentEvent(event="file", data=result.model_dump_json())
+
 @router.websocket("/{session_id}/vnc")
 async def vnc_websocket(
     websocket: WebSocket,
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+
+from app.application.services.agent_service import AgentService
+from app.interfaces.schemas.response import APIResponse, StatusResponse
+from app.interfaces.api.session_routes import get_agent_service
+from app.infrastructure.external.sandbox.docker_client import get_docker_client
+
+router = APIRouter(prefix="/status", tags=["status"])
+
+@router.get("", response_model=APIResponse[StatusResponse])
+async def get_status(
+    agent_service: AgentService = Depends(get_agent_service)
+) -> APIResponse[StatusResponse]:
+    """Get runtime metrics of the sandbox pool and the Docker control plane"""
+    return APIResponse.success(StatusResponse(
+        sandbox_pool=agent_service.get_sandbox_pool_stats(),
+        docker_client=get_docker_client().get_stats(),
+    ))
@@ -9,6 +9,10 @@ class ChatRequest(BaseModel):
 
 class FileViewRequest(BaseModel):
     file: str
+    # Send changes after the first event as file_diff line ranges instead of full content
+    diff: bool = False
 
 class ShellViewRequest(BaseModel):
     session_id: str
+    # Send changes after the first event as shell_delta records instead of the full view
+    diff: bool = False
@@ -3,6 +3,10 @@ from datetime import datetime
 from pydantic import BaseModel
 from app.interfaces.schemas.event import AgentSSEEvent
 from app.domain.models.session import SessionStatus
+from app.domain.models.plan import ExecutionStatus
+from app.domain.models.timing import Timing
+from app.domain.models.sandbox_pool import SandboxPoolStats
+from app.infrastructure.external.sandbox.docker_client import DockerClientStats
 
 T = TypeVar('T')
 
@@ -40,6 +44,17 @@ class ListSessionItem(BaseModel):
 class ListSessionResponse(BaseModel):
     sessions: List[ListSessionItem]
 
+class StepProfile(BaseModel):
+    step_id: str
+    description: str
+    status: ExecutionStatus
+    timing: Timing
+
+class SessionProfileResponse(BaseModel):
+    session_id: str
+    steps: List[StepProfile]
+    total: Timing
+
 class ConsoleRecord(BaseModel):
     ps1: str
     command: str
@@ -50,9 +65,29 @@ class ShellViewResponse(BaseModel):
     session_id: str
     console: Optional[List[ConsoleRecord]] = None
 
+class ShellDeltaResponse(BaseModel):
+    """Replace console records from start_record on with console
+
+    When append is set, the output of the first record continues the output of the
+    record already received at start_record instead of replacing it.
+    """
+    session_id: str
+    start_record: int
+    append: bool = False
+    console: List[ConsoleRecord]
+
 class FileViewResponse(BaseModel):
     content: str
     file: str
+    version: Optional[str] = None
+
+class FileDiffResponse(BaseModel):
+    """Replace lines [start_line, end_line) of the previously sent content with lines"""
+    file: str
+    version: Optional[str] = None
+    start_line: int
+    end_line: int
+    lines: List[str]
 
 class FileUploadResponse(BaseModel):
     file_id: str
@@ -69,3 +104,7 @@ class FileInfoResponse(BaseModel):
     size: int
     upload_date: str
     metadata: Optional[Dict[str, Any]]
+
+class StatusResponse(BaseModel):
+    sandbox_pool: Optional[SandboxPoolStats] = None
+    docker_client: DockerClientStats
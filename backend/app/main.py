@@ -15,6 +15,8 @@ from app.infrastructure.external.search.google_search import GoogleSearchEngine
 from app.infrastructure.external.search.baidu_search import BaiduSearchEngine
 from app.infrastructure.external.llm.openai_llm import OpenAILLM
 from app.infrastructure.external.sandbox.docker_sandbox import DockerSandbox
+from app.infrastructure.external.sandbox.sandbox_pool import DockerSandboxPool
+from app.infrastructure.external.sandbox.docker_client import get_docker_client
 from app.infrastructure.external.file.gridfsfile import GridFSFileStorage
 from app.infrastructure.repositories.mongo_agent_repository import MongoAgentRepository
 from app.infrastructure.repositories.mongo_session_repository import MongoSessionRepository
@@ -57,6 +59,17 @@ def create_agent_service() -> AgentService:
     else:
         logger.warning(f"Unknown search provider: {settings.search_provider}")
 
+    sandbox_pool = None
+    # A fixed sandbox address has nothing to pre-start
+    if settings.sandbox_pool_min_size > 0 and not settings.sandbox_address:
+        logger.info("Initializing sandbox pool")
+        sandbox_pool = DockerSandboxPool(
+            DockerSandbox,
+            min_size=settings.sandbox_pool_min_size,
+            max_size=settings.sandbox_pool_max_size,
+            ttl_seconds=settings.sandbox_pool_ttl_minutes * 60,
+        )
+
     return AgentService(
         llm=OpenAILLM(),
         agent_repository=MongoAgentRepository(),
@@ -67,6 +80,8 @@ def create_agent_service() -> AgentService:
         file_storage=file_storage,
         search_engine=search_engine,
         mcp_repository=FileMCPRepository(),
+        sandbox_pool=sandbox_pool,
+        max_steps=settings.agent_max_steps,
     )
 
 # Create agent service instance
@@ -106,6 +121,9 @@ async def lifespan(app: FastAPI):
     
     # Initialize Redis
     await get_redis().initialize()
+
+    # Start warming sandboxes
+    await agent_service.start()
     
     try:
         yield
@@ -117,6 +135,8 @@ async def lifespan(app: FastAPI):
         # Disconnect from Redis
         await get_redis().shutdown()
         await shutdown()
+        # Sandboxes are destroyed by now, release the Docker control plane
+        await get_docker_client().close()
 
 app = FastAPI(title="Manus AI Agent", lifespan=lifespan)
 app.dependency_overrides[get_agent_service] = lambda: agent_service
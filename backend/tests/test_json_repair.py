@@ -0,0 +1,52 @@
+"""
+Unit tests for the local JSON repair engine
+"""
+import pytest
+
+from app.infrastructure.utils.json_repair import repair_json, loads_tolerant
+
+
+@pytest.mark.parametrize("text,expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1, "b": [1, 2,],}\n```', {"a": 1, "b": [1, 2]}),
+    ("{'a': 'it's ok', b: True, c: None}", {"a": "it's ok", "b": True, "c": None}),
+    ('Here is the plan: {"goal": "x", "steps": []} Hope it helps.', {"goal": "x", "steps": []}),
+    ('{"a": "he said "hi" to me", "b": 2}', {"a": 'he said "hi" to me', "b": 2}),
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}),
+    ('{"a": "line1\nline2"}', {"a": "line1\nline2"}),
+    ('{\n  // comment\n  "a": 1 /* inline */\n}', {"a": 1}),
+])
+def test_repair_common_mistakes(text, expected):
+    """Test repair of common LLM JSON formatting mistakes"""
+    assert loads_tolerant(text) == expected
+
+
+def test_repair_truncated_object():
+    """Test truncated output is closed"""
+    text = '{"title": "Plan", "steps": [{"id": "1", "description": "Open the bro'
+    assert loads_tolerant(text) == {
+        "title": "Plan",
+        "steps": [{"id": "1", "description": "Open the bro"}],
+    }
+
+
+def test_repair_dangling_key():
+    """Test a key without value becomes null"""
+    assert loads_tolerant('{"a": 1, "b":') == {"a": 1, "b": None}
+    assert loads_tolerant('{"a": 1, "b"') == {"a": 1, "b": None}
+
+
+def test_repair_no_json():
+    """Test text without any object or array"""
+    assert repair_json("no json here") is None
+    with pytest.raises(ValueError):
+        loads_tolerant("no json here")
+
+
+@pytest.mark.parametrize("text", [
+    '{url: http://x.com}',
+    '{"a": hello world}',
+])
+def test_repair_refuses_lossy_input(text):
+    """Test that input which would be dropped or guessed is not repaired"""
+    assert repair_json(text) is None
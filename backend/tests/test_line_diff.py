@@ -0,0 +1,63 @@
+"""
+Unit tests for the line range diff used by file viewer updates
+"""
+import pytest
+
+from app.domain.utils.line_diff import line_range_diff
+
+
+def _apply(old: str, diff) -> str:
+    lines = old.split("\n")
+    lines[diff.start_line:diff.end_line] = diff.lines
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("old,new", [
+    ("a\nb\nc", "a\nb\nc\nd"),
+    ("a\nb\nc", "a\nX\nc"),
+    ("a\nb\nc", "a"),
+    ("a\nb\nc", ""),
+    ("", "a\nb"),
+    ("a\nb\n", "a\nb\nc\n"),
+    ("x\na\na\na", "x\na\na"),
+    ("line\n", "line"),
+    ("a\r\nb", "a\r\nc"),
+])
+def test_patch_restores_new_content(old, new):
+    """Test that applying the diff to the old content yields the new content exactly"""
+    assert _apply(old, line_range_diff(old, new)) == new
+
+
+def test_append_keeps_common_prefix():
+    """Test that appended lines only replace the trailing empty line"""
+    diff = line_range_diff("a\nb\n", "a\nb\nc\n")
+    assert (diff.start_line, diff.end_line) == (2, 2)
+    assert diff.lines == ["c"]
+
+
+def test_in_place_edit_is_a_single_line():
+    """Test that an edited line in the middle is replaced alone"""
+    diff = line_range_diff("a\nb\nc", "a\nX\nc")
+    assert (diff.start_line, diff.end_line) == (1, 2)
+    assert diff.lines == ["X"]
+
+
+def test_truncation_removes_tail():
+    """Test that truncated content removes the dropped lines"""
+    diff = line_range_diff("a\nb\nc", "a")
+    assert (diff.start_line, diff.end_line) == (1, 3)
+    assert diff.lines == []
+
+
+def test_identical_content_is_empty_patch():
+    """Test that unchanged content produces an empty range"""
+    diff = line_range_diff("a\nb", "a\nb")
+    assert diff.start_line == diff.end_line
+    assert diff.lines == []
+
+
+def test_repeated_lines_do_not_overlap():
+    """Test that prefix and suffix never share lines when content repeats"""
+    diff = line_range_diff("a\na\na", "a\na")
+    assert diff.start_line <= diff.end_line
+    assert _apply("a\na\na", diff) == "a\na"
@@ -115,12 +115,12 @@ async def test_file_download_success(sandbox_instance, sample_binary_stream, sam
     result = await sandbox_instance.file_download(temp_file_path)
 
     # Verify result
-    content = result.read()
+    content = b"".join([chunk async for chunk in result])
     assert content == sample_file_content
 
-    # Reset stream position and verify we can read again
-    result.seek(0)
-    content_again = result.read()
+    # A stream is consumed once, downloading again yields the same content
+    result_again = await sandbox_instance.file_download(temp_file_path)
+    content_again = b"".join([chunk async for chunk in result_again])
     assert content_again == sample_file_content
 
 
@@ -148,7 +148,7 @@ async def test_file_download_empty_file(sandbox_instance, temp_file_path):
     result = await sandbox_instance.file_download(temp_file_path)
 
     # Verify result
-    content = result.read()
+    content = b"".join([chunk async for chunk in result])
     assert content == b""
 
 
@@ -169,7 +169,7 @@ async def test_file_download_large_file(sandbox_instance, temp_file_path):
     result = await sandbox_instance.file_download(temp_file_path)
 
     # Verify result
-    content = result.read()
+    content = b"".join([chunk async for chunk in result])
     assert content == large_content
     assert len(content) == 1024 * 1024
 
@@ -194,7 +194,7 @@ async def test_upload_then_download_cycle(sandbox_instance, sample_file_content,
     download_result = await sandbox_instance.file_download(temp_file_path)
 
     # Verify download result matches original content
-    downloaded_content = download_result.read()
+    downloaded_content = b"".join([chunk async for chunk in download_result])
     assert downloaded_content == sample_file_content
 
 
@@ -226,7 +226,7 @@ async def test_multiple_file_operations(sandbox_instance, temp_file_path):
     # Download and verify all files
     for file_path, expected_content in uploaded_paths:
         download_result = await sandbox_instance.file_download(file_path)
-        downloaded_content = download_result.read()
+        downloaded_content = b"".join([chunk async for chunk in download_result])
         assert downloaded_content == expected_content
 
 
@@ -256,6 +256,6 @@ async def test_file_overwrite(sandbox_instance, temp_file_path):
 
     # Download and verify new content
     download_result = await sandbox_instance.file_download(temp_file_path)
-    downloaded_content = download_result.read()
+    downloaded_content = b"".join([chunk async for chunk in download_result])
     assert downloaded_content == new_content
     assert downloaded_content != initial_content 
\ No newline at end of file
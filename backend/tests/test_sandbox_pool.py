@@ -0,0 +1,157 @@
+"""
+Unit tests for the warm sandbox pool
+"""
+import asyncio
+import itertools
+
+from app.infrastructure.external.sandbox.sandbox_pool import DockerSandboxPool
+
+
+class FakeSandbox:
+    """Sandbox stand-in recording its lifecycle"""
+    _ids = itertools.count()
+    created = []
+    healthy = True
+
+    def __init__(self):
+        self.id = f"sandbox-{next(self._ids)}"
+        self.destroyed = False
+
+    @classmethod
+    async def create(cls):
+        sandbox = cls()
+        cls.created.append(sandbox)
+        return sandbox
+
+    async def ensure_sandbox(self):
+        if not type(self).healthy:
+            raise RuntimeError("unhealthy")
+
+    async def destroy(self):
+        self.destroyed = True
+        return True
+
+
+def _sandbox_cls(healthy: bool = True):
+    return type("Sandbox", (FakeSandbox,), {"created": [], "healthy": healthy})
+
+
+async def _settle(pool: DockerSandboxPool):
+    while pool._background:
+        await asyncio.gather(*list(pool._background), return_exceptions=True)
+
+
+async def test_acquire_hits_warmed_sandbox():
+    """Test that a warmed sandbox is leased and the pool replenishes behind it"""
+    cls = _sandbox_cls()
+    pool = DockerSandboxPool(cls, min_size=1, max_size=2)
+    pool._replenish()
+    await _settle(pool)
+    warmed = cls.created[0]
+
+    sandbox = await pool.acquire()
+    await _settle(pool)
+
+    assert sandbox is warmed
+    stats = pool.get_stats()
+    assert stats.hits == 1 and stats.misses == 0
+    assert stats.idle == 1
+    assert stats.hit_rate == 1.0
+
+
+async def test_miss_grows_target_up_to_max_size():
+    """Test that misses create on demand and grow the target size"""
+    # Warm-ups never become ready, so every acquire misses
+    cls = _sandbox_cls(healthy=False)
+    pool = DockerSandboxPool(cls, min_size=1, max_size=2)
+
+    for _ in range(3):
+        await pool.acquire()
+        await _settle(pool)
+
+    stats = pool.get_stats()
+    assert stats.misses == 3
+    assert stats.target_size == 2
+
+
+async def test_expired_sandboxes_are_recycled_and_target_shrinks():
+    """Test that idle sandboxes past their TTL are destroyed instead of leased"""
+    cls = _sandbox_cls()
+    pool = DockerSandboxPool(cls, min_size=1, max_size=3, ttl_seconds=0)
+    pool._target_size = 3
+    pool._replenish()
+    await _settle(pool)
+
+    await pool._check_idle()
+    await _settle(pool)
+
+    assert all(sandbox.destroyed for sandbox in cls.created)
+    stats = pool.get_stats()
+    assert stats.idle == 0
+    assert stats.recycled == 3
+    assert stats.target_size == 1
+
+
+async def test_unhealthy_sandboxes_are_dropped():
+    """Test that sandboxes failing the health check leave the pool"""
+    cls = _sandbox_cls()
+    pool = DockerSandboxPool(cls, min_size=2, max_size=2)
+    pool._replenish()
+    await _settle(pool)
+    assert pool.get_stats().idle == 2
+
+    cls.healthy = False
+    await pool._check_idle()
+    await _settle(pool)
+
+    assert pool.get_stats().idle == 0
+    assert pool.get_stats().failed == 2
+    assert all(sandbox.destroyed for sandbox in cls.created)
+
+
+async def test_failed_warm_up_is_counted_and_destroyed():
+    """Test that a sandbox that never becomes ready is not pooled"""
+    cls = _sandbox_cls(healthy=False)
+    pool = DockerSandboxPool(cls, min_size=1, max_size=1)
+    pool._replenish()
+    await _settle(pool)
+
+    stats = pool.get_stats()
+    assert stats.idle == 0 and stats.warming == 0
+    assert stats.failed == 1
+    assert cls.created[0].destroyed
+
+
+async def test_stop_destroys_idle_sandboxes():
+    """Test that stopping the pool destroys everything still idle"""
+    cls = _sandbox_cls()
+    pool = DockerSandboxPool(cls, min_size=2, max_size=2, check_interval=3600)
+    await pool.start()
+    await asyncio.sleep(0)
+    await _settle(pool)
+    assert pool.get_stats().idle == 2
+
+    await pool.stop()
+
+    assert pool.get_stats().idle == 0
+    assert all(sandbox.destroyed for sandbox in cls.created)
+
+
+async def test_stop_destroys_sandboxes_still_warming():
+    """Test that a warm-up cancelled by stop does not leak its sandbox"""
+    cls = _sandbox_cls()
+
+    async def never_ready(self):
+        await asyncio.Event().wait()
+
+    cls.ensure_sandbox = never_ready
+    pool = DockerSandboxPool(cls, min_size=1, max_size=1, check_interval=3600)
+    await pool.start()
+    while not cls.created:
+        await asyncio.sleep(0)
+
+    await pool.stop()
+
+    assert not pool._background
+    assert pool.get_stats().warming == 0
+    assert cls.created[0].destroyed
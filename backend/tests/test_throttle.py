@@ -0,0 +1,81 @@
+"""
+Unit tests for throttling a stream to its latest item
+"""
+import asyncio
+
+import pytest
+
+from app.domain.utils.throttle import latest_every
+
+
+async def _items(*items, delay: float = 0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(source, interval):
+    return [item async for item in latest_every(source, interval)]
+
+
+async def test_slow_source_yields_every_item():
+    """Test that items arriving after a quiet period are yielded immediately"""
+    assert await _collect(_items(1, 2, 3, delay=0.05), interval=0.01) == [1, 2, 3]
+
+
+async def test_burst_is_coalesced_to_first_and_latest():
+    """Test that a fast burst yields the first item and then only the last one"""
+    assert await _collect(_items(*range(10)), interval=0.2) == [0, 9]
+
+
+async def test_latest_item_is_yielded_when_interval_passes():
+    """Test that a pending item is delivered once the interval has passed, without waiting for the next one"""
+    async def source():
+        yield "a"
+        yield "b"
+        await asyncio.sleep(10)
+        yield "c"
+
+    loop = asyncio.get_running_loop()
+    stream = latest_every(source(), 0.05)
+    assert await anext(stream) == "a"
+    started = loop.time()
+    assert await asyncio.wait_for(anext(stream), 1) == "b"
+    assert loop.time() - started < 1
+    await stream.aclose()
+
+
+async def test_source_errors_are_raised():
+    """Test that an error of the source reaches the caller"""
+    async def source():
+        yield 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await _collect(source(), interval=0)
+
+
+async def test_closing_cancels_pending_read():
+    """Test that closing the stream cancels the read waiting on the source"""
+    cancelled = asyncio.Event()
+
+    async def source():
+        yield 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield 2
+
+    stream = latest_every(source(), 0)
+    assert await anext(stream) == 1
+    # Let the next read start waiting on the source
+    next_item = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0.01)
+    next_item.cancel()
+    await asyncio.gather(next_item, return_exceptions=True)
+    await stream.aclose()
+
+    assert cancelled.is_set()
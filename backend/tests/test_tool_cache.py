@@ -0,0 +1,102 @@
+"""
+Unit tests for the per-session tool result cache
+"""
+import time
+
+from app.domain.models.tool_result import ToolResult
+from app.domain.services.tools.cache import ToolResultCache
+from app.domain.services.tools.base import tool
+
+
+@tool(name="file_read", description="", parameters={}, required=[], idempotent=True, path_args=["file"])
+async def file_read(file: str) -> ToolResult:
+    ...
+
+
+@tool(name="file_write", description="", parameters={}, required=[], invalidates=True, path_args=["file"])
+async def file_write(file: str) -> ToolResult:
+    ...
+
+
+@tool(name="shell_exec", description="", parameters={}, required=[], invalidates=True)
+async def shell_exec(id: str) -> ToolResult:
+    ...
+
+
+def _read(cache: ToolResultCache, path: str):
+    return cache.get("sandbox", "file_read", file_read, {"file": path})
+
+
+def _store(cache: ToolResultCache, path: str, content: str = "content"):
+    cache.put("sandbox", "file_read", file_read, {"file": path}, ToolResult(success=True, data={"content": content}))
+
+
+def _shell(cache: ToolResultCache, data: dict, process_id: str = "s1"):
+    cache.put("sandbox", "shell_exec", shell_exec, {"id": process_id}, ToolResult(success=True, data=data))
+
+
+def test_hit_and_path_invalidation():
+    """Test cached results are served until a write to their path"""
+    cache = ToolResultCache()
+    _store(cache, "/home/ubuntu/a.txt")
+    _store(cache, "/home/ubuntu/b.txt")
+    assert _read(cache, "/home/ubuntu/a.txt").data == {"content": "content"}
+
+    cache.put("sandbox", "file_write", file_write, {"file": "/home/ubuntu/a.txt"}, ToolResult(success=True))
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+    assert _read(cache, "/home/ubuntu/b.txt") is not None
+
+
+def test_write_invalidates_parent_directory_results():
+    """Test a write below a directory drops results depending on the directory"""
+    cache = ToolResultCache()
+    _store(cache, "/home/ubuntu/dir")
+    _store(cache, "/home/ubuntu/directory")
+    cache.invalidate_paths(["/home/ubuntu/dir/a.txt"])
+    assert _read(cache, "/home/ubuntu/dir") is None
+    assert _read(cache, "/home/ubuntu/directory") is not None
+
+
+def test_scope_invalidation_by_shell():
+    """Test a shell command invalidates every result of the scope"""
+    cache = ToolResultCache()
+    _store(cache, "/home/ubuntu/a.txt")
+    _shell(cache, {"status": "completed", "returncode": 0})
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+
+
+def test_running_process_holds_scope_until_finished():
+    """Test a running background process disables the scope until it reports an exit"""
+    cache = ToolResultCache()
+    _shell(cache, {"status": "running"})
+    _store(cache, "/home/ubuntu/a.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+
+    _shell(cache, {"status": "output"})
+    _store(cache, "/home/ubuntu/a.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+
+    _shell(cache, {"status": "completed", "returncode": 0})
+    _store(cache, "/home/ubuntu/a.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is not None
+
+
+def test_hold_expires():
+    """Test a hold that is never released expires"""
+    cache = ToolResultCache(hold_ttl=0.05)
+    _shell(cache, {"status": "running"})
+    _store(cache, "/home/ubuntu/a.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+
+    time.sleep(0.06)
+    _store(cache, "/home/ubuntu/a.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is not None
+
+
+def test_lru_bound():
+    """Test the oldest entries are evicted beyond max_entries"""
+    cache = ToolResultCache(max_entries=2)
+    for name in ("a", "b", "c"):
+        _store(cache, f"/home/ubuntu/{name}.txt")
+    assert _read(cache, "/home/ubuntu/a.txt") is None
+    assert _read(cache, "/home/ubuntu/c.txt") is not None
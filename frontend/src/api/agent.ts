@@ -1,7 +1,7 @@
 // Backend API service
 import { apiClient, BASE_URL, ApiResponse, createSSEConnection, SSECallbacks } from './client';
 import { AgentSSEEvent } from '../types/event';
-import { CreateSessionResponse, GetSessionResponse, ShellViewResponse, FileViewResponse, ListSessionResponse } from '../types/response';
+import { CreateSessionResponse, GetSessionResponse, ShellViewResponse, ShellDeltaResponse, FileViewResponse, FileDiffResponse, ListSessionResponse } from '../types/response';
 import type { FileInfo } from './file';
 
 /**
@@ -77,14 +77,15 @@ export const chatWithSession = async (
  * View Shell session output
  * @param sessionId Session ID
  * @param shellSessionId Shell session ID
+ * @param diff Receive changes after the first "shell" event as "shell_delta" records
  * @returns Shell session output content
  */
-export async function viewShellSession(sessionId: string, shellSessionId: string, callbacks?: SSECallbacks<ShellViewResponse>): Promise<() => void> {
-  return createSSEConnection<ShellViewResponse>(
+export async function viewShellSession(sessionId: string, shellSessionId: string, callbacks?: SSECallbacks<ShellViewResponse | ShellDeltaResponse>, diff: boolean = false): Promise<() => void> {
+  return createSSEConnection<ShellViewResponse | ShellDeltaResponse>(
     `/sessions/${sessionId}/shell`,
     {
       method: 'POST',
-      body: { session_id: shellSessionId }
+      body: { session_id: shellSessionId, diff }
     },
     callbacks
   );
@@ -94,14 +95,15 @@ export async function viewShellSession(sessionId: string, shellSessionId: string
  * View file content
  * @param sessionId Session ID
  * @param file File path
+ * @param diff Receive changes after the first "file" event as "file_diff" line ranges
  * @returns File content
  */
-export async function viewFile(sessionId: string, file: string, callbacks?: SSECallbacks<FileViewResponse>): Promise<() => void> {
-  return createSSEConnection<FileViewResponse>(
+export async function viewFile(sessionId: string, file: string, callbacks?: SSECallbacks<FileViewResponse | FileDiffResponse>, diff: boolean = false): Promise<() => void> {
+  return createSSEConnection<FileViewResponse | FileDiffResponse>(
     `/sessions/${sessionId}/file`,
     {
       method: 'POST',
-      body: { file }
+      body: { file, diff }
     },
     callbacks
   );
@@ -42,8 +42,26 @@ export interface ConsoleRecord {
     console: ConsoleRecord[];
   }
 
+/** Replace console records from start_record on, appending the first record's output to the received one when append is set */
+export interface ShellDeltaResponse {
+    session_id: string;
+    start_record: number;
+    append: boolean;
+    console: ConsoleRecord[];
+  }
+
 export interface FileViewResponse {
     content: string;
     file: string;
+    version?: string;
+  }
+
+/** Replace lines [start_line, end_line) of the previously received content with lines */
+export interface FileDiffResponse {
+    file: string;
+    version?: string;
+    start_line: number;
+    end_line: number;
+    lines: string[];
   }
   
\ No newline at end of file
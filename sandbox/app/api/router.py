@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.v1 import shell, supervisor, file
+from app.api.v1 import shell, supervisor, file, batch, rpc
 
 api_router = APIRouter()
 api_router.include_router(shell.router, prefix="/shell", tags=["shell"])
 api_router.include_router(supervisor.router, prefix="/supervisor", tags=["supervisor"])
 api_router.include_router(file.router, prefix="/file", tags=["file"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
+api_router.include_router(rpc.router, prefix="/rpc", tags=["rpc"])
@@ -0,0 +1,39 @@
+"""
+Batch operation API interfaces
+"""
+from fastapi import APIRouter
+from app.api.v1.methods import call_method
+from app.models.batch import BatchOperationResult, BatchResult
+from app.schemas.batch import BatchRequest
+from app.schemas.response import Response
+
+router = APIRouter()
+
+@router.post("", response_model=Response)
+async def execute_batch(request: BatchRequest):
+    """
+    Execute shell/file operations in order and return all results
+    """
+    results = []
+    stopped = False
+    for operation in request.operations:
+        status_code, response = await call_method(operation.method, operation.params)
+        results.append(BatchOperationResult(
+            method=operation.method,
+            status_code=status_code,
+            success=response.success,
+            message=response.message,
+            data=response.data
+        ))
+        if request.stop_on_error and not response.success:
+            stopped = len(results) < len(request.operations)
+            break
+
+    result = BatchResult(results=results, stopped=stopped)
+
+    # Construct response
+    return Response(
+        success=True,
+        message=f"Batch completed, executed {len(results)} of {len(request.operations)} operations",
+        data=result.model_dump()
+    )
@@ -1,17 +1,45 @@
 """
 File operation API interfaces
 """
-from fastapi import APIRouter, UploadFile, File, Form
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+from fastapi import APIRouter, UploadFile, File, Form, Request
 from fastapi.responses import FileResponse
 from app.schemas.file import (
     FileReadRequest, FileWriteRequest, FileReplaceRequest,
-    FileSearchRequest, FileFindRequest
+    FileSearchRequest, FileFindRequest, FileStatRequest, FileGrepRequest
 )
+from app.core.exceptions import BadRequestException
 from app.schemas.response import Response
 from app.services.file import file_service
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+# Seconds between checks whether the client of a long search is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+async def _cancel_on_disconnect(http_request: Optional[Request], operation: Awaitable[T]) -> T:
+    """Run an operation, cancelling it when the HTTP client disconnects
+
+    Not passed a request when called over the RPC channel, where cancellation comes
+    from the channel itself.
+    """
+    task = asyncio.ensure_future(operation)
+    if http_request is None:
+        return await task
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise BadRequestException("Client disconnected")
+    finally:
+        task.cancel()
+
 @router.post("/read", response_model=Response)
 async def read_file(request: FileReadRequest):
     """
@@ -21,13 +49,17 @@ async def read_file(request: FileReadRequest):
         file=request.file,
         start_line=request.start_line,
         end_line=request.end_line,
-        sudo=request.sudo
+        sudo=request.sudo,
+        if_none_match=request.if_none_match,
+        tail_lines=request.tail_lines,
+        start_byte=request.start_byte,
+        end_byte=request.end_byte
     )
     
     # Construct response
     return Response(
         success=True,
-        message="File read successfully",
+        message="File not modified" if result.not_modified else "File read successfully",
         data=result.model_dump()
     )
 
@@ -89,15 +121,41 @@ async def search_in_file(request: FileSearchRequest):
         data=result.model_dump()
     )
 
+@router.post("/grep", response_model=Response)
+async def grep_files(request: FileGrepRequest, http_request: Request = None):
+    """
+    Search file contents recursively under a directory
+    """
+    result = await _cancel_on_disconnect(http_request, file_service.search_files(
+        path=request.path,
+        regex=request.regex,
+        include=request.include,
+        ignore=request.ignore,
+        context_lines=request.context_lines,
+        max_results=request.max_results,
+        ignore_case=request.ignore_case
+    ))
+    
+    # Construct response
+    return Response(
+        success=True,
+        message=f"Search completed, found {len(result.matches)} matches in {result.files_searched} files",
+        data=result.model_dump()
+    )
+
 @router.post("/find", response_model=Response)
-async def find_files(request: FileFindRequest):
+async def find_files(request: FileFindRequest, http_request: Request = None):
     """
     Find files by name pattern
     """
-    result = await file_service.find_by_name(
+    result = await _cancel_on_disconnect(http_request, file_service.find_by_name(
         path=request.path,
-        glob_pattern=request.glob
-    )
+        glob_pattern=request.glob,
+        ignore=request.ignore,
+        max_depth=request.max_depth,
+        max_results=request.max_results,
+        cursor=request.cursor
+    ))
     
     # Construct response
     return Response(
@@ -106,6 +164,20 @@ async def find_files(request: FileFindRequest):
         data=result.model_dump()
     )
 
+@router.post("/stat", response_model=Response)
+async def stat_file(request: FileStatRequest):
+    """
+    Get file size, modification time and content hash
+    """
+    result = await file_service.stat_file(file=request.file)
+    
+    # Construct response
+    return Response(
+        success=True,
+        message="File stat retrieved successfully",
+        data=result.model_dump()
+    )
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
@@ -0,0 +1,69 @@
+"""
+In-process dispatch of JSON API operations
+
+Used by the endpoints that execute API operations without a separate HTTP request
+per operation (RPC channel, batch). Methods are named after the HTTP API paths.
+"""
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+from fastapi import status
+from pydantic import BaseModel, ValidationError
+from app.api.v1 import shell, file
+from app.core.exceptions import AppException
+from app.schemas.file import (
+    FileReadRequest, FileWriteRequest, FileReplaceRequest,
+    FileSearchRequest, FileFindRequest, FileStatRequest, FileGrepRequest
+)
+from app.schemas.response import Response
+from app.schemas.shell import (
+    ShellExecRequest, ShellViewRequest, ShellWaitRequest,
+    ShellWriteToProcessRequest, ShellKillProcessRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Method path -> (request model, HTTP route handler)
+METHODS: Dict[str, Tuple[Type[BaseModel], Callable[[Any], Awaitable[Response]]]] = {
+    "/shell/exec": (ShellExecRequest, shell.exec_command),
+    "/shell/view": (ShellViewRequest, shell.view_shell),
+    "/shell/wait": (ShellWaitRequest, shell.wait_for_process),
+    "/shell/write": (ShellWriteToProcessRequest, shell.write_to_process),
+    "/shell/kill": (ShellKillProcessRequest, shell.kill_process),
+    "/file/read": (FileReadRequest, file.read_file),
+    "/file/write": (FileWriteRequest, file.write_file),
+    "/file/replace": (FileReplaceRequest, file.replace_in_file),
+    "/file/search": (FileSearchRequest, file.search_in_file),
+    "/file/grep": (FileGrepRequest, file.grep_files),
+    "/file/find": (FileFindRequest, file.find_files),
+    "/file/stat": (FileStatRequest, file.stat_file),
+}
+
+
+async def call_method(
+    method: str,
+    params: Dict[str, Any],
+    methods: Dict[str, Tuple[Type[BaseModel], Callable[[Any], Awaitable[Response]]]] = METHODS,
+) -> Tuple[int, Response]:
+    """
+    Execute an API operation, mapping errors the same way as the HTTP exception handlers
+
+    Returns:
+        HTTP status code and response body
+    """
+    if method not in methods:
+        return status.HTTP_404_NOT_FOUND, Response.error(f"Unknown method: {method}")
+    model, handler = methods[method]
+    try:
+        return status.HTTP_200_OK, await handler(model(**params))
+    except AppException as e:
+        return e.status_code, Response.error(message=e.message, data=e.data)
+    except ValidationError as e:
+        logger.error("Validation error in %s: %s", method, e.errors())
+        return (
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            Response.error(message="Request data validation failed", data=json.loads(e.json()))
+        )
+    except Exception as e:
+        logger.error("Unhandled exception in %s: %s", method, str(e), exc_info=True)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, Response.error(message=f"Internal server error: {str(e)}")
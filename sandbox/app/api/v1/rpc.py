@@ -0,0 +1,157 @@
+"""
+Multiplexed RPC channel over a single WebSocket
+
+Frames are compact JSON text messages:
+- request:  {"id": 1, "method": "/shell/exec", "params": {...}}
+- response: {"id": 1, "status": 200, "result": {...}}, result is the same Response body as the HTTP API
+- event:    {"id": 1, "event": {...}}, pushed by stream methods before their final response
+- cancel:   {"id": 1, "cancel": true}, abandons an in-flight request or stream
+
+Methods are named after the HTTP API paths they mirror, so a client can send any JSON
+request over the channel instead of a separate HTTP request. Requests run concurrently,
+responses are sent as they complete.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Tuple, Type
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+from app.api.v1 import batch
+from app.api.v1.methods import METHODS, call_method
+from app.core.middleware import extend_timeout_on_request
+from app.schemas.batch import BatchRequest
+from app.schemas.file import FileFindRequest, FileGrepRequest, FileWatchRequest
+from app.schemas.response import Response
+from app.schemas.shell import ShellViewRequest
+from app.services.file import file_service
+from app.services.shell import shell_service
+from app.services.watcher import file_watcher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Request/response methods, a batch is a single request on the channel
+RPC_METHODS = {
+    **METHODS,
+    "/batch": (BatchRequest, batch.execute_batch),
+}
+
+
+def _subscribe_shell(request: ShellViewRequest) -> AsyncIterator[BaseModel]:
+    return shell_service.subscribe_output(request.id)
+
+
+def _stream_shell(request: ShellViewRequest) -> AsyncIterator[BaseModel]:
+    return shell_service.stream_shell(request.id, request.since_offset, request.since_record)
+
+
+def _watch_files(request: FileWatchRequest) -> AsyncIterator[BaseModel]:
+    return file_watcher.subscribe(request.paths)
+
+
+def _grep_files(request: FileGrepRequest) -> AsyncIterator[BaseModel]:
+    return file_service.stream_search(
+        request.path, request.regex, request.include, request.ignore,
+        request.context_lines, request.max_results, request.ignore_case
+    )
+
+
+def _find_files(request: FileFindRequest) -> AsyncIterator[BaseModel]:
+    return file_service.stream_find(
+        request.path, request.glob, request.ignore,
+        request.max_depth, request.max_results, request.cursor
+    )
+
+
+# Stream methods: path -> (request model, event iterator factory)
+STREAMS: Dict[str, Tuple[Type[BaseModel], Callable[[Any], AsyncIterator[BaseModel]]]] = {
+    "/shell/subscribe": (ShellViewRequest, _subscribe_shell),
+    "/shell/stream": (ShellViewRequest, _stream_shell),
+    "/file/watch": (FileWatchRequest, _watch_files),
+    "/file/grep/stream": (FileGrepRequest, _grep_files),
+    "/file/find/stream": (FileFindRequest, _find_files),
+}
+
+
+def _encode(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class RpcConnection:
+    """State of one RPC WebSocket connection"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.tasks: Dict[Any, asyncio.Task] = {}
+        # Starlette websockets do not support concurrent sends
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        async with self._send_lock:
+            await self.websocket.send_text(_encode(message))
+
+    async def respond(self, request_id: Any, status_code: int, response: Response):
+        await self.send({"id": request_id, "status": status_code, "result": response.model_dump()})
+
+    def _stream_handler(self, request_id: Any, factory: Callable[[Any], AsyncIterator[BaseModel]]):
+        """Wrap a stream method as a handler that pushes its events and returns the final response"""
+        async def handler(request: BaseModel) -> Response:
+            async for event in factory(request):
+                await self.send({"id": request_id, "event": event.model_dump()})
+            return Response(success=True, message="Stream ended")
+        return handler
+
+    async def handle(self, request_id: Any, method: str, params: Dict[str, Any]):
+        """Run one request and send its events and final response"""
+        try:
+            await extend_timeout_on_request(f"/api/v1{method}")
+            if method in STREAMS:
+                model, factory = STREAMS[method]
+                methods = {method: (model, self._stream_handler(request_id, factory))}
+            else:
+                methods = RPC_METHODS
+            status_code, response = await call_method(method, params, methods)
+            await self.respond(request_id, status_code, response)
+        finally:
+            self.tasks.pop(request_id, None)
+
+    def dispatch(self, message: Dict[str, Any]):
+        request_id = message.get("id")
+        if message.get("cancel"):
+            task = self.tasks.pop(request_id, None)
+            if task:
+                task.cancel()
+            return
+        self.tasks[request_id] = asyncio.create_task(
+            self.handle(request_id, message.get("method", ""), message.get("params") or {})
+        )
+
+    def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+
+@router.websocket("")
+async def rpc_channel(websocket: WebSocket):
+    """
+    Serve multiplexed API requests and push events over one WebSocket
+    """
+    await websocket.accept()
+    connection = RpcConnection(websocket)
+    logger.info("RPC channel connected")
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except json.JSONDecodeError:
+                logger.warning("Ignoring malformed RPC frame")
+                continue
+            connection.dispatch(message)
+    except WebSocketDisconnect:
+        logger.info("RPC channel disconnected")
+    finally:
+        connection.close()
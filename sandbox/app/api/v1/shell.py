@@ -21,7 +21,10 @@ async def exec_command(request: ShellExecRequest):
     result = await shell_service.exec_command(
         session_id=request.id,
         exec_dir=request.exec_dir,
-        command=request.command
+        command=request.command,
+        mode=request.mode,
+        cpu_limit=request.cpu_limit,
+        memory_limit=request.memory_limit
     )
     
     # Construct response
@@ -39,7 +42,11 @@ async def view_shell(request: ShellViewRequest):
     if not request.id or request.id == "":
         raise BadRequestException("Session ID not provided")
         
-    result = await shell_service.view_shell(session_id=request.id)
+    result = await shell_service.view_shell(
+        session_id=request.id,
+        since_offset=request.since_offset,
+        since_record=request.since_record
+    )
     
     # Construct response
     return Response(
@@ -55,13 +62,20 @@ async def wait_for_process(request: ShellWaitRequest):
     """
     result = await shell_service.wait_for_process(
         session_id=request.id,
-        seconds=request.seconds
+        seconds=request.seconds,
+        since_offset=request.since_offset
     )
     
     # Construct response
+    if result.status == "output":
+        message = "Process produced new output"
+    elif result.status == "running":
+        message = f"Process still running after {request.seconds or 60} seconds"
+    else:
+        message = f"Process completed, return code: {result.returncode}"
     return Response(
         success=True,
-        message=f"Process completed, return code: {result.returncode}",
+        message=message,
         data=result.model_dump()
     )
 
@@ -99,4 +113,15 @@ async def kill_process(request: ShellKillProcessRequest):
         success=True,
         message=message,
         data=result.model_dump()
-    )
\ No newline at end of file
+    )
+@router.get("/sessions", response_model=Response)
+async def list_sessions():
+    """
+    List open shell sessions and the memory used by their output
+    """
+    result = shell_service.list_sessions()
+    return Response(
+        success=True,
+        message=f"{len(result.sessions)} shell sessions",
+        data=result.model_dump()
+    )
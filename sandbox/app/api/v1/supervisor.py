@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from pydantic import BaseModel
 from typing import Optional
 
@@ -25,6 +25,20 @@ async def get_status():
         data=processes
     )
 
+@router.get("/ready", response_model=Response)
+async def wait_ready(timeout: float = Query(30, ge=0, le=120)):
+    """
+    Long-poll until all services are RUNNING
+    
+    Returns as soon as every service is RUNNING, or with ready=false once the timeout (seconds) expires
+    """
+    result = await supervisor_service.wait_until_ready(timeout)
+    return Response(
+        success=True,
+        message="All services are running" if result.ready else "Services not ready before timeout",
+        data=result.model_dump()
+    )
+
 @router.post("/stop", response_model=Response)
 async def stop_services():
     """
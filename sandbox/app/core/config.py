@@ -1,4 +1,5 @@
-from typing import List, Optional, Union
+import os
+from typing import List, Literal, Optional, Union
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
@@ -12,6 +13,38 @@ class Settings(BaseSettings):
     # Log configuration
     LOG_LEVEL: str = "INFO"
     
+    # File change feed: watched roots, ignored directory names, debounce window (ms)
+    WATCH_ROOTS: List[str] = ["/home/ubuntu"]
+    WATCH_IGNORE: List[str] = [".git", "node_modules", "__pycache__", ".cache", ".venv"]
+    WATCH_DEBOUNCE_MS: int = 200
+    
+    # Content search: scanning threads, ignored names/globs by default (also for finding files
+    # by name), upper bound of max_results
+    FILE_SEARCH_WORKERS: int = min(os.cpu_count() or 1, 8)
+    FILE_SEARCH_IGNORE: List[str] = [".git", ".hg", ".svn", "node_modules", "__pycache__", ".cache", ".venv", "venv"]
+    FILE_SEARCH_MAX_RESULTS: int = 5000
+    
+    # Finding files by name: upper bound of max_results, directory listings cached (0 disables)
+    FILE_FIND_MAX_RESULTS: int = 10000
+    FILE_FIND_CACHE_DIRS: int = 10000
+    
+    # Shell output kept per process (bytes): start of the output, and most recent output
+    SHELL_OUTPUT_HEAD_BYTES: int = 64 * 1024
+    SHELL_OUTPUT_TAIL_BYTES: int = 1024 * 1024
+    
+    # Shell mode of new sessions: "process" (new process per command) or "pty" (persistent bash)
+    SHELL_DEFAULT_MODE: Literal["process", "pty"] = "process"
+    
+    # Shell session limits: open sessions, output kept of a session's finished commands (bytes),
+    # and seconds after which a session without a running command is closed
+    SHELL_MAX_SESSIONS: int = 32
+    SHELL_MAX_HISTORY_BYTES: int = 2 * 1024 * 1024
+    SHELL_IDLE_TTL_SECONDS: int = 3600
+    
+    # Default limits of each command in process mode: CPU time (seconds) and memory (bytes)
+    SHELL_COMMAND_CPU_LIMIT: Optional[int] = None
+    SHELL_COMMAND_MEMORY_LIMIT: Optional[int] = None
+    
     @field_validator("ORIGINS", mode="before")
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         if isinstance(v, str) and not v.startswith("["):
@@ -8,9 +8,9 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
-async def auto_extend_timeout_middleware(request: Request, call_next):
+async def extend_timeout_on_request(path: str):
     """
-    Middleware to automatically extend timeout on every API request
+    Extend the service timeout for an API call on the given path
     Only auto-extends when auto-expand is enabled (disabled when user explicitly manages timeout)
     """
     from app.services.supervisor import supervisor_service
@@ -19,14 +19,21 @@ async def auto_extend_timeout_middleware(request: Request, call_next):
     # and not a timeout management API call, and auto-expand is enabled
     if (settings.SERVICE_TIMEOUT_MINUTES is not None and
         supervisor_service.timeout_active and 
-        request.url.path.startswith("/api/") and
-        not request.url.path.startswith("/api/v1/supervisor/timeout/") and
+        path.startswith("/api/") and
+        not path.startswith("/api/v1/supervisor/timeout/") and
         supervisor_service.auto_expand_enabled):
         try:
             await supervisor_service.extend_timeout()
-            logger.debug("Timeout automatically extended due to API request: %s", request.url.path)
+            logger.debug("Timeout automatically extended due to API request: %s", path)
         except Exception as e:
             logger.warning("Failed to auto-extend timeout: %s", str(e))
+
+
+async def auto_extend_timeout_middleware(request: Request, call_next):
+    """
+    Middleware to automatically extend timeout on every API request
+    """
+    await extend_timeout_on_request(request.url.path)
     
     response = await call_next(request)
-    return response 
\ No newline at end of file
+    return response 
@@ -4,9 +4,11 @@
 from app.models.shell import ShellCommandResult, ShellViewResult, ShellWaitResult, ShellWriteResult, ShellKillResult
 from app.models.supervisor import ProcessInfo, SupervisorActionResult, SupervisorTimeout
 from app.models.file import FileReadResult, FileWriteResult, FileReplaceResult, FileSearchResult, FileFindResult
+from app.models.batch import BatchOperationResult, BatchResult
 
 __all__ = [
     'ShellCommandResult', 'ShellViewResult', 'ShellWaitResult', 'ShellWriteResult', 'ShellKillResult',
     'ProcessInfo', 'SupervisorActionResult', 'SupervisorTimeout',
-    'FileReadResult', 'FileWriteResult', 'FileReplaceResult', 'FileSearchResult', 'FileFindResult'
+    'FileReadResult', 'FileWriteResult', 'FileReplaceResult', 'FileSearchResult', 'FileFindResult',
+    'BatchOperationResult', 'BatchResult'
 ]
@@ -0,0 +1,20 @@
+"""
+Batch business model definitions
+"""
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
+
+
+class BatchOperationResult(BaseModel):
+    """Result of a single batch operation"""
+    method: str = Field(..., description="API path of the operation")
+    status_code: int = Field(..., description="HTTP status code the operation would have returned")
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: Optional[str] = Field(None, description="Operation result message")
+    data: Optional[Any] = Field(None, description="Data returned from the operation")
+
+
+class BatchResult(BaseModel):
+    """Batch execution result model"""
+    results: List[BatchOperationResult] = Field(..., description="Results of the executed operations, in order")
+    stopped: bool = Field(False, description="Whether remaining operations were skipped after a failure")
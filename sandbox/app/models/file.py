@@ -2,13 +2,18 @@
 File operation related models
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class FileReadResult(BaseModel):
     """File read result"""
-    content: str = Field(..., description="File content")
+    content: str = Field(..., description="File content, empty if not modified")
     file: str = Field(..., description="Path of the read file")
+    version: Optional[str] = Field(None, description="Version of the content, from file mtime and size")
+    not_modified: bool = Field(False, description="Whether the content matches the if_none_match version")
+    start_line: Optional[int] = Field(None, description="Index of the first returned line, for line range and tail reads")
+    total_lines: Optional[int] = Field(None, description="Number of lines in the file, for line range and tail reads")
+    size: Optional[int] = Field(None, description="File size in bytes, for ranged reads")
 
 
 class FileWriteResult(BaseModel):
@@ -30,10 +35,71 @@ class FileSearchResult(BaseModel):
     line_numbers: List[int] = Field([], description="List of matched line numbers")
 
 
+class FileContentMatch(BaseModel):
+    """Matching line of a content search"""
+    file: str = Field(..., description="Path of the file")
+    line_number: int = Field(..., description="Line number (0-based)")
+    line: str = Field(..., description="Content of the matching line")
+    before: List[str] = Field([], description="Context lines before the match")
+    after: List[str] = Field([], description="Context lines after the match")
+
+
+class FileGrepEvent(BaseModel):
+    """Streamed content search event, the matches of one file or the final summary"""
+    file: Optional[str] = Field(None, description="Path of the file, None for the summary")
+    matches: List[FileContentMatch] = Field([], description="Matching lines of the file")
+    done: bool = Field(False, description="Whether this is the summary sent when the search ended")
+    matches_found: int = Field(0, description="Number of matches found, in the summary")
+    files_searched: int = Field(0, description="Number of files searched, in the summary")
+    files_skipped: int = Field(0, description="Number of binary or unreadable files skipped, in the summary")
+    truncated: bool = Field(False, description="Whether the search stopped at max_results with matches or files left, in the summary")
+
+
+class FileGrepResult(BaseModel):
+    """Directory content search result"""
+    path: str = Field(..., description="Path of the searched directory or file")
+    matches: List[FileContentMatch] = Field([], description="Matching lines, ordered by file and line")
+    files_searched: int = Field(0, description="Number of files searched")
+    files_skipped: int = Field(0, description="Number of binary or unreadable files skipped")
+    truncated: bool = Field(False, description="Whether the search stopped at max_results")
+
+
+class FileFindEvent(BaseModel):
+    """Streamed file find event, a batch of found paths or the final summary"""
+    files: List[str] = Field([], description="Found paths, in walk order")
+    done: bool = Field(False, description="Whether this is the summary sent when the search ended")
+    files_found: int = Field(0, description="Number of paths found, in the summary")
+    truncated: bool = Field(False, description="Whether the search stopped at max_results, in the summary")
+    next_cursor: Optional[str] = Field(None, description="Cursor to continue a truncated search, in the summary")
+
+
 class FileFindResult(BaseModel):
     """File find result"""
     path: str = Field(..., description="Path of the search directory")
     files: List[str] = Field([], description="List of found files")
+    truncated: bool = Field(False, description="Whether the search stopped at max_results")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page, None on the last page")
+
+
+class FileStatResult(BaseModel):
+    """File stat result"""
+    file: str = Field(..., description="Path of the file")
+    size: int = Field(..., description="File size in bytes")
+    mtime: float = Field(..., description="Last modification time (Unix timestamp)")
+    sha256: str = Field(..., description="SHA-256 hex digest of the file content")
+
+
+class FileChangeEvent(BaseModel):
+    """File change event"""
+    path: str = Field(..., description="Absolute path of the changed file or directory")
+    type: Literal["created", "modified", "deleted"] = Field(..., description="Change type")
+    is_dir: bool = Field(False, description="Whether the path is a directory")
+
+
+class FileChangeBatch(BaseModel):
+    """Debounced batch of file changes"""
+    changes: List[FileChangeEvent] = Field([], description="Changes since the previous batch, one per path")
+    overflow: bool = Field(False, description="Changes were lost, subscribers must rescan the files they track")
 
 
 class FileUploadResult(BaseModel):
@@ -21,6 +21,18 @@ class ShellTask(BaseModel):
     output: Optional[str] = Field(None, description="Task output")
 
 
+class ResourceUsage(BaseModel):
+    """Resources used by a command, or summed over the commands of a session"""
+    commands: int = Field(1, description="Number of commands counted")
+    wall_time: float = Field(..., description="Wall clock time (seconds)")
+    cpu_user: Optional[float] = Field(None, description="User CPU time (seconds)")
+    cpu_system: Optional[float] = Field(None, description="System CPU time (seconds)")
+    max_rss: Optional[int] = Field(None, description="Peak memory (bytes), the largest command's for a session")
+    io_read_bytes: Optional[int] = Field(None, description="Bytes read from block devices")
+    io_write_bytes: Optional[int] = Field(None, description="Bytes written to block devices")
+    source: str = Field(..., description="How usage was measured: cgroup, rusage (shared with other commands finishing at the same time), wall (wall time only) or mixed")
+
+
 class ShellCommandResult(BaseModel):
     """Shell command execution result model"""
     session_id: str = Field(..., description="Shell session ID")
@@ -29,6 +41,8 @@ class ShellCommandResult(BaseModel):
     returncode: Optional[int] = Field(None, description="Process return code, only has value when status is completed")
     output: Optional[str] = Field(None, description="Command execution output, only has value when status is completed")
     console: Optional[List[ConsoleRecord]] = Field(None, description="Console command records")
+    end_offset: int = Field(0, description="Byte offset of the end of the output since the process started")
+    usage: Optional[ResourceUsage] = Field(None, description="Resources used by the command, only has value when status is completed")
 
 
 class ShellViewResult(BaseModel):
@@ -36,16 +50,55 @@ class ShellViewResult(BaseModel):
     output: str = Field(..., description="Shell session output content")
     session_id: str = Field(..., description="Shell session ID")
     console: Optional[List[ConsoleRecord]] = Field(None, description="Console command records")
+    returncode: Optional[int] = Field(None, description="Return code of the current command, None while it is running")
+    end_offset: int = Field(0, description="Byte offset of the end of the output since the current process started")
+    start_offset: int = Field(0, description="Byte offset the returned output starts at")
+    start_record: int = Field(0, description="Index of the first returned console record")
+
+
+class ShellOutputEvent(BaseModel):
+    """Shell output push event model"""
+    session_id: str = Field(..., description="Shell session ID")
+    output: str = Field(..., description="Output produced since the previous event")
+    returncode: Optional[int] = Field(None, description="Process return code, only set on the final event after the process exits")
+    end_offset: int = Field(0, description="Byte offset of the end of the output after this event")
+
+
+class ShellSessionInfo(BaseModel):
+    """Shell session summary model"""
+    session_id: str = Field(..., description="Shell session ID")
+    mode: str = Field(..., description="Shell mode of the session: process or pty")
+    command: str = Field(..., description="Current or last command")
+    running: bool = Field(..., description="Whether the current command is still running")
+    returncode: Optional[int] = Field(None, description="Return code of the last command, None while it is running")
+    records: int = Field(..., description="Number of console records")
+    output_bytes: int = Field(..., description="Bytes of output of the current command kept in memory")
+    history_bytes: int = Field(..., description="Bytes of output of finished commands kept in console records")
+    idle_seconds: float = Field(..., description="Seconds since the session was last used")
+    usage: Optional[ResourceUsage] = Field(None, description="Resources used by the session's finished commands")
+
+
+class ShellSessionsResult(BaseModel):
+    """Shell session listing result model"""
+    sessions: List[ShellSessionInfo] = Field(..., description="Open shell sessions")
+    total_bytes: int = Field(..., description="Bytes of output kept by all sessions")
+    max_sessions: int = Field(..., description="Maximum number of open sessions")
+    idle_ttl_seconds: int = Field(..., description="Seconds after which an idle session is closed")
 
 
 class ShellWaitResult(BaseModel):
     """Process wait result model"""
-    returncode: int = Field(..., description="Process return code")
+    status: str = Field("completed", description="Why the wait returned: completed (process exited), output (new output) or running (wait time elapsed)")
+    returncode: Optional[int] = Field(None, description="Process return code, None while the process is running")
+    output: Optional[str] = Field(None, description="Output after the requested offset, only set when since_offset was given")
+    end_offset: int = Field(0, description="Byte offset of the end of the output since the process started")
+    usage: Optional[ResourceUsage] = Field(None, description="Resources used by the command, only has value when status is completed")
 
 
 class ShellWriteResult(BaseModel):
     """Process input write result model"""
     status: str = Field(..., description="Write status")
+    end_offset: int = Field(0, description="Byte offset of the end of the output, including the written input")
 
 
 class ShellKillResult(BaseModel):
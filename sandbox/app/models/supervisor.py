@@ -23,6 +23,13 @@ class ProcessInfo(BaseModel):
     pid: int = Field(..., description="Process ID")
 
 
+class SupervisorReadiness(BaseModel):
+    """Supervisor readiness model"""
+    ready: bool = Field(..., description="Whether all services are RUNNING")
+    waited_seconds: float = Field(..., description="Time spent waiting for readiness")
+    services: List[ProcessInfo] = Field(default_factory=list, description="Service states at return time")
+
+
 class SupervisorActionResult(BaseModel):
     """Supervisor operation result model"""
     status: str = Field(..., description="Operation status")
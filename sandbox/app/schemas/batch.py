@@ -0,0 +1,17 @@
+"""
+Batch operation request models
+"""
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List
+
+
+class BatchOperation(BaseModel):
+    """Single operation of a batch request"""
+    method: str = Field(..., description="API path of the operation without the /api/v1 prefix, e.g. /shell/view")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Request body of the operation")
+
+
+class BatchRequest(BaseModel):
+    """Batch request executing operations in order"""
+    operations: List[BatchOperation] = Field(..., description="Operations to execute in order")
+    stop_on_error: bool = Field(False, description="Whether to skip the remaining operations after the first failure")
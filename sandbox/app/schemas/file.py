@@ -2,7 +2,7 @@
 File operation request models
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class FileReadRequest(BaseModel):
@@ -10,7 +10,11 @@ class FileReadRequest(BaseModel):
     file: str = Field(..., description="Absolute file path")
     start_line: Optional[int] = Field(None, description="Start line (0-based)")
     end_line: Optional[int] = Field(None, description="End line (not inclusive)")
+    tail_lines: Optional[int] = Field(None, ge=0, description="Read the last N lines, instead of start_line and end_line")
+    start_byte: Optional[int] = Field(None, ge=0, description="Start byte offset, reads a byte range instead of lines")
+    end_byte: Optional[int] = Field(None, ge=0, description="End byte offset (not inclusive)")
     sudo: Optional[bool] = Field(False, description="Whether to use sudo privileges")
+    if_none_match: Optional[str] = Field(None, description="Version the caller already has, content is omitted if unchanged")
 
 
 class FileWriteRequest(BaseModel):
@@ -38,7 +42,32 @@ class FileSearchRequest(BaseModel):
     sudo: Optional[bool] = Field(False, description="Whether to use sudo privileges")
 
 
+class FileGrepRequest(BaseModel):
+    """Directory content search request"""
+    path: str = Field(..., description="Directory to search recursively, or a single file")
+    regex: str = Field(..., description="Regular expression pattern, matched against each line")
+    include: Optional[List[str]] = Field(None, description="Only search files whose name or relative path matches one of these globs")
+    ignore: Optional[List[str]] = Field(None, description="Skip files and directories matching these globs, FILE_SEARCH_IGNORE if not given")
+    context_lines: int = Field(0, ge=0, le=50, description="Lines of context before and after each match")
+    max_results: int = Field(200, gt=0, description="Stop after this many matches")
+    ignore_case: bool = Field(False, description="Whether to match case-insensitively")
+
+
+class FileStatRequest(BaseModel):
+    """File stat request"""
+    file: str = Field(..., description="Absolute file path")
+
+
+class FileWatchRequest(BaseModel):
+    """File change feed request"""
+    paths: Optional[List[str]] = Field(None, description="Only report changes under these paths, all watched roots if empty")
+
+
 class FileFindRequest(BaseModel):
     """File find request"""
     path: str = Field(..., description="Directory path to search")
     glob: str = Field(..., description="Filename pattern (glob syntax)")
+    ignore: Optional[List[str]] = Field(None, description="Skip files and directories matching these globs, FILE_SEARCH_IGNORE if not given")
+    max_depth: Optional[int] = Field(None, gt=0, description="Deepest directory level searched, 1 for the entries of path only")
+    max_results: int = Field(1000, gt=0, description="Stop after this many paths")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page, to continue a truncated search")
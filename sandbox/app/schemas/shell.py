@@ -1,22 +1,28 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 class ShellExecRequest(BaseModel):
     """Shell command execution request model"""
     id: Optional[str] = Field(None, description="Unique identifier of the target shell session, if not provided, one will be automatically created")
     exec_dir: Optional[str] = Field(None, description="Working directory for command execution (must use absolute path)")
     command: str = Field(..., description="Shell command to execute")
+    mode: Optional[Literal["process", "pty"]] = Field(None, description="Shell mode of the session: process (new process per command) or pty (persistent bash), keeps the session's current mode if not provided")
+    cpu_limit: Optional[int] = Field(None, gt=0, description="CPU time limit of the command (seconds), process mode only")
+    memory_limit: Optional[int] = Field(None, gt=0, description="Memory limit of the command (bytes), process mode only")
 
 
 class ShellViewRequest(BaseModel):
     """Shell session content view request model"""
     id: str = Field(..., description="Unique identifier of the target shell session")
+    since_offset: Optional[int] = Field(None, description="Only return output after this byte offset of the command at since_record")
+    since_record: Optional[int] = Field(None, description="Only return console records from this index")
 
 
 class ShellWaitRequest(BaseModel):
     """Shell process wait request model"""
     id: str = Field(..., description="Unique identifier of the target shell session")
     seconds: Optional[int] = Field(None, description="Wait time (seconds)")
+    since_offset: Optional[int] = Field(None, description="Also return as soon as the current process has output after this byte offset")
 
 
 class ShellWriteToProcessRequest(BaseModel):
@@ -2,38 +2,135 @@
 File Operation Service Implementation - Async Version
 """
 import os
-import re
-import glob
+import mmap
+import hashlib
 import asyncio
+import threading
 import subprocess
 import mimetypes
-from typing import Optional, BinaryIO
+from typing import AsyncIterator, Dict, List, Optional, BinaryIO, Tuple
 from fastapi import UploadFile
 from app.models.file import (
     FileReadResult, FileWriteResult, FileReplaceResult,
-    FileSearchResult, FileFindResult, FileUploadResult
+    FileSearchResult, FileFindResult, FileUploadResult, FileStatResult,
+    FileGrepEvent, FileGrepResult, FileFindEvent
 )
+from app.core.config import settings
 from app.core.exceptions import AppException, ResourceNotFoundException, BadRequestException
+from app.services.file_search import (
+    compile_pattern, content_search, directory_index, find_paths, search_buffer, search_file
+)
+from app.services.line_index import LineIndex
 
 
 class FileService:
     """File Operation Service"""
 
+    # Path -> (size, mtime_ns, sha256) of the last hashed version, so unchanged files are not rehashed
+    _hash_cache: Dict[str, Tuple[int, int, str]] = {}
+    _hash_cache_size = 1024
+    _hash_cache_lock = threading.Lock()
+
+    # Path -> line index of the last read version, extended when the file is appended to
+    _line_index_cache: Dict[str, LineIndex] = {}
+    _line_index_cache_size = 64
+    _line_index_lock = threading.Lock()
+
+    @staticmethod
+    def _content_version(file: str, selection: Optional[str] = None) -> Optional[str]:
+        """Version of a file's content from mtime and size, None if the file cannot be stat'ed"""
+        try:
+            st = os.stat(file)
+        except OSError:
+            return None
+        version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        if selection:
+            version += f"-{selection}"
+        return version
+
+    def _line_index(self, file: str, data: mmap.mmap, st: os.stat_result) -> LineIndex:
+        """Line index of the file's current content, reused or extended from the cached one
+
+        Runs in worker threads, cached indexes are never modified, a newer index replaces them.
+        """
+        with self._line_index_lock:
+            cached = self._line_index_cache.get(file)
+        if cached is not None and cached.matches(st.st_ino, st.st_size, st.st_mtime_ns):
+            return cached
+        if cached is not None and cached.can_extend(data, st.st_ino, st.st_size):
+            index = cached.extended(data, st.st_size, st.st_mtime_ns)
+        else:
+            index = LineIndex.build(data, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._line_index_lock:
+            self._line_index_cache.pop(file, None)
+            if len(self._line_index_cache) >= self._line_index_cache_size:
+                del self._line_index_cache[next(iter(self._line_index_cache))]
+            self._line_index_cache[file] = index
+        return index
+
+    @staticmethod
+    def _read_range(data, size: int, index_of, start_line: Optional[int], end_line: Optional[int],
+                    tail_lines: Optional[int], start_byte: Optional[int],
+                    end_byte: Optional[int]) -> FileReadResult:
+        """Read a byte range, the last lines, or a line range of file content"""
+        if start_byte is not None or end_byte is not None:
+            start = min(start_byte or 0, size)
+            end = min(end_byte if end_byte is not None else size, size)
+            content = bytes(data[start:end]).decode("utf-8", errors="replace") if end > start else ""
+            return FileReadResult(content=content, file="", size=size)
+        index: LineIndex = index_of()
+        total = index.line_count
+        if tail_lines is not None:
+            start, end = max(total - tail_lines, 0), total
+        else:
+            # Same bounds as slicing a list of the lines
+            start, end, _ = slice(start_line, end_line).indices(total)
+        return FileReadResult(
+            content=index.read_lines(data, start, end),
+            file="",
+            start_line=start,
+            total_lines=total,
+            size=size
+        )
+
     async def read_file(self, file: str, start_line: Optional[int] = None, 
-                 end_line: Optional[int] = None, sudo: bool = False) -> FileReadResult:
+                 end_line: Optional[int] = None, sudo: bool = False,
+                 if_none_match: Optional[str] = None, tail_lines: Optional[int] = None,
+                 start_byte: Optional[int] = None, end_byte: Optional[int] = None) -> FileReadResult:
         """
         Asynchronously read file content
         
+        Line ranges, the last lines and byte ranges are read through a memory map and a
+        cached line index, so they cost about the size of the returned range.
+        
         Args:
             file: Absolute file path
             start_line: Starting line (0-based)
             end_line: Ending line (not included)
             sudo: Whether to use sudo privileges
+            if_none_match: Version the caller already has, the file is not read if unchanged
+            tail_lines: Read the last N lines instead of a line range
+            start_byte: Starting byte offset, reads a byte range instead of lines
+            end_byte: Ending byte offset (not included)
         """
         # Check if file exists
         if not os.path.exists(file) and not sudo:
             raise ResourceNotFoundException(f"File does not exist: {file}")
         
+        if start_byte is not None or end_byte is not None:
+            selection = f"b{start_byte if start_byte is not None else ''}:{end_byte if end_byte is not None else ''}"
+        elif tail_lines is not None:
+            selection = f"t{tail_lines}"
+        elif start_line is not None or end_line is not None:
+            selection = f"{start_line if start_line is not None else ''}:{end_line if end_line is not None else ''}"
+        else:
+            selection = None
+        
+        # Taken before reading, so a concurrent write results in a newer version on the next read
+        version = self._content_version(file, selection)
+        if version is not None and version == if_none_match:
+            return FileReadResult(content="", file=file, version=version, not_modified=True)
+        
         try:
             content = ""
             
@@ -50,7 +147,33 @@ class FileService:
                 if process.returncode != 0:
                     raise BadRequestException(f"Failed to read file: {stderr.decode()}")
                 
+                if selection is not None:
+                    result = self._read_range(
+                        stdout, len(stdout), lambda: LineIndex.build(stdout, 0, len(stdout), 0),
+                        start_line, end_line, tail_lines, start_byte, end_byte
+                    )
+                    return result.model_copy(update={"file": file, "version": version})
                 content = stdout.decode('utf-8')
+            elif selection is not None:
+                def read_range_async():
+                    try:
+                        with open(file, 'rb') as f:
+                            st = os.fstat(f.fileno())
+                            if st.st_size == 0:
+                                return self._read_range(
+                                    b"", 0, lambda: LineIndex.build(b"", st.st_ino, 0, st.st_mtime_ns),
+                                    start_line, end_line, tail_lines, start_byte, end_byte
+                                )
+                            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                                return self._read_range(
+                                    data, st.st_size, lambda: self._line_index(file, data, st),
+                                    start_line, end_line, tail_lines, start_byte, end_byte
+                                )
+                    except Exception as e:
+                        raise AppException(message=f"Failed to read file: {str(e)}")
+                
+                result = await asyncio.to_thread(read_range_async)
+                return result.model_copy(update={"file": file, "version": version})
             else:
                 # Asynchronously read file
                 def read_file_async():
@@ -63,16 +186,10 @@ class FileService:
                 # Execute IO operation in thread pool
                 content = await asyncio.to_thread(read_file_async)
             
-            # Process line range
-            if start_line is not None or end_line is not None:
-                lines = content.splitlines()
-                start = start_line if start_line is not None else 0
-                end = end_line if end_line is not None else len(lines)
-                content = '\n'.join(lines[start:end])
-            
             return FileReadResult(
                 content=content,
-                file=file
+                file=file,
+                version=version
             )
         except Exception as e:
             if isinstance(e, BadRequestException) or isinstance(e, ResourceNotFoundException):
@@ -195,60 +312,115 @@ class FileService:
             regex: Regular expression pattern
             sudo: Whether to use sudo privileges
         """
-        # Read file
-        file_result = await self.read_file(file, sudo=sudo)
-        content = file_result.content
-        
-        # Process line by line
-        lines = content.splitlines()
-        matches = []
-        line_numbers = []
-        
         # Compile regular expression
-        try:
-            pattern = re.compile(regex)
-        except Exception as e:
-            raise BadRequestException(f"Invalid regular expression: {str(e)}")
+        pattern = compile_pattern(regex)
         
-        # Find matches (use async processing for possibly large files)
-        def process_lines():
-            nonlocal matches, line_numbers
-            for i, line in enumerate(lines):
-                if pattern.search(line):
-                    matches.append(line)
-                    line_numbers.append(i)
-        
-        await asyncio.to_thread(process_lines)
+        if sudo:
+            # Read file
+            file_result = await self.read_file(file, sudo=sudo)
+            content = file_result.content.encode('utf-8')
+            found = await asyncio.to_thread(
+                search_buffer, content, len(content), pattern, file, max_line_length=None
+            )
+        else:
+            if not os.path.exists(file):
+                raise ResourceNotFoundException(f"File does not exist: {file}")
+            # Scanned through a memory map instead of reading and splitting the whole file
+            found = await asyncio.to_thread(
+                search_file, file, pattern, max_line_length=None, skip_binary=False
+            )
+            if found is None:
+                raise AppException(message=f"Failed to read file: {file}")
         
         return FileSearchResult(
             file=file,
-            matches=matches,
-            line_numbers=line_numbers
+            matches=[match.line for match in found],
+            line_numbers=[match.line_number for match in found]
         )
 
-    async def find_by_name(self, path: str, glob_pattern: str) -> FileFindResult:
+    async def stream_search(self, path: str, regex: str, include: Optional[List[str]] = None,
+                            ignore: Optional[List[str]] = None, context_lines: int = 0,
+                            max_results: int = 200, ignore_case: bool = False) -> AsyncIterator[FileGrepEvent]:
         """
-        Asynchronously find files by name pattern
+        Search the files under a directory, yielding each file's matches as found
+        
+        Args:
+            path: Directory to search recursively, or a single file
+            regex: Regular expression pattern, matched against each line
+            include: Only search files whose name or relative path matches one of these globs
+            ignore: Skip files and directories matching these globs, FILE_SEARCH_IGNORE if None
+            context_lines: Lines of context before and after each match
+            max_results: Stop after this many matches (bounded by FILE_SEARCH_MAX_RESULTS)
+            ignore_case: Whether to match case-insensitively
+        """
+        async for event in content_search.search(
+            path, regex,
+            include=include,
+            ignore=settings.FILE_SEARCH_IGNORE if ignore is None else ignore,
+            context_lines=context_lines,
+            max_results=min(max_results, settings.FILE_SEARCH_MAX_RESULTS),
+            ignore_case=ignore_case
+        ):
+            yield event
+
+    async def search_files(self, path: str, regex: str, include: Optional[List[str]] = None,
+                           ignore: Optional[List[str]] = None, context_lines: int = 0,
+                           max_results: int = 200, ignore_case: bool = False) -> FileGrepResult:
+        """
+        Search the files under a directory, arguments as for stream_search
+        """
+        result = FileGrepResult(path=path)
+        async for event in self.stream_search(path, regex, include, ignore, context_lines, max_results, ignore_case):
+            if event.done:
+                result.files_searched = event.files_searched
+                result.files_skipped = event.files_skipped
+                result.truncated = event.truncated
+            else:
+                result.matches.extend(event.matches)
+        result.matches.sort(key=lambda match: (match.file, match.line_number))
+        return result
+
+    async def stream_find(self, path: str, glob_pattern: str, ignore: Optional[List[str]] = None,
+                          max_depth: Optional[int] = None, max_results: int = 1000,
+                          cursor: Optional[str] = None) -> AsyncIterator[FileFindEvent]:
+        """
+        Find files by name pattern, yielding batches of paths as the tree is walked
         
         Args:
             path: Directory path to search
             glob_pattern: File name pattern (glob syntax)
+            ignore: Skip files and directories matching these globs, FILE_SEARCH_IGNORE if None
+            max_depth: Deepest directory level searched, 1 for the entries of path only
+            max_results: Stop after this many paths (bounded by FILE_FIND_MAX_RESULTS)
+            cursor: next_cursor of a previous truncated search, to continue after it
         """
-        # Check if path exists
-        if not os.path.exists(path):
-            raise ResourceNotFoundException(f"Directory does not exist: {path}")
-        
-        # Asynchronously find files
-        def glob_async():
-            search_pattern = os.path.join(path, glob_pattern)
-            return glob.glob(search_pattern, recursive=True)
-        
-        files = await asyncio.to_thread(glob_async)
+        async for event in find_paths(
+            os.path.abspath(path), glob_pattern,
+            ignore=settings.FILE_SEARCH_IGNORE if ignore is None else ignore,
+            max_depth=max_depth,
+            max_results=min(max_results, settings.FILE_FIND_MAX_RESULTS),
+            cursor=cursor,
+            index=directory_index
+        ):
+            yield event
+
+    async def find_by_name(self, path: str, glob_pattern: str, ignore: Optional[List[str]] = None,
+                           max_depth: Optional[int] = None, max_results: int = 1000,
+                           cursor: Optional[str] = None) -> FileFindResult:
+        """
+        Asynchronously find files by name pattern, arguments as for stream_find
         
-        return FileFindResult(
-            path=path,
-            files=files
-        )
+        Paths are returned in sorted walk order, a truncated result carries the cursor
+        of the next page.
+        """
+        result = FileFindResult(path=path)
+        async for event in self.stream_find(path, glob_pattern, ignore, max_depth, max_results, cursor):
+            if event.done:
+                result.truncated = event.truncated
+                result.next_cursor = event.next_cursor
+            else:
+                result.files.extend(event.files)
+        return result
 
     async def upload_file(self, path: str, file_stream: UploadFile) -> FileUploadResult:
         """
@@ -286,6 +458,48 @@ class FileService:
         except Exception as e:
             raise AppException(message=f"Failed to upload file: {str(e)}")
 
+    async def stat_file(self, file: str) -> FileStatResult:
+        """
+        Get file size, modification time and content hash
+        
+        Args:
+            file: Absolute file path
+        """
+        if not os.path.isfile(file):
+            raise ResourceNotFoundException(f"File does not exist: {file}")
+        
+        def stat_and_hash():
+            stat = os.stat(file)
+            with self._hash_cache_lock:
+                cached = self._hash_cache.get(file)
+            if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                return stat, cached[2]
+            
+            digest = hashlib.sha256()
+            with open(file, 'rb') as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+            
+            # Drop the oldest entry once the cache is full
+            with self._hash_cache_lock:
+                self._hash_cache.pop(file, None)
+                if len(self._hash_cache) >= self._hash_cache_size:
+                    del self._hash_cache[next(iter(self._hash_cache))]
+                self._hash_cache[file] = (stat.st_size, stat.st_mtime_ns, sha256)
+            return stat, sha256
+        
+        try:
+            stat, sha256 = await asyncio.to_thread(stat_and_hash)
+            return FileStatResult(
+                file=file,
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                sha256=sha256
+            )
+        except Exception as e:
+            raise AppException(message=f"Failed to stat file: {str(e)}")
+
     def ensure_file(self, path: str) -> None:
         """
         Ensure file exists
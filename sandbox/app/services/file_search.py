@@ -0,0 +1,571 @@
+"""
+File Search - directory walking, name and grep-like content search
+"""
+import os
+import re
+import mmap
+import time
+import fnmatch
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Deque, Dict, Generic, Iterator, List, Optional, Pattern, Set, Tuple, TypeVar, Union
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, ResourceNotFoundException
+from app.models.file import FileContentMatch, FileFindEvent, FileGrepEvent
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# A NUL byte in the first bytes of a file marks it as binary, like grep
+BINARY_SNIFF_BYTES = 8192
+
+# Matched and context lines longer than this are cut (e.g. minified files)
+MAX_LINE_LENGTH = 2000
+
+# Files taken from the directory walk at a time
+WALK_BATCH_SIZE = 256
+
+# Entries walked per step of a name search, between checks for cancellation
+FIND_STEP_ENTRIES = 5000
+
+# Directories modified this recently are not cached, a change within the same
+# mtime tick would go unnoticed
+CACHE_MIN_AGE_NS = 1_000_000_000
+
+GLOB_MAGIC = re.compile(r"[*?[]")
+
+# (name, is_dir, is_file) of a directory entry, symlinks are neither
+DirEntry = Tuple[str, bool, bool]
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def compile_pattern(regex: str, ignore_case: bool = False) -> Pattern[bytes]:
+    """Compile a regular expression to search raw file bytes, ^ and $ match at line boundaries"""
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        return re.compile(regex.encode("utf-8"), flags)
+    except re.error as e:
+        raise BadRequestException(f"Invalid regular expression: {str(e)}")
+
+
+def compile_globs(patterns: Optional[List[str]]) -> Optional[Pattern[str]]:
+    """One regular expression matching any of the glob patterns, None if there are none"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+
+def _matches_any(name: str, rel_path: str, globs: Pattern[str]) -> bool:
+    return globs.match(name) is not None or globs.match(rel_path) is not None
+
+
+def list_directory(directory: str) -> List[DirEntry]:
+    """Entries of a directory sorted by name"""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                entries.append((entry.name, entry.is_dir(follow_symlinks=False), entry.is_file(follow_symlinks=False)))
+            except OSError:
+                continue
+    entries.sort()
+    return entries
+
+
+class DirectoryIndex:
+    """Listings of walked directories, reused while a directory's mtime is unchanged
+
+    Creating, deleting or renaming an entry updates the mtime of its directory, so a
+    cached listing is valid for as long as the mtime stays the same. Walking a tree
+    again then costs one stat per directory instead of reading every directory.
+    """
+
+    def __init__(self, max_dirs: int):
+        self.max_dirs = max_dirs
+        # Directory -> (mtime_ns, entries)
+        self._listings: Dict[str, Tuple[int, List[DirEntry]]] = {}
+
+    def list(self, directory: str) -> List[DirEntry]:
+        if self.max_dirs <= 0:
+            return list_directory(directory)
+        mtime_ns = os.stat(directory).st_mtime_ns
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        entries = list_directory(directory)
+        if time.time_ns() - mtime_ns < CACHE_MIN_AGE_NS:
+            self._listings.pop(directory, None)
+            return entries
+        if directory not in self._listings and len(self._listings) >= self.max_dirs:
+            self._listings.pop(next(iter(self._listings)), None)
+        self._listings[directory] = (mtime_ns, entries)
+        return entries
+
+
+def walk(root: str, ignore: Optional[List[str]] = None, max_depth: Optional[int] = None,
+         start_after: Optional[Tuple[str, ...]] = None,
+         index: Optional[DirectoryIndex] = None) -> Iterator[Tuple[str, Tuple[str, ...], DirEntry]]:
+    """
+    Entries under root in sorted pre-order (a directory right before its contents),
+    without following symlinks
+
+    Args:
+        root: Directory to walk
+        ignore: Entries whose name or path relative to root matches one of these globs are skipped
+        max_depth: Deepest level walked, 1 for the entries of root only
+        start_after: Relative path parts of an entry, the walk resumes after it
+        index: Directory listing cache
+
+    Yields:
+        Path, path parts relative to root, and directory entry
+    """
+    ignore_globs = compile_globs(ignore)
+    stack: List[Tuple[Tuple[str, ...], Iterator[DirEntry]]] = []
+
+    def enter(directory: str, parts: Tuple[str, ...]):
+        try:
+            entries = index.list(directory) if index is not None else list_directory(directory)
+        except OSError:
+            return
+        stack.append((parts, iter(entries)))
+
+    enter(root, ())
+    while stack:
+        parts, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        name, is_dir, _ = entry
+        entry_parts = parts + (name,)
+        if ignore_globs is not None and _matches_any(name, "/".join(entry_parts), ignore_globs):
+            continue
+        depth = len(entry_parts)
+        if start_after is not None:
+            resume_at = start_after[:depth]
+            if entry_parts < resume_at:
+                # Walked before the resume point, with everything below it
+                continue
+            if entry_parts == resume_at:
+                # The resume point or one of its parents, its contents come after it
+                if is_dir and (max_depth is None or depth < max_depth):
+                    enter(os.path.join(root, *entry_parts), entry_parts)
+                continue
+            start_after = None
+        path = os.path.join(root, *entry_parts)
+        yield path, entry_parts, entry
+        if is_dir and (max_depth is None or depth < max_depth):
+            enter(path, entry_parts)
+
+
+def iter_files(root: str, include: Optional[List[str]] = None, ignore: Optional[List[str]] = None,
+               index: Optional[DirectoryIndex] = None) -> Iterator[str]:
+    """
+    Regular files under root, without following symlinks
+
+    Args:
+        root: Directory to walk, or a single file
+        include: Only files whose name or path relative to root matches one of these globs
+        ignore: Files and directories whose name or relative path matches one of these globs are skipped
+        index: Directory listing cache
+    """
+    if not os.path.isdir(root):
+        yield root
+        return
+    include_globs = compile_globs(include)
+    for path, parts, (name, _, is_file) in walk(root, ignore, index=index):
+        if is_file and (include_globs is None or _matches_any(name, "/".join(parts), include_globs)):
+            yield path
+
+
+# Glob segment: (pattern, compiled pattern), None compiled for "**"
+GlobSegment = Tuple[str, Optional[Pattern[str]]]
+
+
+def compile_glob(segments: Tuple[str, ...]) -> Tuple[GlobSegment, ...]:
+    return tuple((s, None if s == "**" else re.compile(fnmatch.translate(s))) for s in segments)
+
+
+def _match_glob(parts: Tuple[str, ...], segments: Tuple[GlobSegment, ...]) -> bool:
+    """Whether relative path parts match glob segments, "**" matches any number of directories"""
+    if not segments:
+        return not parts
+    segment, compiled = segments[0]
+    if compiled is None:
+        for i in range(len(parts) + 1):
+            if _match_glob(parts[i:], segments[1:]):
+                return True
+            if i < len(parts) and parts[i].startswith("."):
+                return False
+        return False
+    if not parts:
+        return False
+    # Like glob, wildcards do not match a leading dot
+    if parts[0].startswith(".") and not segment.startswith("."):
+        return False
+    return compiled.match(parts[0]) is not None and _match_glob(parts[1:], segments[1:])
+
+
+def match_glob(parts: Tuple[str, ...], segments: Tuple[GlobSegment, ...]) -> bool:
+    """Whether relative path parts match glob segments"""
+    # Most entries fail on the name, checked before trying where "**" ends
+    segment, compiled = segments[-1]
+    if compiled is not None and (compiled.match(parts[-1]) is None
+                                 or parts[-1].startswith(".") and not segment.startswith(".")):
+        return False
+    return _match_glob(parts, segments)
+
+
+def split_glob(path: str, pattern: str) -> Tuple[str, Tuple[str, ...]]:
+    """Split a glob relative to path into the directory to walk and the remaining segments"""
+    segments = [s for s in os.path.join(path, pattern).split("/") if s]
+    literal = 0
+    while literal < len(segments) - 1 and not GLOB_MAGIC.search(segments[literal]):
+        literal += 1
+    return "/" + "/".join(segments[:literal]), tuple(segments[literal:])
+
+
+class ThreadedIterator(Generic[T]):
+    """Generator advanced in steps on worker threads and closed from the event loop
+
+    A generator cannot be closed while a thread is running it ("generator already
+    executing"). close() sets the stop event, which running steps should check, and a
+    step that is still running closes the generator itself once it returns.
+    """
+
+    def __init__(self, generator: Iterator[T]):
+        self._generator = generator
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stopped = threading.Event()
+
+    def step(self, consume: Callable[[Iterator[T]], R]) -> R:
+        """Run one step on the calling thread, consume gets the generator to advance"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Iterator is closed")
+            result = consume(self._generator)
+        if self.stopped.is_set():
+            self._close_unless_running()
+        return result
+
+    def close(self) -> None:
+        """Stop the iterator, closed now or when the running step returns"""
+        self.stopped.set()
+        self._close_unless_running()
+
+    def _close_unless_running(self) -> None:
+        # The step holding the lock checks stopped after releasing it and closes then
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if not self._closed:
+                self._closed = True
+                self._generator.close()
+        finally:
+            self._lock.release()
+
+
+def take(iterator: Iterator[T], count: int, stop: threading.Event) -> List[T]:
+    """Up to count items of iterator, fewer if stop is set meanwhile"""
+    items = []
+    for item in iterator:
+        items.append(item)
+        if len(items) >= count or stop.is_set():
+            break
+    return items
+
+
+async def find_paths(path: str, pattern: str, ignore: Optional[List[str]] = None,
+                     max_depth: Optional[int] = None, max_results: int = 1000,
+                     cursor: Optional[str] = None, index: Optional[DirectoryIndex] = None,
+                     executor: Optional[ThreadPoolExecutor] = None) -> AsyncIterator[FileFindEvent]:
+    """
+    Yield batches of paths matching a glob pattern as the tree is walked, then a summary event
+
+    The walk runs in steps on a worker thread and stops after max_results paths, or as
+    soon as the consumer stops iterating. The summary carries a cursor to resume from
+    when results were truncated.
+
+    Args:
+        path: Directory the pattern is relative to
+        pattern: Glob pattern, "**" matches any number of directories
+        ignore: Skip files and directories whose name or relative path matches these globs
+        max_depth: Deepest directory level below path searched
+        max_results: Stop after this many paths
+        cursor: Last path of a previous truncated search, to continue after it
+        index: Directory listing cache
+        executor: Thread pool the walk runs on
+    """
+    if not os.path.exists(path):
+        raise ResourceNotFoundException(f"Directory does not exist: {path}")
+    root, segments = split_glob(path, pattern)
+    if not os.path.isdir(root):
+        yield FileFindEvent(done=True)
+        return
+    # Without "**" nothing deeper than the pattern can match
+    depth_limit = None if "**" in segments else len(segments)
+    if max_depth is not None:
+        # Levels of the pattern's literal prefix already descended below path
+        relative = os.path.relpath(root, path)
+        below = 0 if relative == "." or relative.startswith("..") else relative.count("/") + 1
+        limit = max_depth - below
+        depth_limit = limit if depth_limit is None else min(depth_limit, limit)
+        if depth_limit <= 0:
+            yield FileFindEvent(done=True)
+            return
+    start_after = None
+    if cursor:
+        relative = os.path.relpath(cursor, root)
+        if relative.startswith("..") or os.path.isabs(relative):
+            raise BadRequestException(f"Cursor is not under the searched directory: {cursor}")
+        start_after = tuple(relative.split("/"))
+
+    loop = asyncio.get_running_loop()
+    glob = compile_glob(segments)
+    entries = ThreadedIterator(walk(root, ignore, depth_limit, start_after, index))
+    found = 0
+    last: Optional[str] = None
+    truncated = False
+    walk_done = False
+
+    def step(walker: Iterator[Tuple[str, Tuple[str, ...], DirEntry]]) -> Tuple[List[str], bool]:
+        """Walk up to FIND_STEP_ENTRIES entries, returns the matches and whether the walk ended"""
+        matched = []
+        for _ in range(FIND_STEP_ENTRIES):
+            if entries.stopped.is_set():
+                break
+            item = next(walker, None)
+            if item is None:
+                return matched, True
+            entry_path, parts, _ = item
+            if match_glob(parts, glob):
+                matched.append(entry_path)
+                if found + len(matched) > max_results:
+                    break
+        return matched, False
+
+    try:
+        while not walk_done and not truncated:
+            matched, walk_done = await loop.run_in_executor(executor, entries.step, step)
+            if found + len(matched) > max_results:
+                matched = matched[:max_results - found]
+                truncated = True
+            found += len(matched)
+            if matched:
+                last = matched[-1]
+                yield FileFindEvent(files=matched)
+        yield FileFindEvent(
+            done=True,
+            files_found=found,
+            truncated=truncated,
+            next_cursor=last if truncated else None
+        )
+    finally:
+        # Closed by the worker thread if a step is still running
+        entries.close()
+
+
+def _decode_line(data: Buffer, start: int, end: int, max_length: Optional[int]) -> str:
+    if max_length is not None and end - start > max_length:
+        end = start + max_length
+    line = bytes(data[start:end]).decode("utf-8", errors="replace")
+    return line[:-1] if line.endswith("\r") else line
+
+
+def search_buffer(data: Buffer, size: int, pattern: Pattern[bytes], file: str = "",
+                  context_lines: int = 0, max_matches: Optional[int] = None,
+                  max_line_length: Optional[int] = MAX_LINE_LENGTH,
+                  stop: Optional[threading.Event] = None) -> List[FileContentMatch]:
+    """
+    Matching lines of file content, at most one match per line
+
+    The pattern runs over the whole buffer instead of line by line, lines are only
+    located around matches. Line numbers are 0-based.
+    """
+    matches: List[FileContentMatch] = []
+    pos = 0
+    line_number = 0
+    # Newlines are counted up to this offset
+    counted = 0
+    # End of the previous match's line, before context does not repeat it
+    previous_end = 0
+    while pos <= size and (max_matches is None or len(matches) < max_matches):
+        if stop is not None and stop.is_set():
+            break
+        match = pattern.search(data, pos)
+        if match is None:
+            break
+        start = data.rfind(b"\n", 0, match.start()) + 1
+        if start >= size and size > 0:
+            # Empty match after the trailing newline
+            break
+        end = data.find(b"\n", match.start())
+        if end == -1:
+            end = size
+        line_number += data[counted:start].count(b"\n")
+        counted = start
+
+        before: List[str] = []
+        line_start = start
+        while len(before) < context_lines and line_start > previous_end:
+            line_end = line_start - 1
+            line_start = data.rfind(b"\n", 0, line_end) + 1
+            before.append(_decode_line(data, line_start, line_end, max_line_length))
+        before.reverse()
+
+        after: List[str] = []
+        line_end = end
+        while len(after) < context_lines and line_end + 1 < size:
+            line_start = line_end + 1
+            line_end = data.find(b"\n", line_start)
+            if line_end == -1:
+                line_end = size
+            after.append(_decode_line(data, line_start, line_end, max_line_length))
+
+        matches.append(FileContentMatch(
+            file=file,
+            line_number=line_number,
+            line=_decode_line(data, start, end, max_line_length),
+            before=before,
+            after=after
+        ))
+        previous_end = end + 1
+        pos = end + 1
+    return matches
+
+
+def search_file(file: str, pattern: Pattern[bytes], context_lines: int = 0,
+                max_matches: Optional[int] = None, max_line_length: Optional[int] = MAX_LINE_LENGTH,
+                skip_binary: bool = True, stop: Optional[threading.Event] = None) -> Optional[List[FileContentMatch]]:
+    """
+    Matching lines of a file, scanned through a memory map
+
+    Returns:
+        Matches, None if the file was skipped (binary or unreadable)
+    """
+    try:
+        with open(file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return search_buffer(b"", 0, pattern, file, context_lines, max_matches, max_line_length, stop)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if skip_binary and data.find(b"\0", 0, min(size, BINARY_SNIFF_BYTES)) != -1:
+                    return None
+                return search_buffer(data, size, pattern, file, context_lines, max_matches, max_line_length, stop)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Skipping {file} in content search: {e}")
+        return None
+
+
+class ContentSearch:
+    """Searches the files of a directory tree on a thread pool
+
+    The tree is walked lazily and only a few files per worker are queued ahead, so a
+    search stopping at its result limit does not walk or read the rest of the tree.
+    Files are scanned through memory maps. The regex engine holds the GIL while
+    matching, the threads mainly overlap reading files from disk with scanning.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(workers, 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-search")
+        return self._executor
+
+    async def search(self, path: str, regex: str, include: Optional[List[str]] = None,
+                     ignore: Optional[List[str]] = None, context_lines: int = 0,
+                     max_results: int = 200, ignore_case: bool = False) -> AsyncIterator[FileGrepEvent]:
+        """
+        Yield the matches of each file as its scan completes, then a summary event
+
+        Files are reported in completion order. Once max_results matches were found the
+        search stops, the summary is marked truncated if another match or file was left.
+        """
+        if not os.path.exists(path):
+            raise ResourceNotFoundException(f"Path does not exist: {path}")
+        pattern = compile_pattern(regex, ignore_case)
+        loop = asyncio.get_running_loop()
+        files = ThreadedIterator(iter_files(path, include, ignore, directory_index))
+        queued: Deque[str] = deque()
+        walk_done = False
+        pending: Set[asyncio.Future] = set()
+        stop = threading.Event()
+        found = searched = skipped = 0
+        # max_results matches were found, the search stops
+        full = truncated = False
+
+        def scan(file: str, limit: int) -> Tuple[str, Optional[List[FileContentMatch]]]:
+            return file, search_file(file, pattern, context_lines, limit, stop=stop)
+
+        def next_files(count: int) -> Callable[[Iterator[str]], List[str]]:
+            return lambda iterator: take(iterator, count, files.stopped)
+
+        try:
+            while True:
+                while not full and len(pending) < self.workers * 2:
+                    if not queued and not walk_done:
+                        batch = await loop.run_in_executor(self.executor, files.step, next_files(WALK_BATCH_SIZE))
+                        queued.extend(batch)
+                        walk_done = len(batch) < WALK_BATCH_SIZE
+                    if not queued:
+                        break
+                    # One match more than needed tells whether the file had more
+                    pending.add(loop.run_in_executor(self.executor, scan, queued.popleft(), max_results - found + 1))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    file, matches = future.result()
+                    if matches is None:
+                        skipped += 1
+                        continue
+                    searched += 1
+                    if not matches:
+                        continue
+                    if full:
+                        truncated = True
+                        continue
+                    if len(matches) > max_results - found:
+                        matches = matches[:max_results - found]
+                        truncated = True
+                    found += len(matches)
+                    if found >= max_results:
+                        full = True
+                        stop.set()
+                    yield FileGrepEvent(file=file, matches=matches)
+                if full:
+                    break
+            if full and not truncated:
+                # Files not searched yet may hold more matches
+                truncated = bool(pending or queued)
+                if not truncated and not walk_done:
+                    truncated = bool(await loop.run_in_executor(self.executor, files.step, next_files(1)))
+            yield FileGrepEvent(
+                done=True,
+                matches_found=found,
+                files_searched=searched,
+                files_skipped=skipped,
+                truncated=truncated
+            )
+        finally:
+            # Running scans stop at their next match, queued ones are dropped
+            stop.set()
+            for future in pending:
+                future.cancel()
+            files.close()
+
+
+# Service instances
+directory_index = DirectoryIndex(settings.FILE_FIND_CACHE_DIRS)
+content_search = ContentSearch(settings.FILE_SEARCH_WORKERS)
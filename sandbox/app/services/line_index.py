@@ -0,0 +1,123 @@
+"""
+Line Index - line ranges of large files without reading them whole
+"""
+import mmap
+from array import array
+from bisect import bisect_left
+from typing import Union
+
+# Newlines are counted per block, locating a line scans at most about one block
+BLOCK_SIZE = 1024 * 1024
+
+# Bytes before the indexed end compared to tell an append from a rewrite
+SAMPLE_SIZE = 64
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+class LineIndex:
+    """Newline counts per block of a file's content
+
+    Lines are separated by "\\n" and numbered from 0. Building the index counts newlines
+    block by block, which runs at memory speed and keeps a few integers per megabyte.
+    Locating a line jumps to its block and scans only that block, so reading a range of
+    lines costs about the size of the range. When a file grows and the bytes before the
+    indexed end are unchanged, only the appended part is indexed.
+
+    An index is not changed once it is shared, extended() builds on a copy so readers in
+    other threads keep a consistent index.
+    """
+
+    def __init__(self, ino: int = 0):
+        self.ino = ino
+        self.size = 0
+        self.mtime_ns = 0
+        # Newlines before the start of each block
+        self._block_lines = array("Q")
+        self._newlines = 0
+        self._ends_with_newline = False
+        self._sample = b""
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, a last line without a trailing newline counts as well"""
+        if self.size == 0:
+            return 0
+        return self._newlines + (0 if self._ends_with_newline else 1)
+
+    def matches(self, ino: int, size: int, mtime_ns: int) -> bool:
+        return ino == self.ino and size == self.size and mtime_ns == self.mtime_ns
+
+    def can_extend(self, data: Buffer, ino: int, size: int) -> bool:
+        """Whether the content up to the indexed size is unchanged (the file was appended to)"""
+        return (
+            ino == self.ino and size >= self.size
+            and data[max(self.size - SAMPLE_SIZE, 0):self.size] == self._sample
+        )
+
+    def extended(self, data: Buffer, size: int, mtime_ns: int) -> "LineIndex":
+        """Copy of the index extended to the appended content up to size"""
+        index = LineIndex(self.ino)
+        index.size = self.size
+        index.mtime_ns = self.mtime_ns
+        index._block_lines = array("Q", self._block_lines)
+        index._newlines = self._newlines
+        index._ends_with_newline = self._ends_with_newline
+        index._sample = self._sample
+        index.update(data, size, mtime_ns)
+        return index
+
+    def update(self, data: Buffer, size: int, mtime_ns: int):
+        """Index the content from the indexed size up to size"""
+        # The last block may be partial, recount it from its start
+        block = max(len(self._block_lines) - 1, 0)
+        newlines = self._block_lines[block] if self._block_lines else 0
+        del self._block_lines[block:]
+        # mmap has no count, slicing copies one block at a time
+        for start in range(block * BLOCK_SIZE, size, BLOCK_SIZE):
+            self._block_lines.append(newlines)
+            newlines += data[start:min(start + BLOCK_SIZE, size)].count(b"\n")
+        self._newlines = newlines
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._ends_with_newline = size > 0 and data[size - 1:size] == b"\n"
+        self._sample = bytes(data[max(size - SAMPLE_SIZE, 0):size])
+
+    def line_start(self, data: Buffer, line: int) -> int:
+        """Byte offset of the start of a line, the size for lines past the end"""
+        if line <= 0:
+            return 0
+        if line > self._newlines:
+            return self.size
+        # Last block starting with fewer than line newlines before it
+        block = bisect_left(self._block_lines, line) - 1
+        pos = block * BLOCK_SIZE - 1
+        for _ in range(line - self._block_lines[block]):
+            pos = data.find(b"\n", pos + 1, self.size)
+        return pos + 1
+
+    def line_end(self, data: Buffer, line: int) -> int:
+        """Byte offset of the end of the line before the given one, without its newline"""
+        if line >= self.line_count:
+            return self.size - 1 if self._ends_with_newline else self.size
+        return max(self.line_start(data, line) - 1, 0)
+
+    def read_lines(self, data: Buffer, start_line: int, end_line: int) -> str:
+        """Lines [start_line, end_line) joined by newlines"""
+        if start_line >= end_line:
+            return ""
+        start = self.line_start(data, start_line)
+        end = self.line_end(data, end_line)
+        if end <= start:
+            return ""
+        text = bytes(data[start:end]).decode("utf-8", errors="replace").replace("\r\n", "\n")
+        # Carriage return of a \r\n ending the last returned line
+        if text.endswith("\r") and data[end:end + 1] == b"\n":
+            text = text[:-1]
+        return text
+
+    @classmethod
+    def build(cls, data: Buffer, ino: int, size: int, mtime_ns: int) -> "LineIndex":
+        index = cls(ino)
+        index.update(data, size, mtime_ns)
+        return index
@@ -0,0 +1,299 @@
+"""
+Persistent PTY Shell Implementation
+"""
+import os
+import re
+import uuid
+import fcntl
+import shlex
+import signal
+import struct
+import asyncio
+import logging
+import termios
+import tempfile
+import functools
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Printed by the shell after each command: \x1e__SANDBOX_DONE_<token>_<exit code>\x1e
+MARKER_PREFIX = b"\x1e__SANDBOX_DONE_"
+MARKER_PATTERN = re.compile(rb"\x1e__SANDBOX_DONE_([0-9a-f]{32})_(\d+)\x1e")
+MARKER_MAX_LENGTH = len(MARKER_PREFIX) + 32 + 1 + 3 + 1
+
+# Terminal size reported to programs (rows, columns)
+TERMINAL_SIZE = (50, 200)
+
+# Pagers and editors would wait for a user on the terminal
+SHELL_ENV = {
+    "TERM": "dumb",
+    "PAGER": "cat",
+    "GIT_PAGER": "cat",
+    "SYSTEMD_PAGER": "cat",
+    # No prompt before the setup below is read
+    "PS1": "",
+    "PS2": "",
+}
+
+# Shell setup: no prompts, and the marker of the current command is printed before the
+# next prompt would be, which also happens when the command was interrupted
+SHELL_INIT = (
+    b"PS1= PS2= PROMPT_COMMAND='__rc=$?; if [ -n \"$__SANDBOX_TOKEN\" ]; then "
+    b"printf \"\\036__SANDBOX_DONE_%s_%d\\036\" \"$__SANDBOX_TOKEN\" \"$__rc\"; "
+    b"unset __SANDBOX_TOKEN; fi'\n"
+)
+
+
+def _prepare_shell(cgroup: Optional[str]):
+    """Make the PTY the controlling terminal of the new session and join the shell's cgroup (runs in the child)"""
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+    if cgroup:
+        with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+            f.write("0")
+
+
+class _PtyOutput:
+    """Output of one command, read like a subprocess stdout stream"""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._eof = False
+        self._ready = asyncio.Event()
+
+    def feed(self, data: bytes):
+        if data:
+            self._data += data
+            self._ready.set()
+
+    def feed_eof(self):
+        self._eof = True
+        self._ready.set()
+
+    async def read(self, n: int) -> bytes:
+        """Read up to n bytes, b"" once the command finished and all output was read"""
+        while not self._data and not self._eof:
+            self._ready.clear()
+            await self._ready.wait()
+        data = bytes(self._data[:n])
+        del self._data[:n]
+        return data
+
+
+class _PtyInput:
+    """Terminal input of the shell, written like a subprocess stdin stream"""
+
+    def __init__(self, master_fd: int):
+        self._master_fd = master_fd
+
+    def write(self, data: bytes):
+        os.write(self._master_fd, data)
+
+    async def drain(self):
+        pass
+
+
+class PtyCommand:
+    """A command running in a persistent shell
+
+    Provides the parts of asyncio.subprocess.Process used by the shell service, so
+    commands of persistent and per-command process sessions are handled the same way.
+    """
+
+    def __init__(self, shell: "PtyShell", token: str, script: str):
+        self.shell = shell
+        self.token = token
+        self.script = script
+        self.returncode: Optional[int] = None
+        self.stdout = _PtyOutput()
+        self.stdin = _PtyInput(shell.master_fd)
+        self._done = asyncio.Event()
+
+    @property
+    def pid(self) -> int:
+        return self.shell.process.pid
+
+    def finish(self, returncode: int):
+        if self.returncode is not None:
+            return
+        self.returncode = returncode
+        self.stdout.feed_eof()
+        self._done.set()
+        try:
+            os.remove(self.script)
+        except OSError:
+            pass
+
+    async def wait(self) -> int:
+        await self._done.wait()
+        return self.returncode
+
+    def terminate(self):
+        """Interrupt the command like Ctrl-C, the shell keeps running"""
+        self.shell.interrupt()
+
+    def kill(self):
+        """Kill the command together with its shell, the next command starts a new shell"""
+        self.shell.kill()
+
+
+class PtyShell:
+    """One long-lived bash on a pseudo terminal
+
+    Commands run in the same shell, so working directory changes, variables, functions
+    and activated virtualenvs persist between them, and programs see a terminal. Each
+    command is sourced from a temporary file followed by a marker carrying its exit code,
+    which ends the command's output.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process, master_fd: int, cgroup: Optional[str] = None):
+        self.process = process
+        self.master_fd = master_fd
+        self.cgroup = cgroup
+        self.current: Optional[PtyCommand] = None
+        self._pending = b""
+        self._closed = False
+        self._exit_watcher: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def start(cls, exec_dir: str, cgroup: Optional[str] = None) -> "PtyShell":
+        """Start a shell, optionally in a cgroup its commands are accounted in"""
+        master_fd, slave_fd = os.openpty()
+        try:
+            # No input echo (written input is added to the output by the shell service)
+            # and no \n to \r\n translation, so output looks the same as from a pipe
+            attrs = termios.tcgetattr(slave_fd)
+            attrs[1] &= ~termios.ONLCR
+            attrs[3] &= ~termios.ECHO
+            termios.tcsetattr(slave_fd, termios.TCSANOW, attrs)
+            fcntl.ioctl(slave_fd, termios.TIOCSWINSZ, struct.pack("HHHH", *TERMINAL_SIZE, 0, 0))
+            process = await asyncio.create_subprocess_exec(
+                "bash", "--noprofile", "--norc",
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                cwd=exec_dir,
+                env={**os.environ, **SHELL_ENV},
+                start_new_session=True,
+                preexec_fn=functools.partial(_prepare_shell, cgroup),
+            )
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
+            os.close(slave_fd)
+        os.set_blocking(master_fd, False)
+        shell = cls(process, master_fd, cgroup)
+        asyncio.get_running_loop().add_reader(master_fd, shell._on_readable)
+        shell._exit_watcher = asyncio.create_task(shell._wait_exit())
+        os.write(master_fd, SHELL_INIT)
+        logger.debug(f"Started persistent shell with pid {process.pid}")
+        return shell
+
+    @property
+    def is_alive(self) -> bool:
+        return not self._closed and self.process.returncode is None
+
+    def run(self, command: str, exec_dir: str) -> PtyCommand:
+        """Start a command in the shell, the previous command must have finished
+
+        The shell only changes to exec_dir when it differs from the previously requested
+        directory, so a `cd` in an earlier command stays in effect.
+        """
+        if self.current is not None and self.current.returncode is None:
+            raise RuntimeError("Previous command is still running")
+        fd, script = tempfile.mkstemp(prefix="sandbox-cmd-", suffix=".sh")
+        directory = shlex.quote(exec_dir)
+        with os.fdopen(fd, "w") as f:
+            # The shell remembers the last requested directory, it is only set after a successful cd
+            f.write(
+                f'if [ "$__SANDBOX_EXEC_DIR" != {directory} ]; then cd {directory} || return; __SANDBOX_EXEC_DIR={directory}; fi\n'
+                f"{command}\n"
+            )
+        token = uuid.uuid4().hex
+        self.current = PtyCommand(self, token, script)
+        line = f"__SANDBOX_TOKEN={token}; . {shlex.quote(script)}\n"
+        os.write(self.master_fd, line.encode())
+        return self.current
+
+    def _read_output(self) -> bool:
+        """Handle available terminal output, False once nothing more can be read"""
+        try:
+            data = os.read(self.master_fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        except OSError:
+            # EIO once the shell and every program holding the terminal have exited
+            data = b""
+        if not data:
+            asyncio.get_running_loop().remove_reader(self.master_fd)
+            return False
+        self._handle_output(self._pending + data)
+        return True
+
+    def _on_readable(self):
+        self._read_output()
+
+    async def _wait_exit(self):
+        returncode = await self.process.wait()
+        self._closed = True
+        logger.debug(f"Persistent shell {self.process.pid} exited with code {returncode}")
+        # Output written right before the exit may not have been read yet
+        while self._read_output():
+            pass
+        asyncio.get_running_loop().remove_reader(self.master_fd)
+        os.close(self.master_fd)
+        self.master_fd = -1
+        self._feed(self._pending)
+        self._pending = b""
+        if self.current is not None:
+            self.current.finish(returncode)
+
+    def _handle_output(self, data: bytes):
+        self._pending = b""
+        while data:
+            match = MARKER_PATTERN.search(data)
+            if match is None:
+                break
+            self._feed(data[:match.start()])
+            command = self.current
+            if command is not None and command.token == match.group(1).decode():
+                command.finish(int(match.group(2)))
+            data = data[match.end():]
+        # Keep a possible partial marker at the end for the next read
+        start = data.rfind(b"\x1e")
+        if start != -1 and len(data) - start < MARKER_MAX_LENGTH and MARKER_PREFIX.startswith(data[start:start + len(MARKER_PREFIX)]):
+            self._pending = data[start:]
+            data = data[:start]
+        self._feed(data)
+
+    def _feed(self, data: bytes):
+        if not data:
+            return
+        if self.current is not None and self.current.returncode is None:
+            self.current.stdout.feed(data)
+        else:
+            # e.g. background jobs writing after their command finished
+            logger.debug(f"Dropping {len(data)} bytes of shell output outside a command")
+
+    def interrupt(self):
+        """Type Ctrl-C, the terminal interrupts the foreground job"""
+        if self.is_alive:
+            os.write(self.master_fd, b"\x03")
+
+    def kill(self):
+        """Kill the shell and its foreground job"""
+        if self._closed:
+            return
+        self._closed = True
+        # Jobs get their own process group, the foreground one is the terminal's
+        groups = {self.process.pid}
+        try:
+            groups.add(os.tcgetpgrp(self.master_fd))
+        except OSError:
+            pass
+        for group in groups:
+            try:
+                os.killpg(group, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,254 @@
+"""
+Command Resource Accounting - cgroup v2 based, with a getrusage fallback
+"""
+import os
+import time
+import uuid
+import logging
+import resource
+from typing import Dict, Optional, Set
+from app.models.shell import ResourceUsage
+
+logger = logging.getLogger(__name__)
+
+# Name prefix of the cgroups created for commands and persistent shells
+CGROUP_PREFIX = "sandbox-cmd-"
+
+# Controllers enabled for child cgroups when available, cpu.stat needs none
+CGROUP_CONTROLLERS = ("memory", "io")
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _find_cgroup_base() -> Optional[str]:
+    """Writable cgroup v2 directory of this process, None if cgroups cannot be used"""
+    cgroups = _read_file("/proc/self/cgroup") or ""
+    path = next((line[3:] for line in cgroups.splitlines() if line.startswith("0::")), None)
+    mount = None
+    for line in (_read_file("/proc/self/mounts") or "").splitlines():
+        fields = line.split()
+        if len(fields) > 2 and fields[2] == "cgroup2":
+            mount = fields[1]
+            break
+    if path is None or mount is None:
+        return None
+    base = os.path.join(mount, path.lstrip("/"))
+    if not os.access(os.path.join(base, "cgroup.subtree_control"), os.W_OK):
+        return None
+    return base
+
+
+def _read_cgroup_stats(cgroup: str) -> Dict[str, int]:
+    """Cumulative CPU (microseconds), I/O (bytes) and peak memory (bytes) of a cgroup"""
+    stats: Dict[str, int] = {}
+    for line in (_read_file(os.path.join(cgroup, "cpu.stat")) or "").splitlines():
+        key, _, value = line.partition(" ")
+        if key in ("user_usec", "system_usec"):
+            stats[key] = int(value)
+    io_stat = _read_file(os.path.join(cgroup, "io.stat"))
+    if io_stat is not None:
+        stats["rbytes"] = stats["wbytes"] = 0
+        for line in io_stat.splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key in ("rbytes", "wbytes"):
+                    stats[key] += int(value)
+    peak = _read_file(os.path.join(cgroup, "memory.peak"))
+    if peak is not None:
+        stats["peak"] = int(peak)
+    return stats
+
+
+def combine_usage(total: Optional[ResourceUsage], usage: ResourceUsage) -> ResourceUsage:
+    """Add the usage of a command to the usage of a session"""
+    if total is None:
+        return usage
+
+    def add(a, b):
+        return b if a is None else a if b is None else round(a + b, 6)
+
+    return ResourceUsage(
+        commands=total.commands + usage.commands,
+        wall_time=round(total.wall_time + usage.wall_time, 3),
+        cpu_user=add(total.cpu_user, usage.cpu_user),
+        cpu_system=add(total.cpu_system, usage.cpu_system),
+        max_rss=max(total.max_rss or 0, usage.max_rss or 0) or None,
+        io_read_bytes=add(total.io_read_bytes, usage.io_read_bytes),
+        io_write_bytes=add(total.io_write_bytes, usage.io_write_bytes),
+        source=total.source if total.source == usage.source else "mixed"
+    )
+
+
+class CommandResources:
+    """Resource accounting and limits of one command
+
+    With a cgroup the command's processes are counted exactly, including their children.
+    A cgroup shared by several commands (a persistent shell) is measured by difference,
+    so the peak memory is not known. Without a cgroup, CPU time and block I/O come from
+    the difference of this process's reaped children usage, which also includes other
+    commands finishing at the same time, and the peak memory is only known when the
+    command raised the children maximum.
+    """
+
+    def __init__(self, cgroup: Optional[str], owns_cgroup: bool, use_rusage: bool,
+                 cpu_limit: Optional[int] = None, memory_limit: Optional[int] = None):
+        self.cgroup = cgroup
+        self.owns_cgroup = owns_cgroup
+        self.use_rusage = use_rusage
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self._cgroup_procs = os.path.join(cgroup, "cgroup.procs") if cgroup else None
+        self._start_time = time.monotonic()
+        self._start_stats = _read_cgroup_stats(cgroup) if cgroup and not owns_cgroup else {}
+        self._start_rusage = resource.getrusage(resource.RUSAGE_CHILDREN) if use_rusage else None
+        self.usage: Optional[ResourceUsage] = None
+
+    @property
+    def needs_preexec(self) -> bool:
+        return bool(self.owns_cgroup or self.cpu_limit or self.memory_limit)
+
+    def preexec(self):
+        """Join the command's cgroup and apply limits (runs in the child before exec)"""
+        if self.owns_cgroup:
+            with open(self._cgroup_procs, "w") as f:
+                f.write("0")
+        if self.cpu_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_limit, self.cpu_limit))
+        if self.memory_limit and not (self.owns_cgroup and os.path.exists(os.path.join(self.cgroup, "memory.max"))):
+            resource.setrlimit(resource.RLIMIT_DATA, (self.memory_limit, self.memory_limit))
+
+    def finish(self) -> ResourceUsage:
+        """Usage of the command, call once its process has been waited for"""
+        if self.usage is not None:
+            return self.usage
+        wall_time = round(time.monotonic() - self._start_time, 3)
+        if self.cgroup:
+            stats = _read_cgroup_stats(self.cgroup)
+            start = self._start_stats
+
+            def delta(key):
+                return stats[key] - start.get(key, 0) if key in stats else None
+
+            user, system = delta("user_usec"), delta("system_usec")
+            self.usage = ResourceUsage(
+                wall_time=wall_time,
+                cpu_user=user / 1e6 if user is not None else None,
+                cpu_system=system / 1e6 if system is not None else None,
+                max_rss=stats.get("peak") if self.owns_cgroup else None,
+                io_read_bytes=delta("rbytes"),
+                io_write_bytes=delta("wbytes"),
+                source="cgroup"
+            )
+        elif self._start_rusage is not None:
+            start, end = self._start_rusage, resource.getrusage(resource.RUSAGE_CHILDREN)
+            self.usage = ResourceUsage(
+                wall_time=wall_time,
+                cpu_user=round(end.ru_utime - start.ru_utime, 3),
+                cpu_system=round(end.ru_stime - start.ru_stime, 3),
+                # ru_maxrss is the largest child so far, in kilobytes
+                max_rss=end.ru_maxrss * 1024 if end.ru_maxrss > start.ru_maxrss else None,
+                io_read_bytes=(end.ru_inblock - start.ru_inblock) * 512,
+                io_write_bytes=(end.ru_oublock - start.ru_oublock) * 512,
+                source="rusage"
+            )
+        else:
+            self.usage = ResourceUsage(wall_time=wall_time, source="wall")
+        return self.usage
+
+
+class ResourceAccounting:
+    """Creates the cgroups commands are accounted and limited in
+
+    cgroup v2 is used when this process's cgroup is writable, e.g. in a container with a
+    delegated cgroup namespace. Memory and I/O figures need the memory and io controllers
+    to be available to child cgroups, CPU time is always reported.
+    """
+
+    def __init__(self):
+        self._base: Optional[str] = None
+        self._detected = False
+        # Cgroups that still held processes (e.g. background jobs) when they were removed
+        self._stale: Set[str] = set()
+
+    @property
+    def base(self) -> Optional[str]:
+        if not self._detected:
+            self._detected = True
+            self._base = _find_cgroup_base()
+            if self._base is not None:
+                available = (_read_file(os.path.join(self._base, "cgroup.controllers")) or "").split()
+                for controller in CGROUP_CONTROLLERS:
+                    if controller not in available:
+                        continue
+                    try:
+                        with open(os.path.join(self._base, "cgroup.subtree_control"), "w") as f:
+                            f.write(f"+{controller}")
+                    except OSError as e:
+                        logger.info(f"cgroup controller {controller} not available for commands: {e}")
+                logger.info(f"Accounting commands in cgroups under {self._base}")
+            else:
+                logger.info("No writable cgroup v2, accounting commands with getrusage")
+        return self._base
+
+    def create_cgroup(self, memory_limit: Optional[int] = None) -> Optional[str]:
+        """Create a cgroup for a command or shell, None if cgroups cannot be used"""
+        self._remove_stale()
+        if self.base is None:
+            return None
+        path = os.path.join(self.base, f"{CGROUP_PREFIX}{uuid.uuid4().hex[:12]}")
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            logger.warning(f"Failed to create cgroup {path}: {e}")
+            return None
+        if memory_limit and os.path.exists(os.path.join(path, "memory.max")):
+            try:
+                with open(os.path.join(path, "memory.max"), "w") as f:
+                    f.write(str(memory_limit))
+            except OSError as e:
+                logger.warning(f"Failed to set memory limit of {path}: {e}")
+        return path
+
+    def remove_cgroup(self, path: Optional[str]):
+        if path is None:
+            return
+        try:
+            os.rmdir(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self._stale.add(path)
+
+    def _remove_stale(self):
+        for path in list(self._stale):
+            self._stale.discard(path)
+            self.remove_cgroup(path)
+
+    def start(self, cpu_limit: Optional[int] = None, memory_limit: Optional[int] = None) -> CommandResources:
+        """Accounting of a command started in a new process"""
+        cgroup = self.create_cgroup(memory_limit)
+        return CommandResources(
+            cgroup, owns_cgroup=cgroup is not None, use_rusage=cgroup is None,
+            cpu_limit=cpu_limit, memory_limit=memory_limit
+        )
+
+    def start_in_shell(self, shell_cgroup: Optional[str]) -> CommandResources:
+        """Accounting of a command run by a persistent shell in the given cgroup"""
+        return CommandResources(shell_cgroup, owns_cgroup=False, use_rusage=False)
+
+    def finish(self, resources: CommandResources) -> ResourceUsage:
+        """Usage of a finished command, its own cgroup is removed"""
+        usage = resources.finish()
+        if resources.owns_cgroup:
+            self.remove_cgroup(resources.cgroup)
+        return usage
+
+
+# Service instance
+resource_accounting = ResourceAccounting()
@@ -6,18 +6,30 @@ import subprocess
 import uuid
 import getpass
 import socket
+import time
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Set, AsyncIterator, Union
 from app.models.shell import (
     ShellCommandResult, ShellViewResult, ShellWaitResult,
-    ShellWriteResult, ShellKillResult, ShellTask, ConsoleRecord
+    ShellWriteResult, ShellKillResult, ShellTask, ConsoleRecord, ShellOutputEvent,
+    ShellSessionInfo, ShellSessionsResult
 )
+from app.core.config import settings
 from app.core.exceptions import AppException, ResourceNotFoundException, BadRequestException
+from app.services.shell_output import ShellOutputBuffer
+from app.services.pty_shell import PtyShell, PtyCommand
+from app.services.resource_usage import CommandResources, resource_accounting, combine_usage
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Process output read size, a read returns as soon as any output is available
+OUTPUT_READ_SIZE = 64 * 1024
+
+# Replaces the output of old console records dropped to keep the session history bounded
+HISTORY_DROPPED_MARKER = "[... output dropped ...]\n"
+
 class ShellService:
     # Store active shell sessions
     active_shells: Dict[str, Dict[str, Any]] = {}
@@ -25,6 +37,88 @@ class ShellService:
     # Store shell tasks
     shell_tasks: Dict[str, ShellTask] = {}
 
+    # Persistent shells of sessions in pty mode
+    pty_shells: Dict[str, PtyShell] = {}
+
+    # Output subscribers per session, each queue receives (process, output chunk or None on exit, end offset)
+    output_listeners: Dict[str, Set[asyncio.Queue]] = {}
+
+    # Background task closing idle sessions, started with the first session
+    reaper: Optional[asyncio.Task] = None
+
+    def _get_shell(self, session_id: str) -> Dict[str, Any]:
+        """Look up a session and mark it as used"""
+        if session_id not in self.active_shells:
+            logger.error(f"Session ID not found: {session_id}")
+            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
+        shell = self.active_shells[session_id]
+        shell["last_used"] = time.monotonic()
+        return shell
+
+    def _is_idle(self, session_id: str) -> bool:
+        """A session is idle when its command has finished and nobody follows its output"""
+        shell = self.active_shells[session_id]
+        return shell["reader"].done() and not self.output_listeners.get(session_id)
+
+    def _stop_pty_shell(self, session_id: str):
+        pty_shell = self.pty_shells.pop(session_id, None)
+        if pty_shell is not None:
+            pty_shell.kill()
+            resource_accounting.remove_cgroup(pty_shell.cgroup)
+
+    def _close_session(self, session_id: str):
+        """Drop an idle session with its output and console history"""
+        self.active_shells.pop(session_id, None)
+        self._stop_pty_shell(session_id)
+        logger.info(f"Closed shell session: {session_id}")
+
+    def _make_room(self):
+        """Close the least recently used idle session if the session limit is reached"""
+        if len(self.active_shells) < settings.SHELL_MAX_SESSIONS:
+            return
+        idle = [session_id for session_id in self.active_shells if self._is_idle(session_id)]
+        if not idle:
+            raise BadRequestException(
+                f"Too many shell sessions: {len(self.active_shells)} sessions are running commands"
+            )
+        self._close_session(min(idle, key=lambda session_id: self.active_shells[session_id]["last_used"]))
+
+    def _trim_history(self, shell: Dict[str, Any]):
+        """Drop the output of the oldest finished commands beyond the history limit"""
+        records: List[ConsoleRecord] = shell["console"]
+        sizes = [len(record.output.encode("utf-8")) for record in records]
+        total = sum(sizes)
+        for record, size in zip(records, sizes):
+            if total <= settings.SHELL_MAX_HISTORY_BYTES:
+                break
+            if record.output != HISTORY_DROPPED_MARKER:
+                record.output = HISTORY_DROPPED_MARKER
+                total -= size
+
+    def _start_reaper(self):
+        if self.reaper is None or self.reaper.done():
+            self.reaper = asyncio.create_task(self._reap_idle_sessions())
+
+    async def _reap_idle_sessions(self):
+        """Periodically close sessions idle for longer than the idle TTL"""
+        ttl = settings.SHELL_IDLE_TTL_SECONDS
+        while self.active_shells:
+            await asyncio.sleep(min(max(ttl / 4, 1), 60))
+            now = time.monotonic()
+            for session_id in list(self.active_shells):
+                if self._is_idle(session_id) and now - self.active_shells[session_id]["last_used"] > ttl:
+                    logger.info(f"Shell session {session_id} idle for more than {ttl}s")
+                    self._close_session(session_id)
+
+    def _publish_output(self, session_id: str, process: asyncio.subprocess.Process,
+                        output: Optional[str], end_offset: int):
+        """Push an output chunk (None for process exit) to the session's subscribers"""
+        for queue in self.output_listeners.get(session_id, ()):
+            queue.put_nowait((process, output, end_offset))
+
+    def _new_output_buffer(self) -> ShellOutputBuffer:
+        return ShellOutputBuffer(settings.SHELL_OUTPUT_HEAD_BYTES, settings.SHELL_OUTPUT_TAIL_BYTES)
+
     def _get_display_path(self, path: str) -> str:
         """Get the path for display, replacing user home directory with ~"""
         home_dir = os.path.expanduser("~")
@@ -40,7 +134,8 @@ class ShellService:
         display_dir = self._get_display_path(exec_dir)
         return f"{username}@{hostname}:{display_dir} $"
 
-    async def _create_process(self, command: str, exec_dir: str) -> asyncio.subprocess.Process:
+    async def _create_process(self, command: str, exec_dir: str,
+                              resources: Optional[CommandResources] = None) -> asyncio.subprocess.Process:
         """Create a new async subprocess"""
         logger.debug(f"Creating process for command: {command} in directory: {exec_dir}")
         return await asyncio.create_subprocess_shell(
@@ -49,39 +144,91 @@ class ShellService:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.STDOUT,  # Redirect stderr to stdout
             stdin=asyncio.subprocess.PIPE,
-            limit=1024*1024  # Set buffer size to 1MB
+            limit=1024*1024,  # Set buffer size to 1MB
+            # Join the command's cgroup and apply its limits
+            preexec_fn=resources.preexec if resources is not None and resources.needs_preexec else None
         )
 
-    async def _start_output_reader(self, session_id: str, process: asyncio.subprocess.Process):
+    async def _start_command(self, session_id: str, mode: str, command: str, exec_dir: str,
+                             cpu_limit: Optional[int] = None, memory_limit: Optional[int] = None
+                             ) -> Tuple[Union[asyncio.subprocess.Process, PtyCommand], CommandResources]:
+        """Start a command in a new process, or in the session's persistent shell in pty mode"""
+        if mode == "pty":
+            pty_shell = self.pty_shells.get(session_id)
+            if pty_shell is None or not pty_shell.is_alive:
+                logger.debug(f"Starting persistent shell for session: {session_id}")
+                self._stop_pty_shell(session_id)
+                cgroup = resource_accounting.create_cgroup()
+                try:
+                    pty_shell = await PtyShell.start(exec_dir, cgroup)
+                except Exception:
+                    resource_accounting.remove_cgroup(cgroup)
+                    raise
+                self.pty_shells[session_id] = pty_shell
+            resources = resource_accounting.start_in_shell(pty_shell.cgroup)
+            return pty_shell.run(command, exec_dir), resources
+        
+        # Session switched back to process mode
+        self._stop_pty_shell(session_id)
+        resources = resource_accounting.start(
+            cpu_limit=cpu_limit or settings.SHELL_COMMAND_CPU_LIMIT,
+            memory_limit=memory_limit or settings.SHELL_COMMAND_MEMORY_LIMIT
+        )
+        try:
+            return await self._create_process(command, exec_dir, resources), resources
+        except Exception:
+            resource_accounting.finish(resources)
+            raise
+
+    async def _start_output_reader(self, session_id: str, process: Union[asyncio.subprocess.Process, PtyCommand],
+                                   output_buffer: ShellOutputBuffer, resources: CommandResources):
         """Start a coroutine to continuously read process output and store it"""
         logger.debug(f"Starting output reader for session: {session_id}")
         while True:
             if process.stdout:
                 try:
-                    buffer = await process.stdout.read(128)
+                    buffer = await process.stdout.read(OUTPUT_READ_SIZE)
                     if not buffer:
                         # Process output ended
                         break
                     
-                    output = buffer.decode('utf-8')
-                    # Add output to shell session
-                    shell = self.active_shells.get(session_id)
-                    if shell:
-                        shell["output"] += output
-                        # Update the output of the latest console record
-                        if shell["console"]:
-                            shell["console"][-1].output += output
+                    output = output_buffer.write(buffer)
+                    if output:
+                        self._publish_output(session_id, process, output, output_buffer.end_offset)
                 except Exception as e:
                     logger.error(f"Error reading process output: {str(e)}", exc_info=True)
                     break
             else:
                 break
         
+        output = output_buffer.finish()
+        if output:
+            self._publish_output(session_id, process, output, output_buffer.end_offset)
+        returncode = await process.wait()
+        usage = resource_accounting.finish(resources)
+        shell = self.active_shells.get(session_id)
+        if shell is not None:
+            shell["total_usage"] = combine_usage(shell.get("total_usage"), usage)
+            if shell["process"] is process:
+                shell["usage"] = usage
+                # Idle time counts from the end of the command
+                shell["last_used"] = time.monotonic()
+        self._publish_output(session_id, process, None, output_buffer.end_offset)
         logger.debug(f"Output reader for session {session_id} has finished")
+        return returncode
 
-    async def exec_command(self, session_id: str, exec_dir: Optional[str], command: str) -> ShellCommandResult:
+    async def exec_command(self, session_id: str, exec_dir: Optional[str], command: str,
+                           mode: Optional[str] = None, cpu_limit: Optional[int] = None,
+                           memory_limit: Optional[int] = None) -> ShellCommandResult:
         """
         Asynchronously execute a command in the specified shell session
+        
+        In process mode each command runs in a new process. In pty mode commands run one
+        after another in a persistent bash, so shell state carries over between them.
+        The mode is kept by the session until another one is requested.
+        
+        Resource usage of the command is returned once it completes. CPU time and memory
+        limits (defaulting to the configured ones) apply to commands in process mode.
         """
         logger.info(f"Executing command in session {session_id}: {command}")
         if not exec_dir:
@@ -98,19 +245,29 @@ class ShellService:
             # If it's a new session, create a new process
             if session_id not in self.active_shells:
                 logger.debug(f"Creating new shell session: {session_id}")
-                process = await self._create_process(command, exec_dir)
+                self._make_room()
+                mode = mode or settings.SHELL_DEFAULT_MODE
+                process, resources = await self._start_command(
+                    session_id, mode, command, exec_dir, cpu_limit, memory_limit
+                )
+                output_buffer = self._new_output_buffer()
                 self.active_shells[session_id] = {
                     "process": process,
+                    "mode": mode,
                     "exec_dir": exec_dir,
-                    "output": "",
-                    "console": [ConsoleRecord(ps1=ps1, command=command, output="")]
+                    "output": output_buffer,
+                    "console": [ConsoleRecord(ps1=ps1, command=command, output="")],
+                    "last_used": time.monotonic()
                 }
                 # Start the output reader coroutine
-                asyncio.create_task(self._start_output_reader(session_id, process))
+                self.active_shells[session_id]["reader"] = asyncio.create_task(
+                    self._start_output_reader(session_id, process, output_buffer, resources)
+                )
+                self._start_reaper()
             else:
                 # Execute command in an existing session
                 logger.debug(f"Using existing shell session: {session_id}")
-                shell = self.active_shells[session_id]
+                shell = self._get_shell(session_id)
                 old_process = shell["process"]
                 
                 # If the old process is still running, terminate it first
@@ -124,51 +281,56 @@ class ShellService:
                         logger.warning(f"Forcefully killing process in session: {session_id}")
                         old_process.kill()
                 
-                # Create a new process
-                process = await self._create_process(command, exec_dir)
+                # Create a new process, or run the command in the persistent shell
+                shell["mode"] = mode or shell["mode"]
+                process, resources = await self._start_command(
+                    session_id, shell["mode"], command, exec_dir, cpu_limit, memory_limit
+                )
+                
+                # Keep the final output of the previous command in its console record
+                self._update_console_output(shell)
+                self._trim_history(shell)
                 
                 # Update session information
+                output_buffer = self._new_output_buffer()
                 self.active_shells[session_id]["process"] = process
                 self.active_shells[session_id]["exec_dir"] = exec_dir
-                self.active_shells[session_id]["output"] = ""  # Clear previous output
+                self.active_shells[session_id]["output"] = output_buffer  # Clear previous output
+                shell["usage"] = None
                 
-                # Record command console record, but output is initially empty, will be updated later
+                # Record command console record, its output is taken from the output buffer when read
                 shell["console"].append(ConsoleRecord(ps1=ps1, command=command, output=""))
                 
                 # Start the output reader coroutine
-                asyncio.create_task(self._start_output_reader(session_id, process))
+                self.active_shells[session_id]["reader"] = asyncio.create_task(
+                    self._start_output_reader(session_id, process, output_buffer, resources)
+                )
+                # Let output streams know a new command started, even if it prints nothing
+                self._publish_output(session_id, process, "", 0)
             
-            # Try to wait for the process to complete (max 5 seconds)
-            try:
-                logger.debug(f"Waiting for process completion in session: {session_id}")
-                wait_result = await self.wait_for_process(session_id, seconds=5)
-                if wait_result.returncode is not None:
-                    # Process has completed, get the output
-                    logger.debug(f"Process completed with code: {wait_result.returncode}")
-                    view_result = await self.view_shell(session_id)
-                    # Update the output of the latest console record
-                    if self.active_shells[session_id]["console"]:
-                        self.active_shells[session_id]["console"][-1].output = view_result.output
-                    
-                    # Get command console records
-                    console = self.get_console_records(session_id)
-                    
-                    return ShellCommandResult(
-                        session_id=session_id,
-                        command=command,
-                        status="completed",
-                        returncode=wait_result.returncode,
-                        output=view_result.output,
-                        console=console
-                    )
-            except BadRequestException:
-                # Wait timeout, process still running
-                logger.debug(f"Process still running after timeout in session: {session_id}")
-                pass
-            except Exception as e:
-                # Other exceptions, ignore and continue
-                logger.warning(f"Exception while waiting for process: {str(e)}")
-                pass
+            # Wait for the process to complete (max 5 seconds)
+            logger.debug(f"Waiting for process completion in session: {session_id}")
+            reader = self.active_shells[session_id]["reader"]
+            await asyncio.wait({reader}, timeout=5)
+            if reader.done():
+                # Process has completed, get the output
+                logger.debug(f"Process completed with code: {reader.result()}")
+                view_result = await self.view_shell(session_id)
+                
+                # Get command console records
+                console = self.get_console_records(session_id)
+                
+                return ShellCommandResult(
+                    session_id=session_id,
+                    command=command,
+                    status="completed",
+                    returncode=reader.result(),
+                    output=view_result.output,
+                    console=console,
+                    end_offset=view_result.end_offset,
+                    usage=self.active_shells[session_id].get("usage")
+                )
+            logger.debug(f"Process still running after timeout in session: {session_id}")
             
             # Get current console records
             console = self.get_console_records(session_id)
@@ -177,8 +339,11 @@ class ShellService:
                 session_id=session_id,
                 command=command,
                 status="running",
-                console=console
+                console=console,
+                end_offset=self.active_shells[session_id]["output"].end_offset
             )
+        except BadRequestException:
+            raise
         except Exception as e:
             logger.error(f"Command execution failed: {str(e)}", exc_info=True)
             raise AppException(
@@ -186,79 +351,207 @@ class ShellService:
                 data={"session_id": session_id, "command": command}
             )
 
-    async def view_shell(self, session_id: str) -> ShellViewResult:
+    async def view_shell(self, session_id: str, since_offset: Optional[int] = None,
+                         since_record: Optional[int] = None) -> ShellViewResult:
         """
         Asynchronously view the content of the specified shell session
+        
+        With since_record, only console records from that index are returned. since_offset
+        is an end_offset of a previous view, output before it is skipped if the current
+        command is still the one at since_record (or since_record is not given). The output
+        of the current command's console record is the same as the returned output.
         """
         logger.debug(f"Viewing shell content for session: {session_id}")
-        if session_id not in self.active_shells:
-            logger.error(f"Session ID not found: {session_id}")
-            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
+        shell = self._get_shell(session_id)
+        output_buffer: ShellOutputBuffer = shell["output"]
+        records: List[ConsoleRecord] = shell["console"]
+        current = len(records) - 1
         
-        shell = self.active_shells[session_id]
+        start_record = min(max(since_record or 0, 0), max(current, 0))
+        start_offset = 0
+        if since_offset is not None and (since_record is None or since_record == current):
+            start_offset = min(max(since_offset, 0), output_buffer.end_offset)
+        output = output_buffer.read(start_offset)
         
-        # Directly use the stored output
-        output = shell["output"]
-        
-        # Get command console records
-        console = self.get_console_records(session_id)
+        # Finished commands keep their final output, the current one gets the returned output
+        console = records[start_record:current]
+        if records:
+            console.append(records[current].model_copy(update={"output": output}))
         
         return ShellViewResult(
             output=output,
             session_id=session_id,
-            console=console
+            console=console,
+            returncode=shell["process"].returncode,
+            end_offset=output_buffer.end_offset,
+            start_offset=start_offset,
+            start_record=start_record
         )
 
+    async def stream_shell(self, session_id: str, since_offset: Optional[int] = None,
+                           since_record: Optional[int] = None) -> AsyncIterator[ShellViewResult]:
+        """
+        Stream the specified shell session as view deltas, following later commands
+        
+        The first event is the same as view_shell with the given offsets. Each later event
+        carries one output chunk of the current command, or a new command with its output
+        so far, or the exit of the current command (with returncode). Events can be applied
+        to a view in the same way as view_shell deltas.
+        """
+        logger.debug(f"Streaming shell session: {session_id}")
+        queue: asyncio.Queue = asyncio.Queue()
+        # Registered before the first view, so no output falls between the two
+        self.output_listeners.setdefault(session_id, set()).add(queue)
+        try:
+            yield await self.view_shell(session_id, since_offset, since_record)
+            while True:
+                source, output, end_offset = await queue.get()
+                shell = self.active_shells.get(session_id)
+                if shell is None:
+                    return
+                if source is not shell["process"]:
+                    # Late output of a process replaced by a newer command
+                    continue
+                current = len(shell["console"]) - 1
+                start_offset = end_offset - len((output or "").encode("utf-8"))
+                yield ShellViewResult(
+                    output=output or "",
+                    session_id=session_id,
+                    console=[shell["console"][current].model_copy(update={"output": output or ""})],
+                    returncode=source.returncode,
+                    end_offset=end_offset,
+                    start_offset=start_offset,
+                    start_record=current
+                )
+        finally:
+            listeners = self.output_listeners.get(session_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self.output_listeners[session_id]
+
+    async def subscribe_output(self, session_id: str) -> AsyncIterator[ShellOutputEvent]:
+        """
+        Stream the output of the current process in the specified shell session
+        
+        The first event carries the output produced so far, later events carry new output
+        as it is read. The last event carries the return code once the process exits.
+        """
+        logger.debug(f"Subscribing to output of session: {session_id}")
+        shell = self._get_shell(session_id)
+        process = shell["process"]
+        queue: asyncio.Queue = asyncio.Queue()
+        self.output_listeners.setdefault(session_id, set()).add(queue)
+        try:
+            output_buffer: ShellOutputBuffer = shell["output"]
+            yield ShellOutputEvent(session_id=session_id, output=output_buffer.text(), end_offset=output_buffer.end_offset)
+            # The reader may have already published the exit before subscribing
+            if shell["reader"].done():
+                queue.put_nowait((process, None, output_buffer.end_offset))
+            while True:
+                source, output, end_offset = await queue.get()
+                if source is not process:
+                    # Late output of a process replaced by a newer command
+                    continue
+                if output == "":
+                    continue
+                if output is None:
+                    yield ShellOutputEvent(
+                        session_id=session_id, output="", returncode=process.returncode, end_offset=end_offset
+                    )
+                    return
+                yield ShellOutputEvent(session_id=session_id, output=output, end_offset=end_offset)
+        finally:
+            listeners = self.output_listeners.get(session_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self.output_listeners[session_id]
+
+    def _update_console_output(self, shell: Dict[str, Any]):
+        """Copy the current output buffer into the console record of the running command"""
+        if shell["console"]:
+            shell["console"][-1].output = shell["output"].text()
+
     def get_console_records(self, session_id: str) -> List[ConsoleRecord]:
         """
         Get command console records for the specified session (this method doesn't need to be async)
         """
         logger.debug(f"Getting console records for session: {session_id}")
-        if session_id not in self.active_shells:
-            logger.error(f"Session ID not found: {session_id}")
-            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
-        
-        return self.active_shells[session_id]["console"]
+        shell = self._get_shell(session_id)
+        self._update_console_output(shell)
+        return shell["console"]
 
-    async def wait_for_process(self, session_id: str, seconds: Optional[int] = None) -> ShellWaitResult:
+    async def wait_for_process(self, session_id: str, seconds: Optional[int] = None,
+                               since_offset: Optional[int] = None) -> ShellWaitResult:
         """
         Asynchronously wait for the process in the specified shell session to return
-        """
-        logger.debug(f"Waiting for process in session: {session_id}, timeout: {seconds}s")
-        if session_id not in self.active_shells:
-            logger.error(f"Session ID not found: {session_id}")
-            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
         
-        shell = self.active_shells[session_id]
-        process = shell["process"]
+        Returns as soon as the process exits, or, when since_offset is given, as soon as
+        the process has output after that offset. If neither happens within the given
+        seconds, returns with status running.
+        """
+        logger.debug(f"Waiting for process in session: {session_id}, timeout: {seconds}s, since offset: {since_offset}")
+        shell = self._get_shell(session_id)
+        output_buffer: ShellOutputBuffer = shell["output"]
+        # The reader finishes with the return code once the process exited and all output was read
+        reader: asyncio.Task = shell["reader"]
+        if seconds is None:
+            seconds = 60
         
+        queue: asyncio.Queue = asyncio.Queue()
+        if since_offset is not None:
+            self.output_listeners.setdefault(session_id, set()).add(queue)
         try:
-            # Asynchronously wait for process to complete
-            if seconds is None:
-                seconds = 60
-            await asyncio.wait_for(process.wait(), timeout=seconds)
+            deadline = asyncio.get_running_loop().time() + seconds
+            while not reader.done():
+                if since_offset is not None and output_buffer.end_offset > since_offset:
+                    logger.debug(f"New output after offset {since_offset} in session: {session_id}")
+                    return ShellWaitResult(
+                        status="output",
+                        output=output_buffer.read(since_offset),
+                        end_offset=output_buffer.end_offset
+                    )
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    logger.debug(f"Process still running after {seconds}s in session: {session_id}")
+                    return ShellWaitResult(
+                        status="running",
+                        output=output_buffer.read(since_offset) if since_offset is not None else None,
+                        end_offset=output_buffer.end_offset
+                    )
+                # Wake up on exit or on any output of the process
+                next_output = asyncio.ensure_future(queue.get())
+                try:
+                    await asyncio.wait({reader, next_output}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    next_output.cancel()
             
-            logger.info(f"Process completed with return code: {process.returncode}")
+            logger.info(f"Process completed with return code: {reader.result()}")
             return ShellWaitResult(
-                returncode=process.returncode
+                returncode=reader.result(),
+                output=output_buffer.read(since_offset) if since_offset is not None else None,
+                end_offset=output_buffer.end_offset,
+                usage=shell.get("usage") if shell["reader"] is reader else None
             )
-        except asyncio.TimeoutError:
-            logger.warning(f"Process wait timeout expired: {seconds}s")
-            raise BadRequestException(f"Wait timeout: {seconds} seconds")
+        except BadRequestException:
+            raise
         except Exception as e:
             logger.error(f"Failed to wait for process: {str(e)}", exc_info=True)
             raise AppException(message=f"Failed to wait for process: {str(e)}")
+        finally:
+            listeners = self.output_listeners.get(session_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self.output_listeners[session_id]
 
     async def write_to_process(self, session_id: str, input_text: str, press_enter: bool) -> ShellWriteResult:
         """
         Asynchronously write input to the process in the specified shell session
         """
         logger.debug(f"Writing to process in session: {session_id}, press_enter: {press_enter}")
-        if session_id not in self.active_shells:
-            logger.error(f"Session ID not found: {session_id}")
-            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
-        
-        shell = self.active_shells[session_id]
+        shell = self._get_shell(session_id)
         process = shell["process"]
         
         try:
@@ -274,10 +567,8 @@ class ShellService:
                 input_data = input_text.encode()
             
             # Add input to output and console records
-            input_str = input_data.decode('utf-8')
-            shell["output"] += input_str
-            if shell["console"]:
-                shell["console"][-1].output += input_str
+            echo = shell["output"].write_text(input_data.decode('utf-8'))
+            self._publish_output(session_id, process, echo, shell["output"].end_offset)
             
             # Asynchronously write input
             process.stdin.write(input_data)
@@ -286,7 +577,8 @@ class ShellService:
             logger.info(f"Successfully wrote input to process")
             
             return ShellWriteResult(
-                status="success"
+                status="success",
+                end_offset=shell["output"].end_offset
             )
         except Exception as e:
             logger.error(f"Failed to write input: {str(e)}", exc_info=True)
@@ -297,11 +589,7 @@ class ShellService:
         Asynchronously terminate the process in the specified shell session
         """
         logger.info(f"Killing process in session: {session_id}")
-        if session_id not in self.active_shells:
-            logger.error(f"Session ID not found: {session_id}")
-            raise ResourceNotFoundException(f"Session ID does not exist: {session_id}")
-        
-        shell = self.active_shells[session_id]
+        shell = self._get_shell(session_id)
         process = shell["process"]
         
         try:
@@ -333,6 +621,34 @@ class ShellService:
             logger.error(f"Failed to kill process: {str(e)}", exc_info=True)
             raise AppException(message=f"Failed to terminate process: {str(e)}")
 
+    def list_sessions(self) -> ShellSessionsResult:
+        """
+        List open shell sessions with the memory their output uses (this method doesn't need to be async)
+        """
+        now = time.monotonic()
+        sessions = []
+        for session_id, shell in self.active_shells.items():
+            records: List[ConsoleRecord] = shell["console"]
+            sessions.append(ShellSessionInfo(
+                session_id=session_id,
+                mode=shell["mode"],
+                command=records[-1].command if records else "",
+                running=not shell["reader"].done(),
+                returncode=shell["process"].returncode,
+                records=len(records),
+                output_bytes=shell["output"].size,
+                # The current record's output is a copy of the output buffer
+                history_bytes=sum(len(record.output.encode("utf-8")) for record in records[:-1]),
+                idle_seconds=round(now - shell["last_used"], 1),
+                usage=shell.get("total_usage")
+            ))
+        return ShellSessionsResult(
+            sessions=sessions,
+            total_bytes=sum(session.output_bytes + session.history_bytes for session in sessions),
+            max_sessions=settings.SHELL_MAX_SESSIONS,
+            idle_ttl_seconds=settings.SHELL_IDLE_TTL_SECONDS
+        )
+
     def create_session_id(self) -> str:
         """
         Create a new session ID (this method doesn't need to be async)
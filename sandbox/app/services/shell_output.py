@@ -0,0 +1,109 @@
+"""
+Shell Output Buffer - bounded, incrementally decoded process output
+"""
+import codecs
+from collections import deque
+from typing import Deque, List, Tuple
+
+
+def _skip_bytes(text: str, count: int) -> str:
+    """Drop the first count UTF-8 bytes of text, including a character cut in half"""
+    return text.encode("utf-8")[count:].decode("utf-8", errors="ignore")
+
+
+class ShellOutputBuffer:
+    """Output of one shell process with bounded memory
+
+    Bytes are decoded incrementally, so multi-byte characters split across reads stay
+    intact. The first head_bytes of output are always kept, later output goes to a ring
+    of chunks holding the last tail_bytes. Output dropped in between is replaced by a
+    truncation marker when read.
+
+    Offsets count UTF-8 bytes of decoded output since the process started, so a reader
+    can resume from the end offset of its previous read.
+    """
+
+    def __init__(self, head_bytes: int, tail_bytes: int):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._head: List[str] = []
+        self._head_size = 0
+        # (start offset, text, size in bytes)
+        self._tail: Deque[Tuple[int, str, int]] = deque()
+        self._tail_size = 0
+        self.end_offset = 0
+
+    @property
+    def start_offset(self) -> int:
+        """Offset of the oldest output kept after the head"""
+        return self._tail[0][0] if self._tail else self.end_offset
+
+    @property
+    def size(self) -> int:
+        """Bytes of output kept in memory"""
+        return self._head_size + self._tail_size
+
+    @property
+    def truncated_bytes(self) -> int:
+        """Bytes of output dropped between the head and the tail"""
+        return self.start_offset - self._head_size
+
+    def write(self, data: bytes) -> str:
+        """Decode and store raw process output, returns the decoded text"""
+        return self.write_text(self._decoder.decode(data))
+
+    def finish(self) -> str:
+        """Decode bytes left over at the end of output, returns the decoded text"""
+        return self.write_text(self._decoder.decode(b"", final=True))
+
+    def write_text(self, text: str) -> str:
+        """Store already decoded output, e.g. echoed input, returns the text"""
+        if not text:
+            return text
+        size = len(text.encode("utf-8"))
+        if self._head_size < self.head_bytes and not self._tail:
+            self._head.append(text)
+            self._head_size += size
+        else:
+            self._tail.append((self.end_offset, text, size))
+            self._tail_size += size
+            self._trim()
+        self.end_offset += size
+        return text
+
+    def _trim(self):
+        while self._tail_size > self.tail_bytes:
+            start, text, size = self._tail[0]
+            excess = self._tail_size - self.tail_bytes
+            if size <= excess:
+                self._tail.popleft()
+                self._tail_size -= size
+                continue
+            text = _skip_bytes(text, excess)
+            new_size = len(text.encode("utf-8"))
+            self._tail[0] = (start + size - new_size, text, new_size)
+            self._tail_size -= size - new_size
+
+    def read(self, since_offset: int = 0) -> str:
+        """
+        Output from the given offset to the end offset
+
+        Dropped output in the requested range is replaced by a truncation marker.
+        """
+        parts: List[str] = []
+        if since_offset < self._head_size:
+            head = "".join(self._head)
+            parts.append(_skip_bytes(head, since_offset) if since_offset > 0 else head)
+        dropped = self.start_offset - max(since_offset, self._head_size)
+        if dropped > 0:
+            parts.append(f"\n[... {dropped} bytes truncated ...]\n")
+        for start, text, size in self._tail:
+            if start + size <= since_offset:
+                continue
+            parts.append(_skip_bytes(text, since_offset - start) if start < since_offset else text)
+        return "".join(parts)
+
+    def text(self) -> str:
+        """All kept output"""
+        return self.read(0)
@@ -1,8 +1,10 @@
+import logging
 import threading
 import xmlrpc.client
 import socket
 import http.client
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import List
 
@@ -11,9 +13,12 @@ from app.core.exceptions import BadRequestException, ResourceNotFoundException
 from app.models.supervisor import (
     ProcessInfo, 
     SupervisorActionResult, 
+    SupervisorReadiness,
     SupervisorTimeout
 )
 
+logger = logging.getLogger(__name__)
+
 
 # Add Unix socket support for xmlrpc client
 class UnixStreamHTTPConnection(http.client.HTTPConnection):
@@ -125,6 +130,40 @@ class SupervisorService:
         except Exception as e:
             raise ResourceNotFoundException(f"Failed to get process status: {str(e)}")
     
+    async def wait_until_ready(self, timeout: float) -> SupervisorReadiness:
+        """
+        Wait until all services are RUNNING, or until the timeout expires
+        
+        State checks go over the local supervisord socket, so they can run at a
+        much finer interval than remote polling and readiness is reported as soon
+        as the last service reaches RUNNING.
+        
+        Transient RPC failures (e.g. supervisord still starting) are treated as not
+        ready yet, so the wait continues until the deadline.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        interval = 0.05
+        while True:
+            try:
+                processes = await self.get_all_processes()
+            except ResourceNotFoundException as e:
+                logger.debug(f"Supervisor not reachable while waiting for readiness: {e.message}")
+                processes = []
+            ready = bool(processes) and all(process.statename == "RUNNING" for process in processes)
+            now = time.monotonic()
+            if ready or now >= deadline:
+                return SupervisorReadiness(
+                    ready=ready,
+                    waited_seconds=round(now - started, 3),
+                    services=processes
+                )
+            await asyncio.sleep(min(interval, deadline - now))
+            interval = min(interval * 2, 0.5)
+    
     async def stop_all_services(self) -> SupervisorActionResult:
         """Asynchronously stop all services"""
         try:
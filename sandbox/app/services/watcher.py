@@ -0,0 +1,258 @@
+"""
+File Change Feed Service Implementation - inotify based
+"""
+import os
+import errno
+import ctypes
+import ctypes.util
+import struct
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.exceptions import AppException, BadRequestException
+from app.models.file import FileChangeEvent, FileChangeBatch
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+# A path written to continuously is still reported at least this often
+MAX_DEBOUNCE_DELAY = 1.0
+
+# Batches buffered per subscriber, a subscriber that falls further behind gets an overflow batch
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class FileWatcher:
+    """Debounced change feed of the watched roots
+
+    Each directory under the roots gets an inotify watch, directories created later are
+    watched as they appear. Raw events are coalesced per path and flushed to subscribers
+    once no new event arrived for the debounce window, so a burst of writes to a file is
+    reported as one change. The watcher starts with the first subscriber, subscriptions
+    to paths the watches do not cover are rejected so callers can fall back to polling.
+    When changes are lost (kernel queue overflow or a slow subscriber), an overflow
+    batch tells subscribers to rescan instead.
+    """
+
+    def __init__(self, roots: List[str], ignore: List[str], debounce_ms: int):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.ignore = set(ignore)
+        self.debounce = debounce_ms / 1000
+        self._libc = None
+        self._fd: Optional[int] = None
+        self._wd_paths: Dict[int, str] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._pending: Dict[str, FileChangeEvent] = {}
+        self._pending_since = 0.0
+        self._overflowed = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._watch_limit_reached = False
+        self._starting: Optional[asyncio.Task] = None
+
+    async def _start(self):
+        """Start the watcher once, shared by concurrent subscribers"""
+        if self._starting is None:
+            self._starting = asyncio.create_task(self._start_watching())
+        starting = self._starting
+        try:
+            # A cancelled subscriber must not abort the walk other subscribers wait for
+            await asyncio.shield(starting)
+        except Exception:
+            if self._starting is starting:
+                self._starting = None
+            raise
+
+    async def _start_watching(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise AppException(message=f"Failed to start file watcher: {os.strerror(error)}")
+        self._libc, self._fd = libc, fd
+        # Walking large roots takes a while, so it runs off the event loop; events are
+        # only read once every watch exists
+        try:
+            await asyncio.to_thread(self._watch_roots)
+        except BaseException:
+            os.close(fd)
+            self._fd = None
+            self._wd_paths.clear()
+            raise
+        asyncio.get_running_loop().add_reader(fd, self._on_readable)
+        logger.info("File watcher started on %s with %d watches", self.roots, len(self._wd_paths))
+
+    def _watch_roots(self):
+        for root in self.roots:
+            self._watch_tree(root)
+
+    def is_watched(self, path: str) -> bool:
+        """Whether changes to a path are reported, i.e. it is under a root and not in an ignored directory"""
+        path = os.path.abspath(path)
+        for root in self.roots:
+            if path == root:
+                return True
+            if path.startswith(root.rstrip("/") + "/"):
+                parents = os.path.relpath(path, root).split(os.sep)[:-1]
+                return not any(name in self.ignore for name in parents)
+        return False
+
+    def _watch_dir(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC and not self._watch_limit_reached:
+                self._watch_limit_reached = True
+                logger.warning("inotify watch limit reached, changes under %s are not reported", path)
+            return False
+        self._wd_paths[wd] = path
+        return True
+
+    def _watch_tree(self, root: str, report: bool = False):
+        """Watch a directory and its subdirectories, optionally reporting existing entries as created"""
+        for dirpath, dirnames, filenames in os.walk(root):
+            if not self._watch_dir(dirpath):
+                dirnames.clear()
+                continue
+            dirnames[:] = [name for name in dirnames if name not in self.ignore]
+            if report:
+                # Entries created before the watch was added would otherwise be missed
+                for name in dirnames:
+                    self._record(os.path.join(dirpath, name), "created", True)
+                for name in filenames:
+                    self._record(os.path.join(dirpath, name), "created", False)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                self._handle_event(wd, mask, os.fsdecode(name))
+
+    def _handle_event(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("inotify event queue overflowed, subscribers must rescan")
+            self._overflowed = True
+            self._schedule_flush()
+            return
+        if mask & IN_IGNORED:
+            self._wd_paths.pop(wd, None)
+            return
+        directory = self._wd_paths.get(wd)
+        if directory is None or not name:
+            return
+        path = os.path.join(directory, name)
+        is_dir = bool(mask & IN_ISDIR)
+        if is_dir and name in self.ignore:
+            return
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            self._record(path, "created", is_dir)
+            if is_dir:
+                self._watch_tree(path, report=True)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._record(path, "deleted", is_dir)
+        elif mask & (IN_MODIFY | IN_CLOSE_WRITE) and not is_dir:
+            self._record(path, "modified", is_dir)
+
+    def _record(self, path: str, change_type: str, is_dir: bool):
+        """Coalesce a raw event into the pending change of its path"""
+        previous = self._pending.get(path)
+        if previous is not None:
+            if previous.type == "created" and change_type == "modified":
+                change_type = "created"
+            elif previous.type == "created" and change_type == "deleted":
+                # Short-lived file, nothing to report
+                del self._pending[path]
+                return
+            elif previous.type == "deleted" and change_type == "created":
+                change_type = "modified"
+        self._pending[path] = FileChangeEvent(path=path, type=change_type, is_dir=is_dir)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._flush_handle is None:
+            self._pending_since = now
+        else:
+            self._flush_handle.cancel()
+        delay = min(self.debounce, self._pending_since + MAX_DEBOUNCE_DELAY - now)
+        self._flush_handle = loop.call_later(max(delay, 0), self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._pending and not self._overflowed:
+            return
+        batch = FileChangeBatch(changes=list(self._pending.values()), overflow=self._overflowed)
+        self._pending = {}
+        self._overflowed = False
+        for queue in self._subscribers:
+            if queue.full():
+                # The subscriber has to rescan anyway, so its backlog collapses into one marker
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(FileChangeBatch(overflow=True))
+            else:
+                queue.put_nowait(batch)
+
+    async def subscribe(self, paths: Optional[List[str]] = None) -> AsyncIterator[FileChangeBatch]:
+        """
+        Yield debounced change batches until the subscriber stops iterating
+
+        Args:
+            paths: Only report changes under these paths, all watched roots if empty
+
+        Raises:
+            BadRequestException: A path is outside the watched roots or in an ignored directory
+        """
+        prefixes = [os.path.abspath(path) for path in paths or []]
+        unwatched = [prefix for prefix in prefixes if not self.is_watched(prefix)]
+        if unwatched:
+            raise BadRequestException(f"Paths are not watched: {', '.join(unwatched)}")
+        await self._start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                batch = await queue.get()
+                if prefixes:
+                    changes = [
+                        change for change in batch.changes
+                        if any(change.path == prefix or change.path.startswith(prefix.rstrip("/") + "/")
+                               for prefix in prefixes)
+                    ]
+                    if not changes and not batch.overflow:
+                        continue
+                    batch = FileChangeBatch(changes=changes, overflow=batch.overflow)
+                yield batch
+        finally:
+            self._subscribers.discard(queue)
+
+
+# Service instance
+file_watcher = FileWatcher(settings.WATCH_ROOTS, settings.WATCH_IGNORE, settings.WATCH_DEBOUNCE_MS)
@@ -0,0 +1,82 @@
+import pytest
+import uuid
+from conftest import BASE_URL
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _batch(client, operations, stop_on_error=False):
+    response = client.post(f"{BASE_URL}/api/v1/batch", json={
+        "operations": operations,
+        "stop_on_error": stop_on_error
+    })
+    assert response.status_code == 200
+    data = response.json()
+    logger.info(f"Batch response: {data}")
+    assert data["success"] is True
+    return data["data"]
+
+
+@pytest.mark.batch_api
+def test_batch_runs_operations_in_order(client):
+    """Test that a write followed by a read in one batch sees the written content"""
+    path = f"/tmp/test_batch_{uuid.uuid4().hex[:8]}.txt"
+
+    result = _batch(client, [
+        {"method": "/file/write", "params": {"file": path, "content": "batched"}},
+        {"method": "/file/read", "params": {"file": path}},
+        {"method": "/file/stat", "params": {"file": path}},
+    ])
+
+    assert result["stopped"] is False
+    assert [r["method"] for r in result["results"]] == ["/file/write", "/file/read", "/file/stat"]
+    assert all(r["success"] for r in result["results"])
+    assert result["results"][1]["data"]["content"] == "batched"
+
+
+@pytest.mark.batch_api
+def test_batch_reports_failures_with_status_code(client):
+    """Test that a failing operation keeps its own status code and the batch continues"""
+    path = f"/tmp/test_batch_missing_{uuid.uuid4().hex[:8]}.txt"
+
+    result = _batch(client, [
+        {"method": "/file/read", "params": {"file": path}},
+        {"method": "/file/write", "params": {"file": path, "content": "x"}},
+    ])
+
+    first, second = result["results"]
+    assert first["success"] is False
+    assert first["status_code"] == 404
+    assert second["success"] is True
+    assert result["stopped"] is False
+
+
+@pytest.mark.batch_api
+def test_batch_stop_on_error_skips_remaining(client):
+    """Test that stop_on_error skips the operations after the first failure"""
+    path = f"/tmp/test_batch_stop_{uuid.uuid4().hex[:8]}.txt"
+
+    result = _batch(client, [
+        {"method": "/file/read", "params": {"file": path}},
+        {"method": "/file/write", "params": {"file": path, "content": "x"}},
+    ], stop_on_error=True)
+
+    assert len(result["results"]) == 1
+    assert result["stopped"] is True
+
+
+@pytest.mark.batch_api
+def test_batch_unknown_method_and_invalid_params(client):
+    """Test that unknown methods and invalid params fail per operation"""
+    result = _batch(client, [
+        {"method": "/no/such/method", "params": {}},
+        {"method": "/file/read", "params": {}},
+    ])
+
+    unknown, invalid = result["results"]
+    assert unknown["success"] is False
+    assert unknown["status_code"] == 404
+    assert invalid["success"] is False
+    assert invalid["status_code"] == 422
@@ -0,0 +1,295 @@
+"""
+Unit tests for the directory walk, glob matching and content search
+"""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app.services import file_search
+from app.services.file_search import (
+    ContentSearch,
+    ThreadedIterator,
+    compile_glob,
+    compile_pattern,
+    find_paths,
+    match_glob,
+    search_buffer,
+    take,
+    walk,
+)
+
+
+def _write(root, relative: str, content: str = ""):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+async def _search(root, regex: str, **kwargs):
+    events = [event async for event in ContentSearch(workers=2).search(str(root), regex, **kwargs)]
+    return events[:-1], events[-1]
+
+
+def test_search_buffer_line_numbers_and_context():
+    """Test that matches report 0-based lines with their context"""
+    data = b"zero\none match\ntwo\nthree match\nfour"
+    matches = search_buffer(data, len(data), compile_pattern("match"), "f", context_lines=1)
+
+    assert [m.line_number for m in matches] == [1, 3]
+    assert matches[0].line == "one match"
+    assert matches[0].before == ["zero"]
+    assert matches[0].after == ["two"]
+    assert matches[1].before == ["two"]
+    assert matches[1].after == ["four"]
+
+
+def test_search_buffer_one_match_per_line_and_limit():
+    """Test that a line is reported once and the match limit is respected"""
+    data = b"aa aa\nb\naa\naa\n"
+    pattern = compile_pattern("aa")
+
+    assert [m.line_number for m in search_buffer(data, len(data), pattern)] == [0, 2, 3]
+    assert len(search_buffer(data, len(data), pattern, max_matches=2)) == 2
+
+
+def test_search_buffer_anchors_and_crlf():
+    """Test that ^ and $ match at line boundaries and \\r is not part of the line"""
+    data = b"foo\r\nbar foo\r\nfoo bar\r\n"
+    matches = search_buffer(data, len(data), compile_pattern("^foo"))
+
+    assert [m.line for m in matches] == ["foo", "foo bar"]
+
+
+def test_search_buffer_stops_when_signalled():
+    """Test that a set stop event ends the scan"""
+    stop = threading.Event()
+    stop.set()
+    data = b"x\nx\n"
+    assert search_buffer(data, len(data), compile_pattern("x"), stop=stop) == []
+
+
+@pytest.mark.asyncio
+async def test_search_exact_max_results_is_not_truncated(tmp_path):
+    """Test that finding exactly max_results matches does not report truncation"""
+    _write(tmp_path, "a.txt", "hit\nhit\nmiss\n")
+
+    files, summary = await _search(tmp_path, "hit", max_results=2)
+
+    assert sum(len(event.matches) for event in files) == 2
+    assert summary.done and summary.matches_found == 2
+    assert summary.truncated is False
+
+
+@pytest.mark.asyncio
+async def test_search_more_matches_in_file_is_truncated(tmp_path):
+    """Test that a file with matches beyond max_results reports truncation"""
+    _write(tmp_path, "a.txt", "hit\nhit\nhit\n")
+
+    files, summary = await _search(tmp_path, "hit", max_results=2)
+
+    assert [len(event.matches) for event in files] == [2]
+    assert summary.matches_found == 2
+    assert summary.truncated is True
+
+
+@pytest.mark.asyncio
+async def test_search_more_files_is_truncated(tmp_path):
+    """Test that files left unsearched at max_results report truncation"""
+    for i in range(20):
+        _write(tmp_path, f"f{i:02}.txt", "hit\n")
+
+    files, summary = await _search(tmp_path, "hit", max_results=3)
+
+    assert summary.matches_found == 3
+    assert summary.truncated is True
+
+
+@pytest.mark.asyncio
+async def test_search_include_ignore_and_binary(tmp_path):
+    """Test include/ignore globs and that binary files are skipped"""
+    _write(tmp_path, "src/a.py", "needle\n")
+    _write(tmp_path, "src/a.txt", "needle\n")
+    _write(tmp_path, "node_modules/b.py", "needle\n")
+    with open(tmp_path / "src" / "c.py", "wb") as f:
+        f.write(b"needle\0\n")
+
+    files, summary = await _search(tmp_path, "needle", include=["*.py"], ignore=["node_modules"])
+
+    assert [os.path.relpath(event.file, tmp_path) for event in files] == ["src/a.py"]
+    assert summary.files_skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_search_stopped_early_closes_walk(tmp_path):
+    """Test that a consumer stopping early does not leave the walk running"""
+    for i in range(50):
+        _write(tmp_path, f"d{i}/f.txt", "hit\n")
+
+    stream = ContentSearch(workers=2).search(str(tmp_path), "hit")
+    first = await anext(stream)
+    await stream.aclose()
+
+    assert first.matches
+
+
+def test_threaded_iterator_closes_after_running_step():
+    """Test that closing during a step defers closing to the thread running it"""
+    closed = threading.Event()
+
+    def numbers():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    iterator = ThreadedIterator(numbers())
+    in_step = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def consume(it):
+        in_step.set()
+        release.wait(5)
+        return take(it, 10, iterator.stopped)
+
+    worker = threading.Thread(target=lambda: results.append(iterator.step(consume)))
+    worker.start()
+    in_step.wait(5)
+    # The generator is running on the worker, closing must not raise
+    iterator.close()
+    assert not closed.is_set()
+    release.set()
+    worker.join(5)
+
+    assert closed.is_set()
+    # The step saw the stop event and ended early
+    assert results == [[0]]
+
+
+def _relative(root, paths):
+    return [os.path.relpath(path, root) for path in paths]
+
+
+async def _find(root, pattern: str, **kwargs):
+    events = [event async for event in find_paths(str(root), pattern, **kwargs)]
+    return [path for event in events[:-1] for path in event.files], events[-1]
+
+
+def test_walk_sorted_pre_order_with_ignore_and_depth(tmp_path):
+    """Test walk order, ignored entries and the depth limit"""
+    _write(tmp_path, "b/c.txt")
+    _write(tmp_path, "a.txt")
+    _write(tmp_path, "b/d/e.txt")
+    _write(tmp_path, "node_modules/x.js")
+
+    paths = [path for path, _, _ in walk(str(tmp_path), ignore=["node_modules"])]
+    assert _relative(tmp_path, paths) == ["a.txt", "b", "b/c.txt", "b/d", "b/d/e.txt"]
+
+    shallow = [path for path, _, _ in walk(str(tmp_path), ignore=["node_modules"], max_depth=2)]
+    assert _relative(tmp_path, shallow) == ["a.txt", "b", "b/c.txt", "b/d"]
+
+
+def test_walk_resumes_after_entry(tmp_path):
+    """Test that start_after continues right after the given entry, also inside a directory"""
+    for relative in ["a/1.txt", "a/2.txt", "b/1.txt", "c.txt"]:
+        _write(tmp_path, relative)
+
+    paths = [path for path, _, _ in walk(str(tmp_path), start_after=("a", "1.txt"))]
+    assert _relative(tmp_path, paths) == ["a/2.txt", "b", "b/1.txt", "c.txt"]
+
+
+@pytest.mark.parametrize("pattern,path,matches", [
+    ("*.py", "a.py", True),
+    ("*.py", ".hidden.py", False),
+    (".*.py", ".hidden.py", True),
+    ("**/*.py", "src/pkg/a.py", True),
+    ("**/*.py", "a.py", True),
+    ("**/*.py", ".venv/lib/a.py", False),
+    ("src/**", "src/a/b", True),
+    ("src/*", "src/a/b", False),
+    ("*/a.py", ".git/a.py", False),
+    ("a?[0-9].txt", "ab1.txt", True),
+])
+def test_glob_dot_rules(pattern, path, matches):
+    """Test that wildcards and ** do not match names starting with a dot, like glob"""
+    segments = compile_glob(tuple(pattern.split("/")))
+    assert match_glob(tuple(path.split("/")), segments) is matches
+
+
+@pytest.mark.asyncio
+async def test_find_paginates_with_cursor(tmp_path):
+    """Test that truncated results can be continued from the cursor without gaps or repeats"""
+    for i in range(7):
+        _write(tmp_path, f"d{i % 3}/f{i}.txt")
+    _write(tmp_path, "d0/skip.log")
+
+    found = []
+    cursor = None
+    while True:
+        page, summary = await _find(tmp_path, "**/*.txt", max_results=3, cursor=cursor)
+        found.extend(page)
+        if not summary.truncated:
+            break
+        assert summary.next_cursor == page[-1]
+        cursor = summary.next_cursor
+
+    assert len(found) == 7
+    assert found == sorted(found)
+    assert all(path.endswith(".txt") for path in found)
+
+
+@pytest.mark.asyncio
+async def test_find_exact_max_results(tmp_path):
+    """Test the summary when the results fit the limit"""
+    _write(tmp_path, "a.txt")
+    _write(tmp_path, "b.txt")
+
+    paths, summary = await _find(tmp_path, "*.txt", max_results=2)
+
+    assert _relative(tmp_path, paths) == ["a.txt", "b.txt"]
+    assert summary.files_found == 2
+    assert summary.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_find_cancelled_during_step(tmp_path, monkeypatch):
+    """Test that cancelling the consumer while a walk step runs stops the step and closes the walk"""
+    for i in range(100):
+        _write(tmp_path, f"d{i:03}/f.txt")
+
+    in_walk = threading.Event()
+    listed = []
+    list_directory = file_search.list_directory
+
+    def slow_list_directory(directory):
+        # Runs inside the walk generator on the worker thread
+        listed.append(directory)
+        in_walk.set()
+        time.sleep(0.005)
+        return list_directory(directory)
+
+    monkeypatch.setattr(file_search, "list_directory", slow_list_directory)
+
+    async def consume():
+        return [event async for event in find_paths(str(tmp_path), "**/*.txt")]
+
+    task = asyncio.create_task(consume())
+    await asyncio.to_thread(in_walk.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The running step notices the cancellation at its next entry
+    await asyncio.sleep(0.1)
+    walked = len(listed)
+    await asyncio.sleep(0.1)
+    assert len(listed) == walked
+    assert walked < 50
@@ -0,0 +1,78 @@
+"""
+Unit tests for the line index of large files
+"""
+import pytest
+
+from app.services import line_index
+from app.services.line_index import LineIndex
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Use tiny blocks so lines span several blocks"""
+    monkeypatch.setattr(line_index, "BLOCK_SIZE", 8)
+
+
+def _lines(data: bytes):
+    return data.decode().split("\n")
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"one",
+    b"one\n",
+    b"one\ntwo\nthree",
+    b"a\n\n\nbb\nccc\ndddd\neeeee\nffffff\n",
+    b"\n\n",
+])
+def test_line_count(data):
+    """Test that a trailing line without newline counts and a final newline does not start a line"""
+    index = LineIndex.build(data, 1, len(data), 0)
+    expected = 0 if not data else len(_lines(data)) - (1 if data.endswith(b"\n") else 0)
+    assert index.line_count == expected
+
+
+def test_read_lines_matches_split():
+    """Test that every line range equals slicing the split lines"""
+    data = b"alpha\nbeta\n\ngamma delta epsilon\nz\nlast line without newline"
+    index = LineIndex.build(data, 1, len(data), 0)
+    lines = _lines(data)
+    for start in range(len(lines) + 1):
+        for end in range(start, len(lines) + 2):
+            assert index.read_lines(data, start, end) == "\n".join(lines[start:end]), (start, end)
+
+
+def test_read_lines_strips_crlf():
+    """Test that \\r\\n line endings are returned as \\n"""
+    data = b"one\r\ntwo\r\nthree\r\n"
+    index = LineIndex.build(data, 1, len(data), 0)
+    assert index.read_lines(data, 0, 2) == "one\ntwo"
+    assert index.read_lines(data, 2, 3) == "three"
+
+
+def test_extended_indexes_appended_content_only():
+    """Test that an appended file is indexed incrementally and the original index is unchanged"""
+    data = b"first line\nsecond"
+    index = LineIndex.build(data, 1, len(data), 1)
+    grown = data + b" continued\nthird line\nfourth\n"
+
+    assert index.can_extend(grown, 1, len(grown))
+    extended = index.extended(grown, len(grown), 2)
+
+    assert extended.line_count == 4
+    assert extended.read_lines(grown, 1, 3) == "second continued\nthird line"
+    assert extended.matches(1, len(grown), 2)
+    # The shared index is left as it was
+    assert index.line_count == 2
+    assert index.matches(1, len(data), 1)
+    assert index.read_lines(data, 0, 2) == "first line\nsecond"
+
+
+def test_rewrite_or_new_inode_cannot_extend():
+    """Test that changed content before the indexed end or a replaced file needs a rebuild"""
+    data = b"abc\ndef\n"
+    index = LineIndex.build(data, 1, len(data), 0)
+
+    assert not index.can_extend(b"abX\ndef\nmore", 1, 12)
+    assert not index.can_extend(data + b"more", 2, len(data) + 4)
+    assert not index.can_extend(b"abc", 1, 3)
@@ -0,0 +1,95 @@
+"""
+Unit tests for the bounded shell output buffer
+"""
+from app.services.shell_output import ShellOutputBuffer
+
+
+def test_small_output_is_kept_whole():
+    """Test that output within the head is returned as written"""
+    buffer = ShellOutputBuffer(head_bytes=100, tail_bytes=100)
+    buffer.write(b"hello ")
+    buffer.write(b"world")
+
+    assert buffer.text() == "hello world"
+    assert buffer.end_offset == 11
+    assert buffer.truncated_bytes == 0
+
+
+def test_split_multibyte_character_is_decoded_once_complete():
+    """Test that a UTF-8 character split across reads is not mangled"""
+    buffer = ShellOutputBuffer(head_bytes=100, tail_bytes=100)
+    data = "é€".encode("utf-8")
+
+    assert buffer.write(data[:1]) == ""
+    assert buffer.write(data[1:4]) == "é"
+    assert buffer.write(data[4:]) == "€"
+    assert buffer.text() == "é€"
+    assert buffer.end_offset == len(data)
+
+
+def test_invalid_bytes_are_replaced_on_finish():
+    """Test that a dangling partial character is flushed as a replacement"""
+    buffer = ShellOutputBuffer(head_bytes=100, tail_bytes=100)
+    buffer.write(b"ok\xe2\x82")
+
+    assert buffer.finish() == "�"
+    assert buffer.text() == "ok�"
+
+
+def test_overflow_keeps_head_and_tail_with_marker():
+    """Test that output between head and tail is dropped and marked"""
+    buffer = ShellOutputBuffer(head_bytes=10, tail_bytes=10)
+    buffer.write(b"H" * 10)
+    for _ in range(5):
+        buffer.write(b"x" * 10)
+    buffer.write(b"T" * 10)
+
+    assert buffer.size == 20
+    assert buffer.end_offset == 70
+    assert buffer.truncated_bytes == 50
+    assert buffer.text() == "H" * 10 + "\n[... 50 bytes truncated ...]\n" + "T" * 10
+
+
+def test_tail_trims_partial_chunks_on_character_boundary():
+    """Test that trimming inside a chunk never leaves half a character"""
+    buffer = ShellOutputBuffer(head_bytes=0, tail_bytes=5)
+    buffer.write("aé€".encode("utf-8"))
+
+    text = buffer.text()
+    assert "�" not in text
+    assert text.endswith("€")
+    assert buffer.size <= 5
+
+
+def test_read_since_offset_returns_only_new_output():
+    """Test that a reader resuming at the previous end offset gets only new output"""
+    buffer = ShellOutputBuffer(head_bytes=100, tail_bytes=100)
+    buffer.write(b"first\n")
+    offset = buffer.end_offset
+    buffer.write(b"second\n")
+
+    assert buffer.read(offset) == "second\n"
+    assert buffer.read(buffer.end_offset) == ""
+
+
+def test_read_since_offset_inside_head_and_tail():
+    """Test offsets that fall inside the head, the dropped range and the tail"""
+    buffer = ShellOutputBuffer(head_bytes=4, tail_bytes=4)
+    buffer.write(b"abcd")
+    buffer.write(b"efgh")
+    buffer.write(b"ijkl")
+
+    assert buffer.start_offset == 8
+    assert buffer.read(2) == "cd\n[... 4 bytes truncated ...]\nijkl"
+    assert buffer.read(6) == "\n[... 2 bytes truncated ...]\nijkl"
+    assert buffer.read(10) == "kl"
+
+
+def test_echoed_text_counts_towards_offsets():
+    """Test that already decoded text is stored like process output"""
+    buffer = ShellOutputBuffer(head_bytes=100, tail_bytes=100)
+    buffer.write_text("$ ls\n")
+    buffer.write(b"file\n")
+
+    assert buffer.text() == "$ ls\nfile\n"
+    assert buffer.end_offset == 10
@@ -0,0 +1,62 @@
+"""
+Unit tests for the file change feed
+"""
+import asyncio
+import os
+
+import pytest
+
+from app.services.watcher import FileWatcher, IN_CLOSE_WRITE, IN_Q_OVERFLOW, SUBSCRIBER_QUEUE_SIZE
+
+
+def _close(watcher: FileWatcher):
+    """Release the inotify descriptor of a watcher"""
+    if watcher._fd is not None:
+        asyncio.get_running_loop().remove_reader(watcher._fd)
+        os.close(watcher._fd)
+
+
+async def _next_batch(watcher: FileWatcher, feed):
+    """Request the next batch and wait until the subscription is registered"""
+    pending = asyncio.ensure_future(feed.__anext__())
+    while not watcher._subscribers:
+        await asyncio.sleep(0.01)
+    return pending
+
+
+@pytest.mark.asyncio
+async def test_kernel_overflow_publishes_rescan_marker(tmp_path):
+    """Test that a lost inotify queue is reported to filtered subscribers as an overflow batch"""
+    watcher = FileWatcher([str(tmp_path)], [], debounce_ms=10)
+    feed = watcher.subscribe([str(tmp_path / "sub")])
+    pending = await _next_batch(watcher, feed)
+
+    watcher._handle_event(-1, IN_Q_OVERFLOW, "")
+    batch = await asyncio.wait_for(pending, timeout=2)
+    await feed.aclose()
+    _close(watcher)
+
+    assert batch.overflow
+    assert batch.changes == []
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_one_overflow_batch(tmp_path):
+    """Test that a subscriber whose queue is full has its backlog replaced by an overflow marker"""
+    watcher = FileWatcher([str(tmp_path)], [], debounce_ms=10)
+    feed = watcher.subscribe()
+    pending = await _next_batch(watcher, feed)
+    queue = next(iter(watcher._subscribers))
+    wd = next(iter(watcher._wd_paths))
+
+    for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+        watcher._handle_event(wd, IN_CLOSE_WRITE, f"file{i}")
+        watcher._flush()
+    batch = await asyncio.wait_for(pending, timeout=2)
+    backlog = queue.qsize()
+    await feed.aclose()
+    _close(watcher)
+
+    assert batch.overflow and batch.changes == []
+    assert backlog == 0
+    assert watcher._subscribers == set()